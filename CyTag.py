@@ -5,16 +5,20 @@
 
 A surface-level natural language processing pipeline for Welsh texts (text segmentation -> sentence splitting -> tokenisation -> part-of-speech (POS) tagging).
 
-CyTag can either process Welsh text via standard input, or accepts the following sequences of arguments:
+CyTag can either process Welsh text via standard input (as a filter, tagging the text a few sentences at a time as it is read, and writing the tagged tokens to standard output as each batch is tagged), or accepts the following sequences of arguments:
 	--- REQUIRED: A string of Welsh language text.
 	or:
-	--- REQUIRED: One or more Welsh input text files (raw text).
+	--- REQUIRED: One or more Welsh input text files (raw text, or compressed with gzip, bzip2 or xz).
 	--- OPTIONAL: A name to describe the corpus and its output files.
 	--- OPTIONAL: A directory in which output files will be saved.
-	--- OPTIONAL: Rebuild lexicon? (Can slow down the code - default is to rebuild, but if you know that they have not changed since last run, set this to "n".)
-	--- OPTIONAL: Rebuild gazetteers? (Can slow down the code - default is to rebuild, but if you know that they have not changed since last run, set this to "n".)
+	--- OPTIONAL: A file to write the output to ('-' for standard output).
+	--- OPTIONAL: A compression format for the readings files and TSV output ('gz', 'bz2' or 'xz').
+	--- OPTIONAL: Force a rebuild of the lexicon? (The compiled lexicon is rebuilt automatically whenever the lexicon file changes, so this is rarely needed.)
+	--- OPTIONAL: Force a rebuild of the gazetteers? (The compiled gazetteers are rebuilt automatically whenever a gazetteer file changes, so this is rarely needed.)
 	--- OPTIONAL: A specific component to run the pipeline to, should running the entire pipeline not be required ('seg', 'sent', 'tok', 'pos').
-	--- OPTIONAL: A format to write the pipeline's output to ('tsv', 'xml', 'vrt', 'db' or 'all')
+	--- OPTIONAL: A format to write the pipeline's output to ('tsv', 'xml', 'vrt', 'conllu', 'db' or 'all')
+	--- OPTIONAL: A file in which to keep the POS tagger's reading cache between runs.
+	--- OPTIONAL: An existing corpus database to add the output to ('db' format), rather than writing a new one.
 	or:
 	--- REQUIRED: 'evaluate'
 	--- OPTIONAL: 'soft' (for a more lenient evaluation of CyTag output).
@@ -49,18 +53,19 @@ from shared.load_gazetteers import *
 
 #from evaluate_cytag import *
 
-def process(input_text, output_name=None, directory=None, component=None, output_format=None, lex_rebuild="n", gaz_rebuild="n"):
-	""" Process the input text/file(s) """
+def process(input_text, output_name=None, directory=None, component=None, output_format=None, lex_rebuild="n", gaz_rebuild="n", reading_cache=None, chunk_size=None, workers=None, append_db=None, output_path=None, compression=None):
+	""" Process the input text/file(s).
+		Unless an output format is given, output is written to standard output (or 'output_path', if one is given) as it is produced
+	"""
 	if input_text == "" or input_text == []:
 		raise ValueError("Input text must either be: a string, or; the names of one or more raw text files")
 	elif component != None and component not in ["seg", "sent", "tok", "pos"]:
 		raise ValueError("An invalid pipeline component ('{}') was given. Valid components: 'seg', 'sent', 'tok', 'pos'".format(component))
-	elif output_format != None and output_format not in ["tsv", "xml", "all"]:
-		raise ValueError("An invalid output format ('{}') was given. Valid formats: 'tsv', 'xml', 'all'".format(output_format))
+	elif output_format != None and output_format not in ["tsv", "xml", "vrt", "conllu", "db", "all"]:
+		raise ValueError("An invalid output format ('{}') was given. Valid formats: 'tsv', 'xml', 'vrt', 'conllu', 'db', 'all'".format(output_format))
 	else:
 		if [output_name, directory, component, output_format] == [None, None, None, None]:
-			output = pos_tagger(input_text)
-			print(output)
+			pos_tagger(input_text, reading_cache_file=reading_cache, chunk_size=chunk_size, workers=workers, output_path="-" if output_path == None else output_path)
 		else:
 			if component != None:
 				if component == "seg":
@@ -68,12 +73,11 @@ def process(input_text, output_name=None, directory=None, component=None, output
 				elif component == "sent":
 					pass#output = 
 				elif component == "tok":
-					output = tokeniser(input_text)
-					print(output)
+					tokeniser(input_text, "-" if output_path == None else output_path)
 				elif component == "pos":
-					output = pos_tagger(input_text, output_name, directory, output_format)
+					pos_tagger(input_text, output_name, directory, output_format, reading_cache_file=reading_cache, chunk_size=chunk_size, workers=workers, append_db=append_db, output_path=output_path, compression=compression)
 			else:
-				output = pos_tagger(input_text, output_name, directory, output_format)
+				pos_tagger(input_text, output_name, directory, output_format, reading_cache_file=reading_cache, chunk_size=chunk_size, workers=workers, append_db=append_db, output_path=output_path, compression=compression)
 
 def parse_evaluation_arguments(arguments):
 	""" Parse command line arguments (when evaluating CyTag) """
@@ -94,11 +98,17 @@ def parse_processing_arguments(arguments):
 	required = parser.add_argument_group("required arguments")
 	required.add_argument("-i", "--input", help="Input file path(s)", nargs="+", required=True)
 	optional.add_argument("-n", "--name", help="Output file name")
-	optional.add_argument("-d", "--dir", help="Output directory")
+	optional.add_argument("-d", "--dir", help="Output directory (in CyTag's 'outputs' folder, unless an absolute path is given)")
+	optional.add_argument("-o", "--output", help="A file to write the output to ('-' for standard output): the TSV output, if an output format is given, or otherwise the output that would be printed (compressed, if its name ends with .gz, .bz2 or .xz)")
+	optional.add_argument("-z", "--compress", choices=["gz", "bz2", "xz"], help="Compress the readings files and TSV output with gzip, bzip2 or xz")
 	optional.add_argument("-c", "--component", help="Component to run the pipeline to ('seg', 'sent', 'tok', 'pos')")
-	optional.add_argument("-f", "--format", help="Output file format ('tsv', 'xml', 'all')")
-	optional.add_argument("-l", "--lexicon", choices=["y", "n"], help="Rebuild the lexicons (y/n). Slows down the tagger; n by default, set to y only if lexicon is changed since last run. Takes effect on your next run, so you will need to rerun your command after a rebuild.)")
-	optional.add_argument("-g", "--gazetteer", choices=["y", "n"], help="Rebuild the gazetteers (y/n). Slows down the tagger; n by default, set to y only if lexicon is changed since last run. Takes effect on your next run, so you will need to rerun your command after a rebuild.)")
+	optional.add_argument("-f", "--format", help="Output file format ('tsv', 'xml', 'vrt', 'conllu', 'db', 'all')")
+	optional.add_argument("-a", "--append", help="An existing corpus database to add the tagged corpus to (with '-f db' or '-f all'), rather than writing a new database to the output directory")
+	optional.add_argument("-l", "--lexicon", choices=["y", "n"], help="Force a rebuild of the compiled lexicon (y/n). n by default; the lexicon is rebuilt automatically (and used in the same run) whenever the lexicon file changes")
+	optional.add_argument("-g", "--gazetteer", choices=["y", "n"], help="Force a rebuild of the compiled gazetteers (y/n). n by default; the gazetteers are rebuilt automatically (and used in the same run) whenever a gazetteer file changes")
+	optional.add_argument("-r", "--reading_cache", help="A file in which to keep the POS tagger's reading cache between runs (created if it doesn't exist). Cached readings are only reused while the lexicon, gazetteers and tagger are unchanged")
+	optional.add_argument("-s", "--chunk_size", type=int, help="Run VISL CG-3 over chunks of (at least) this many tokens as the input is read, writing output as each chunk is tagged. Keeps memory use bounded on large corpora")
+	optional.add_argument("-w", "--workers", type=int, help="Tag the input files in parallel over this many processes (large files are split between them as well). The output is the same as tagging the files one after another")
 	parser._action_groups.append(optional)
 	return parser.parse_args()
 
@@ -107,7 +117,10 @@ if __name__ == "__main__":
 
 	args = sys.argv[1:]
 	if len(args) == 0 and not sys.stdin.isatty():
-		process(input_text=sys.stdin.read())
+		try:
+			tag_lines(sys.stdin)
+		except BrokenPipeError:
+			exit_on_closed_output()
 	else:
 		if args[0] == "evaluate":
 			arguments = parse_evaluation_arguments(args)
@@ -119,8 +132,12 @@ if __name__ == "__main__":
 				arguments = parse_processing_arguments(args)
 				if arguments.lexicon and arguments.lexicon == "y":
 					load_lexicon()
+					cy_lexicon.reload()
+					cy_mutations.reload()
+					cy_forms.reload()
 				if arguments.gazetteer and arguments.gazetteer == "y":
-					load_gazetteers()
+					gazetteers.update(load_gazetteers())
+					gazetteer_index.reload()
 				if os.path.isdir(arguments.input[0]) and len(arguments.input) == 1:
 					names = next(os.walk(arguments.input[0]))[2]
 					filepaths = []
@@ -130,4 +147,4 @@ if __name__ == "__main__":
 					filenames = filepaths
 				else:
 					filenames = arguments.input
-				process(filenames, output_name=arguments.name, directory=arguments.dir, component=arguments.component, output_format=arguments.format)
+				process(filenames, output_name=arguments.name, directory=arguments.dir, component=arguments.component, output_format=arguments.format, reading_cache=arguments.reading_cache, chunk_size=arguments.chunk_size, workers=arguments.workers, append_db=arguments.append, output_path=arguments.output, compression=arguments.compress)
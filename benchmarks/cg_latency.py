@@ -0,0 +1,56 @@
+#!usr/bin/env python3
+#-*- coding: utf-8 -*-
+"""
+'cg_latency.py'
+
+Compares the time taken to run VISL CG-3 over the readings for short texts:
+	--- 'one-shot': starting a new vislcg3 process (which parses the grammar again) for every text.
+	--- 'co-process': passing every text through the same long-running vislcg3 process (see 'src/shared/cg_process.py'), in the binary stream format if vislcg3 supports it (checking that the output matches the one-shot text output).
+
+Usage: python benchmarks/cg_latency.py [number of texts] [text]
+
+Developed at Cardiff University as part of the CorCenCC project (www.corcencc.org).
+
+This program is free software: you can redistribute it and/or modify it under the terms of the GNU General Public License as published by the Free Software Foundation, either version 3 of the License or (at your option) any later version.
+This program is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for more details.
+You should have received a copy of the GNU General Public License along with this program. If not, see <http://www.gnu.org/licenses>.
+"""
+
+import sys
+import os
+import subprocess
+import time
+
+sys.path.insert(0, "{}/../src".format(os.path.dirname(os.path.abspath(__file__))))
+
+from cy_postagger import *
+from shared.cg_stream import cg_text
+
+def one_shot(readings, command):
+	cg_process = subprocess.Popen(command, stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+	return cg_process.communicate(input=readings.encode("utf-8"))[0].decode("utf-8")
+
+def report(name, timings):
+	timings = sorted(timings)
+	print("{:<12} mean {:8.2f} ms   median {:8.2f} ms   95th percentile {:8.2f} ms".format(name, 1000 * sum(timings) / len(timings), 1000 * timings[len(timings) // 2], 1000 * timings[int(len(timings) * 0.95)]))
+
+if __name__ == "__main__":
+	runs = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+	text = sys.argv[2] if len(sys.argv) > 2 else "Mae'r gath yn cysgu ar y mat. Roedd hi'n braf ddoe."
+	tagger = Tagger()
+	tagger.check_vislcg3()
+	readings = "".join(readings for readings, token_count in TaggingRun(tagger).sentence_readings_from(text, None, {}, {"sentences": 0, "tokens": 0}))
+	tagger.run_cg(readings)
+	timings = {"one-shot": [], "co-process": []}
+	for run in range(runs):
+		started = time.perf_counter()
+		one_shot_output = one_shot(readings, tagger.cg_command())
+		timings["one-shot"].append(time.perf_counter() - started)
+		started = time.perf_counter()
+		co_process_output = tagger.run_cg(readings)
+		timings["co-process"].append(time.perf_counter() - started)
+		if one_shot_output.strip() != cg_text(co_process_output).strip():
+			raise ValueError("The co-process output differs from the one-shot output:\n{}\n---\n{}".format(one_shot_output, co_process_output))
+	print("VISL CG-3 over {} tokens, {} runs:".format(len([line for line in readings.splitlines() if line.startswith("\"<")]), runs))
+	for name, timing in timings.items():
+		report(name, timing)
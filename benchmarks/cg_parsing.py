@@ -0,0 +1,93 @@
+#!usr/bin/env python3
+#-*- coding: utf-8 -*-
+"""
+'cg_parsing.py'
+
+Compares the cost of the two sides of the stream between CyTag and VISL CG-3, in the CG text format and in CG-3's binary stream format, for the readings of a sample text:
+	--- 'serialise': tokenising the text and producing the CG-formatted readings for every sentence (from a warm reading cache), encoded as they are sent to vislcg3 in the text format.
+	--- 'regex parse': splitting CG-formatted output into cohorts and reading fields with the regular expressions CyTag used before 'cg_stream.py'.
+	--- 'stream parse': splitting the same output with the streaming parser in 'src/shared/cg_stream.py' (checking that every field matches).
+	--- 'binary encode': encoding the same readings as window packets, as they are sent to vislcg3 in the binary format.
+	--- 'binary parse': decoding the window packets into cohorts and reading fields (checking that every field matches).
+	--- 'binary render': rendering the window packets in the text format, as they are written to the post-CG readings file (checking that the text matches).
+
+The readings are parsed as they are produced (CG output has the same format, with fewer readings per cohort), so vislcg3 isn't needed.
+
+Usage: python benchmarks/cg_parsing.py [number of copies of the sample text] [input file]
+
+Developed at Cardiff University as part of the CorCenCC project (www.corcencc.org).
+
+This program is free software: you can redistribute it and/or modify it under the terms of the GNU General Public License as published by the Free Software Foundation, either version 3 of the License or (at your option) any later version.
+This program is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for more details.
+You should have received a copy of the GNU General Public License along with this program. If not, see <http://www.gnu.org/licenses>.
+"""
+
+import sys
+import os
+import re
+import time
+
+sys.path.insert(0, "{}/../src".format(os.path.dirname(os.path.abspath(__file__))))
+
+from cy_postagger import *
+from shared.cg_stream import cohorts, reading_fields, single_lemma_field, encode_readings, cg_text, stream_header
+
+sample_text = "Mae'r gath yn cysgu ar y mat yn yr haul. Roedd hi'n braf iawn ddoe, ond mae'n bwrw glaw heddiw! Aeth Mr. Jones i Gaerdydd ar y trên am 9 o'r gloch. Beth wnaeth e yno? Prynodd lyfr newydd i'w fab.\n"
+
+def regex_cohorts(cg_output):
+	""" Split CG output into cohorts as 'map_cg' did before 'cg_stream.py' """
+	cg_readings = []
+	for line in cg_output.strip().splitlines():
+		if line != "" and "~EOS~" not in line:
+			if line[:1] != "\t":
+				cg_readings.append([line])
+			else:
+				cg_readings[-1].append(line)
+	return cg_readings
+
+def regex_fields(reading, pattern):
+	""" Split a reading line as 'list_readings' and 'process_single_reading' did before 'cg_stream.py' """
+	for lemma in re.findall(pattern, reading):
+		reading = reading.replace(lemma, lemma.replace(" ", "_"))
+	return re.split(r"\s+", reading.strip())
+
+def regex_parse(cg_output):
+	return [[regex_fields(reading, r'\"(.+?)\" {') if len(cohort) > 2 else regex_fields(reading, r'\"([^{]+?)\" ') for reading in cohort[1:]] for cohort in regex_cohorts(cg_output)]
+
+def stream_parse(cg_output):
+	return [[reading_fields(reading) if len(readings) > 1 else reading_fields(reading, single_lemma_field) for reading in readings] for wordform, readings in cohorts(cg_output)]
+
+def best_of(runs, function, *args):
+	timings = []
+	for run in range(runs):
+		started = time.perf_counter()
+		result = function(*args)
+		timings.append(time.perf_counter() - started)
+	return min(timings), result
+
+if __name__ == "__main__":
+	copies = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+	text = open(sys.argv[2], encoding="utf-8").read() if len(sys.argv) > 2 else sample_text * copies
+	run = TaggingRun(Tagger())
+	def serialise():
+		return "".join(readings for readings, token_count in run.sentence_readings_from(text, None, {}, {"sentences": 0, "tokens": 0})).encode("utf-8")
+	serialise()
+	serialise_time, encoded = best_of(5, serialise)
+	cg_output = encoded.decode("utf-8")
+	regex_time, regex_result = best_of(5, regex_parse, cg_output)
+	stream_time, stream_result = best_of(5, stream_parse, cg_output)
+	if regex_result != stream_result:
+		raise ValueError("The streaming parser split the readings differently to the regular expressions")
+	def binary_encode():
+		return stream_header + encode_readings(cg_output, cg_soft_limit, cg_hard_limit, cg_delimiters, cg_soft_delimiters)
+	binary_encode_time, binary_output = best_of(5, binary_encode)
+	binary_time, binary_result = best_of(5, stream_parse, binary_output)
+	if binary_result != stream_result:
+		raise ValueError("The binary stream was split into different readings to the text format")
+	render_time, rendered = best_of(5, cg_text, binary_output)
+	if rendered != cg_output.lstrip("\n").replace("\n\n", "\n"):
+		raise ValueError("The binary stream was rendered differently to the text format")
+	reading_count = sum(len(cohort) for cohort in stream_result)
+	print("{} cohorts, {} readings ({:.1f} MB as text, {:.1f} MB as a binary stream):".format(len(stream_result), reading_count, len(encoded) / (1024 * 1024), len(binary_output) / (1024 * 1024)))
+	for name, timing in [("serialise", serialise_time), ("regex parse", regex_time), ("stream parse", stream_time), ("binary encode", binary_encode_time), ("binary parse", binary_time), ("binary render", render_time)]:
+		print("{:<14} {:8.1f} ms   {:6.2f} us per reading".format(name, 1000 * timing, 1000000 * timing / reading_count))
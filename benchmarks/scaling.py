@@ -0,0 +1,59 @@
+#!usr/bin/env python3
+#-*- coding: utf-8 -*-
+"""
+'scaling.py'
+
+Measures how the time taken to tokenise and POS tag an input file grows with its size, by tagging files made up of repeated copies of a sample text:
+	--- 'tokeniser': segmenting, sentence splitting and tokenising the file (see 'cy_tokeniser.py').
+	--- 'pos_tagger': the full tagging pipeline, running VISL CG-3 over chunks of 1000 tokens (only if vislcg3 can be found).
+
+The time per megabyte should stay (roughly) the same as the input grows; a time per megabyte that grows with the input points to work that is quadratic in the size of the input.
+
+Usage: python benchmarks/scaling.py [size in MB] [size in MB] ... (1, 2, 4 and 8 MB by default)
+
+Developed at Cardiff University as part of the CorCenCC project (www.corcencc.org).
+
+This program is free software: you can redistribute it and/or modify it under the terms of the GNU General Public License as published by the Free Software Foundation, either version 3 of the License or (at your option) any later version.
+This program is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for more details.
+You should have received a copy of the GNU General Public License along with this program. If not, see <http://www.gnu.org/licenses>.
+"""
+
+import sys
+import os
+import tempfile
+import time
+
+sys.path.insert(0, "{}/../src".format(os.path.dirname(os.path.abspath(__file__))))
+
+from cy_tokeniser import *
+from cy_postagger import *
+
+sample_text = "Mae'r gath yn cysgu ar y mat yn yr haul. Roedd hi'n braf iawn ddoe, ond mae'n bwrw glaw heddiw!\nAeth Mr. Jones i Gaerdydd ar y trên am 9 o'r gloch. Beth wnaeth e yno? Prynodd lyfr newydd i'w fab.\n"
+
+def write_input(path, megabytes):
+	""" Write a file of (at least) the given size, made up of copies of the sample text """
+	copies = (megabytes * 1024 * 1024) // len(sample_text.encode("utf-8")) + 1
+	with open(path, "w", encoding="utf-8") as input_file:
+		for copy in range(copies):
+			input_file.write(sample_text)
+
+def report(name, megabytes, seconds):
+	print("{:<12} {:>8} MB {:10.2f} s {:10.3f} s/MB".format(name, megabytes, seconds, seconds / megabytes))
+
+if __name__ == "__main__":
+	sizes = [int(size) for size in sys.argv[1:]] if len(sys.argv) > 1 else [1, 2, 4, 8]
+	tagger = Tagger()
+	run_tagger = tagger.vislcg3_location != None
+	with tempfile.TemporaryDirectory() as directory:
+		for megabytes in sizes:
+			path = "{}/input_{}MB.txt".format(directory, megabytes)
+			write_input(path, megabytes)
+			started = time.perf_counter()
+			tokeniser([path])
+			report("tokeniser", megabytes, time.perf_counter() - started)
+			if run_tagger:
+				started = time.perf_counter()
+				tagger.tag([path], chunk_size=1000)
+				report("pos_tagger", megabytes, time.perf_counter() - started)
+			os.remove(path)
+	tagger.close()
@@ -8,7 +8,7 @@ A part-of-speech (POS) tagger for Welsh texts.
 Accepts as arguments:
 	--- REQUIRED: A string of Welsh language text.
 	or:
-	--- REQUIRED: One or more Welsh input text files (raw text).
+	--- REQUIRED: One or more Welsh input text files (raw text, or compressed with gzip, bzip2 or xz).
 	--- OPTIONAL: A name to describe the corpus and its output files.
 	--- OPTIONAL: A directory in which output files will be saved.
 	--- OPTIONAL: A flag ('print') to let cy_postagger know whether to write CG-formatted readings files to the output folder or not.
@@ -36,6 +36,10 @@ import subprocess
 import time
 import json
 import shutil
+import io
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 
 missing_libraries = []
 try:
@@ -43,7 +47,7 @@ try:
 except ImportError:
 	missing_libraries.append("progress")
 try:
-	from lxml import etree
+	from shared.xml_writer import XMLWriter
 except ImportError:
 	missing_libraries.append("lxml")
 
@@ -53,24 +57,35 @@ from cy_tokeniser import *
 from shared.create_folders import *
 from shared.en_lexica import *
 from shared.reference_lists import *
+from shared.mapped_table import file_fingerprint, table_fingerprint
+from shared.load_lexicon import lexicon_table
+from shared.load_gazetteers import gazetteer_cache
+from shared.reading_cache import ReadingCache
+from shared.cg_process import CGProcess, binary_stream_supported
+from shared.records import Reading, TaggedToken
+from shared.cg_stream import cohorts, reading_fields, single_lemma_field, encode_readings, cg_text, stream_header
+from shared.db_writer import DBWriter
+from shared.text_writers import TSVWriter, VRTWriter, CoNLLUWriter, open_output, close_output, exit_on_closed_output
+from shared.compression import open_text_output
 
 
-stats = {"pre-cg": 
+def new_stats():
+	""" Return a fresh set of (zeroed) pre- and post-CG statistics """
+	return {"pre-cg": 
 			{"untagged": 0, "definite_tag": 0, "with_readings": 0, "non-standard": 0, "non_welsh": 0, "non_alpha": 0, "single_reading": 0, "multiple_readings": 0, "without_readings": 0, "no_readings": 0, "assumed_proper": 0},
 		 "post-cg":
 		 	{"one_reading": 0, "multiple_readings": 0, "unknown": 0, "disambiguated": 0, "unknown_gazetteer": 0, "pns_gazetteer": 0, "neutral_pns": 0, "same_tag": 0, "in_coverage": 0, "ambiguous_gazetteer": 0, "undisambiguated": 0, "still_ambiguous": 0}
 		}
 
-pre_cg_reading_counts = {}
-
-output = {"directory": None, "readings": None, "readingsPostCG": None, "unknown_words": None, "tsv": None, "xml": None, "tree": None}
-
-sentence_lengths = []
-
 vislcg3_location = shutil.which("vislcg3")
 
-existing_unknown_words = []
-new_unknown_words = []
+""" The limits and delimiters VISL CG-3 cuts its windows at (see 'run_cg', and DELIMITERS and SOFT-DELIMITERS in the grammar), which the windows passed in the binary stream format are cut to match """
+cg_soft_limit, cg_hard_limit = 20, 45
+cg_delimiters = {"Atd"}
+cg_soft_delimiters = {'"<,>"', '"<;>"', '"<:>"', '"<">"', '"<)>"'}
+
+""" The sentence number in the position tag of a CG-formatted reading (see 'renumber_readings') """
+reading_sentence = re.compile(r'^(\t".*?" \{)(\d+)(?=,\d+\} )', re.M)
 
 """ A simple switch to use the 'check_coverage' options when tagging (i.e. guess untagged words using entries in the tag-token coverage and tag-sequence dictionaries)
 	--- NOTE: Leave this as True, unless producing tagged output for making new tag-token coverage and tag-sequence dictionaries
@@ -78,6 +93,20 @@ new_unknown_words = []
 check_coverage = True
 #check_coverage = False
 
+""" Each Tagger keeps a cache of the pre-CG readings for each word type, so that the lookups for a word are only done the first time it is seen (see 'reading_cache.py')
+	--- Each entry holds the word's readings split either side of its {sentence,token} position (marked by 'position_marker'), the changes it makes to the pre-CG statistics, and its number of readings
+"""
+position_marker = "\0"
+
+""" Bump this whenever a change to this file alters the readings produced for a word, so that saved reading caches are no longer used """
+reading_cache_version = "1"
+
+""" Rich POS tag -> basic POS tag, for the tags in each of the tag categories (see 'basic_tag') """
+basic_tags = {}
+for category, category_tags in tag_categories:
+	for category_tag in category_tags:
+		basic_tags.setdefault(category_tag, category)
+
 """ Load the CyTag tag-token coverage dictionary from an external .json file """
 cy_coverage = {}
 with open("{}/../lexicon/{}".format(os.path.dirname(os.path.abspath(__file__)), "CyTag_tag-token_coverage")) as coverage_file:
@@ -125,44 +154,39 @@ def find_definite_tags(token):
 		pos = "E:Egll"
 	elif re.match(r"^\d0au%", token):
 		pos = "E:Egll"
-	elif pos == "" and token in gazetteers["acronyms"]:
+	elif pos == "" and gazetteer_index.categories(token) & gazetteer_categories["acronyms"]:
 		pos = "Gw:Gwacr"
-	elif pos == "" and token.lower() in gazetteers["abbreviations"]:
+	elif pos == "" and gazetteer_index.categories(token.lower()) & gazetteer_categories["abbreviations"]:
 		pos = "Gw:Gwtalf"
 	elif pos == "" and token.lower() in ["html", "url", "http", "https"]:
 		pos = "Gw:Gwacr"
 	return pos
 
+def lexicon_readings(key, mutation=""):
+	""" Return the readings for a key in the lexicon, as [key, morphology, lemma, [English lemmas], mutation, reading head, reading tail] lists (see 'load_lexicon.py') """
+	return [[key, x["morphology"], x["lemma"], [x["lemma_en"]], mutation, x["reading_head"], x["reading_tail"]] for x in cy_lexicon.get(key, [])]
+
 def lookup_readings(token):
 	""" Lookup readings for a given token in the lexicon, and return them """
-	readings = []
-	if token in cy_lexicon:
-		readings = [[token, [tag_morphology(x["pos_enriched"])], x["lemma"], [x["lemma_en"]], ""] for x in cy_lexicon[token]]
-	elif token.lower() in cy_lexicon:
-		readings = [[token.lower(), [tag_morphology(x["pos_enriched"])], x["lemma"], [x["lemma_en"]], ""] for x in cy_lexicon[token.lower()]]
-	possible_mutations = lookup_mutation(token)
-	if len(possible_mutations) > 0:
-		for mutation in possible_mutations:
-			if mutation[0] in cy_lexicon:
-				mutation_readings = [[mutation[0], [tag_morphology(x["pos_enriched"])], x["lemma"], [x["lemma_en"]], mutation[1]] for x in cy_lexicon[mutation[0]]]
-				readings = readings + mutation_readings
+	readings = lexicon_readings(token)
+	if len(readings) == 0:
+		readings = lexicon_readings(token.lower())
+	for radical, mutation in cy_mutations.radicals(token):
+		readings.extend(lexicon_readings(radical, mutation))
 	return readings
 
 def lookup_multiple_readings(tokens):
-	""" Lookup readings for multiple tokens in the lexicon at the same time, and return them """
+	""" Lookup readings for multiple tokens in the lexicon at the same time, and return them (tokens not in the form index can't have readings, and are skipped) """
 	readings = []
 	for token in tokens:
-		if token in cy_lexicon:
-			readings = readings + [[token, [x["pos_enriched"]], x["lemma"], [x["lemma_en"]], ""] for x in cy_lexicon[token]]
-		elif token.lower() in cy_lexicon:
-			readings = readings + [[token.lower(), [x["pos_enriched"]], x["lemma"], [x["lemma_en"]], ""] for x in cy_lexicon[token.lower()]]
-		possible_mutations = lookup_mutation(token) 
-		if len(possible_mutations) > 0:
-			for mutation in possible_mutations:
-				if mutation[0] in cy_lexicon:
-					mutation_readings = [[mutation[0], 
-					[x["pos_enriched"]], x["lemma"], [x["lemma_en"]], mutation[1]] for x in cy_lexicon[mutation[0]]]
-					readings = readings + mutation_readings
+		if token.lower() not in cy_forms:
+			continue
+		token_readings = lexicon_readings(token)
+		if len(token_readings) == 0:
+			token_readings = lexicon_readings(token.lower())
+		readings.extend(token_readings)
+		for radical, mutation in cy_mutations.radicals(token):
+			readings.extend(lexicon_readings(radical, mutation))
 	return readings
 
 def format_en_lemmas(lemmas):
@@ -174,22 +198,18 @@ def format_en_lemmas(lemmas):
 	en_lemma_string = " ".join(formatted_lemmas)
 	return en_lemma_string
 
-def format_multireading_lookup(readings, token, token_position):
+def format_multireading_lookup(readings, token, token_position, pre_cg_stats):
 	""" Format the results of a multi-reading lookup as the 'contents' string(s) of a single Welsh CG reading """
 	reading_string = ""
 	if len(readings) > 0:
-		for reading in readings:
-			en_lemmas = format_en_lemmas(reading[3])
-			morphology = tag_morphology(reading[1][0])
-			tags = " ".join(morphology)
-			reading_string += "\t\"{}\" {{{}}} [cy] {} {}\n".format(reading[2], token_position, tags, en_lemmas)
-		stats["pre-cg"]["with_readings"] += 1
+		reading_string = "".join("\t" + reading[5] + token_position + reading[6] + "\n" for reading in readings)
+		pre_cg_stats["with_readings"] += 1
 	else:
-		reading_string += "\t\"{}\" {{{}}} {}\n".format(token, token_position, "unk")
-		stats["pre-cg"]["without_readings"] += 1
+		reading_string = "\t\"{}\" {{{}}} {}\n".format(token, token_position, "unk")
+		pre_cg_stats["without_readings"] += 1
 	return reading_string
 
-def handle_empty_lookup(token):
+def handle_empty_lookup(token, pre_cg_stats):
 	""" Produce readings for tokens that didn't return anything during a regular lookup, focusing on:
 		---	Tokens that are capitalised (that we assume to be proper nouns)
 		--- Tokens that we know to be common contractions
@@ -207,23 +227,23 @@ def handle_empty_lookup(token):
 			readings = lookup_multiple_readings([deaccent])
 			if len(readings) > 0:
 				count_readings = True
-				reading_string += format_multireading_lookup(readings, token[0], token[1])
-				stats["pre-cg"]["with_readings"] += 1
-				stats["pre-cg"]["non-standard"] += 1
+				reading_string += format_multireading_lookup(readings, token[0], token[1], pre_cg_stats)
+				pre_cg_stats["with_readings"] += 1
+				pre_cg_stats["non-standard"] += 1
 	if token[0].lower() in contractions_and_prefixes.keys():
 		if contractions_and_prefixes[token[0].lower()][0] == "contraction":
 			readings = lookup_multiple_readings(contractions_and_prefixes[token[0].lower()][1])	
 			if len(readings) > 0:
 				count_readings = True
-				reading_string += format_multireading_lookup(readings, token[0], token[1])
-				stats["pre-cg"]["with_readings"] += 1
+				reading_string += format_multireading_lookup(readings, token[0], token[1], pre_cg_stats)
+				pre_cg_stats["with_readings"] += 1
 	elif token[0].lower() in contractions_and_prefixes.keys():
 		if contractions_and_prefixes[token[0].lower()][0] == "contraction":
 			readings = lookup_multiple_readings(contractions_and_prefixes[token[0].lower()][1])
 			if len(readings) > 0:
 				count_readings = True
-				reading_string += format_multireading_lookup(readings, token[0], token[1])
-				stats["pre-cg"]["with_readings"] += 1
+				reading_string += format_multireading_lookup(readings, token[0], token[1], pre_cg_stats)
+				pre_cg_stats["with_readings"] += 1
 	else:
 		if token[0].find("-") != -1 and len(set(token[0])) < 1:
 			no_spaces = "".join(token_parts)
@@ -231,60 +251,58 @@ def handle_empty_lookup(token):
 			readings = lookup_multiple_readings([no_spaces, spaces])
 			if len(readings) > 0:
 				count_readings = True
-				reading_string += format_multireading_lookup(readings, token[0], token[1])
-				stats["pre-cg"]["with_readings"] += 1
+				reading_string += format_multireading_lookup(readings, token[0], token[1], pre_cg_stats)
+				pre_cg_stats["with_readings"] += 1
 			elif len(token_parts) == 2 and (token_parts[0] + "-") in contractions_and_prefixes:
 				readings = lookup_multiple_readings([token_parts[1]])
 				for reading in readings:
-					morphology = tag_morphology(reading[1][0])
-					tags = " ".join(tag_morphology(reading[1][0]))
-					reading_string += "\t\"{}\" {{{}}} [cy] {} :{}:\n".format(token[0].lower(), token[1], tags, "-")
+					reading_string += "\t\"{}\" {{{}}} [cy] {} :{}:\n".format(token[0].lower(), token[1], reading[1], "-")
 				if len(readings) > 0:
 					count_readings = True
-					stats["pre-cg"]["with_readings"] += 1
+					pre_cg_stats["with_readings"] += 1
 		if token[0][-1:] == "'":
 			readings = lookup_multiple_readings(["{}f".format(token[0][:-1]), "{}r".format(token[0][:-1]), "{}l".format(token[0][:-1])])
 			if len(readings) > 0:
 				count_readings = True
-				reading_string += format_multireading_lookup(readings, token[0], token[1])
-				stats["pre-cg"]["with_readings"] += 1
-				stats["pre-cg"]["non-standard"] += 1
+				reading_string += format_multireading_lookup(readings, token[0], token[1], pre_cg_stats)
+				pre_cg_stats["with_readings"] += 1
+				pre_cg_stats["non-standard"] += 1
 		if token[0][-1:] in ["a", "e"]:
 			""" Check for endings spelled with "e"/"a" instead of "au" or "ai" """
 			readings = lookup_multiple_readings(["{}au".format(token[0][:-1]), "{}ai".format(token[0][:-1]), "{}ae".format(token[0][:-1])])
 			if len(readings) > 0:
 				count_readings = True
-				reading_string += format_multireading_lookup(readings, token[0], token[1])
-				stats["pre-cg"]["with_readings"] += 1
-				stats["pre-cg"]["non-standard"] += 1
+				reading_string += format_multireading_lookup(readings, token[0], token[1], pre_cg_stats)
+				pre_cg_stats["with_readings"] += 1
+				pre_cg_stats["non-standard"] += 1
 		if token[0][-1:] in ["a", "â", "e", "ê", "i", "î", "o", "ô", "u", "û", "w", "ŵ", "y", "ŷ"]:
 			readings = lookup_multiple_readings(["{}f".format(token[0])])
 			if len(readings) > 0:
 				count_readings = True
-				reading_string += format_multireading_lookup(readings, token[0], token[1])
-				stats["pre-cg"]["with_readings"] += 1
-				stats["pre-cg"]["non-standard"] += 1
+				reading_string += format_multireading_lookup(readings, token[0], token[1], pre_cg_stats)
+				pre_cg_stats["with_readings"] += 1
+				pre_cg_stats["non-standard"] += 1
 		if token[0][-1:] in ["b", "c", "d", "f", "g", "h", "j", "l", "m", "n", "p", "r", "s", "t"] or token[0][-2:] in ["ch", "dd", "ff", "ng", "ll", "ph", "rh", "th"]:
 			readings = lookup_multiple_readings(["{}r".format(token[0]), "{}l".format(token[0])])
 			if len(readings) > 0:
 				count_readings = True
-				reading_string += format_multireading_lookup(readings, token[0], token[1])
-				stats["pre-cg"]["with_readings"] += 1
-				stats["pre-cg"]["non-standard"] += 1
+				reading_string += format_multireading_lookup(readings, token[0], token[1], pre_cg_stats)
+				pre_cg_stats["with_readings"] += 1
+				pre_cg_stats["non-standard"] += 1
 		if token[0][-2:] in ["es"]:
 			readings = lookup_multiple_readings(["{}ais".format(token[0][:-2])])
 			if len(readings) > 0:
 				count_readings = True
-				reading_string += format_multireading_lookup(readings, token[0], token[1])
-				stats["pre-cg"]["with_readings"] += 1
-				stats["pre-cg"]["non-standard"] += 1
+				reading_string += format_multireading_lookup(readings, token[0], token[1], pre_cg_stats)
+				pre_cg_stats["with_readings"] += 1
+				pre_cg_stats["non-standard"] += 1
 		if token[0][-3:] in ["est"]:
 			readings = lookup_multiple_readings(["{}aist".format(token[0][:-3])])
 			if len(readings) > 0:
 				count_readings = True
-				reading_string += format_multireading_lookup(readings, token[0], token[1])
-				stats["pre-cg"]["with_readings"] += 1
-				stats["pre-cg"]["non-standard"] += 1
+				reading_string += format_multireading_lookup(readings, token[0], token[1], pre_cg_stats)
+				pre_cg_stats["with_readings"] += 1
+				pre_cg_stats["non-standard"] += 1
 		if token[0].find('e', 1, len(token[0])-1) != -1:
 			if token[0].index("e") not in [0, len(token[0])-1]:
 				split_e = token[0][1:len(token[0])-1].split("e")
@@ -294,29 +312,29 @@ def handle_empty_lookup(token):
 				readings = lookup_multiple_readings([join_ae, join_ai, join_au])
 				if len(readings) > 0:
 					count_readings = True
-					reading_string += format_multireading_lookup(readings, token[0], token[1])
-					stats["pre-cg"]["with_readings"] += 1
-					stats["pre-cg"]["non-standard"] += 1
+					reading_string += format_multireading_lookup(readings, token[0], token[1], pre_cg_stats)
+					pre_cg_stats["with_readings"] += 1
+					pre_cg_stats["non-standard"] += 1
 		if token[0].find("'") != -1:
 			no_apos = "".join(token[0].split("'"))
 			readings = lookup_multiple_readings([no_apos])
 			if len(readings) > 0:
 				count_readings = True
-				reading_string += format_multireading_lookup(readings, token[0], token[1])
-				stats["pre-cg"]["with_readings"] += 1
+				reading_string += format_multireading_lookup(readings, token[0], token[1], pre_cg_stats)
+				pre_cg_stats["with_readings"] += 1
 		if token[0].find("nn") != -1:
 			single_n = token[0].replace("nn", "n")
 			readings = lookup_multiple_readings([single_n])
 			if len(readings) > 0:
 				count_readings = True
-				reading_string += format_multireading_lookup(readings, token[0], token[1])
-				stats["pre-cg"]["with_readings"] += 1
-				stats["pre-cg"]["non-standard"] += 1
+				reading_string += format_multireading_lookup(readings, token[0], token[1], pre_cg_stats)
+				pre_cg_stats["with_readings"] += 1
+				pre_cg_stats["non-standard"] += 1
 		if not count_readings == True:
 			if token[0].lower() in en_dict:
 				reading_string += "\t\"{}\" {{{}}} [en] {} :{}:\n".format(token[0], token[1], "Gw est", token[0].lower())
-				stats["pre-cg"]["with_readings"] += 1
-				stats["pre-cg"]["non_welsh"] += 1
+				pre_cg_stats["with_readings"] += 1
+				pre_cg_stats["non_welsh"] += 1
 			else:
 				not_alpha = 0
 				not_welsh = 0
@@ -327,49 +345,56 @@ def handle_empty_lookup(token):
 						not_alpha += 1
 				if not_alpha > 0:
 					reading_string += "\t\"{}\" {{{}}} [cy] {} :{}:\n".format(token[0], token[1], "Gw ann", token[0].lower())
-					stats["pre-cg"]["with_readings"] += 1
-					stats["pre-cg"]["non_alpha"] += 1
+					pre_cg_stats["with_readings"] += 1
+					pre_cg_stats["non_alpha"] += 1
 				elif set(token[0]) == {'x'}:
 					reading_string += "\t\"{}\" {{{}}} [cy] {} :{}:\n".format(token[0], token[1], "Gw sym", token[0].lower())
-					stats["pre-cg"]["with_readings"] += 1
-					stats["pre-cg"]["non_alpha"] += 1
+					pre_cg_stats["with_readings"] += 1
+					pre_cg_stats["non_alpha"] += 1
 				else:
 					if token[0].isupper():
 						reading_string += "\t\"{}\" {{{}}} [cy] {} :{}:\n".format(token[0], token[1], "Gw acr", token[0])
-						stats["pre-cg"]["with_readings"] += 1
+						pre_cg_stats["with_readings"] += 1
 					elif token[0].lower() in en_dict_full:
 						reading_string += "\t\"{}\" {{{}}} [en] {} :{}:\n".format(token[0], token[1], "Gw est", token[0].lower())
-						stats["pre-cg"]["with_readings"] += 1
-						stats["pre-cg"]["non_welsh"] += 1
+						pre_cg_stats["with_readings"] += 1
+						pre_cg_stats["non_welsh"] += 1
 					elif not_welsh > 0:
 						reading_string += "\t\"{}\" {{{}}} [en] {} :{}:\n".format(token[0], token[1], "Gw est", token[0].lower())
-						stats["pre-cg"]["with_readings"] += 1
-						stats["pre-cg"]["non_welsh"] += 1
+						pre_cg_stats["with_readings"] += 1
+						pre_cg_stats["non_welsh"] += 1
 					else:
 						reading_string += "\t\"{}\" {{{}}} {}\n".format(token[0], token[1], "unk")
-						stats["pre-cg"]["without_readings"] += 1
+						pre_cg_stats["without_readings"] += 1
 					if token[0][0].isupper():
 						reading_string += "\t\"{}\" {{{}}} [cy] {} :{}:\n".format(token[0], token[1], "E p", token[0])
 						reading_string += "\t\"{}\" {{{}}} [cy] {} :{}:\n".format(token[0], token[1], "E p b", token[0])
-						stats["pre-cg"]["assumed_proper"] += 1
+						pre_cg_stats["assumed_proper"] += 1
 	return(reading_string, count_readings)
 
-def get_reading(token_id, token):
-	""" Get CG-formatted readings for a given token """
+def type_reading(word):
+	""" Produce the reading cache entry for a word: its readings split either side of the position, the changes they make to the pre-CG statistics, and how many there are """
+	pre_cg_stats = dict.fromkeys(new_stats()["pre-cg"], 0)
+	readings_string, reading_count = build_reading([word, position_marker], pre_cg_stats)
+	stat_changes = {stat: count for stat, count in pre_cg_stats.items() if count != 0}
+	return [readings_string.split(position_marker), stat_changes, reading_count]
+
+def build_reading(token, pre_cg_stats):
+	""" Build CG-formatted readings for a given token, returning them with the number of readings found (and counting them in the given pre-CG statistics) """
 	readings_string = ""
 	readings = []
 	if token[0] in "\\":
 		readings.append("definite")
-		stats["pre-cg"]["with_readings"] += 1
-		stats["pre-cg"]["definite_tag"] += 1
+		pre_cg_stats["with_readings"] += 1
+		pre_cg_stats["definite_tag"] += 1
 		readings_string = "\"<\\{}>\"\n\t\"\\{}\" {{{}}} [cy] {} :backslash:\n".format(token[0], token[0], token[1], "Atdcys")
 	else:
 		pos = find_definite_tags(token[0])
 		""" token[0] = token; token[1] = sentence number, token count (e.g. 3,12) """
 		if pos == "Anon:Anon":
 			readings.append("definite")
-			stats["pre-cg"]["with_readings"] += 1
-			stats["pre-cg"]["definite_tag"] += 1
+			pre_cg_stats["with_readings"] += 1
+			pre_cg_stats["definite_tag"] += 1
 			if token[0][0:7] == "[*anon>":
 				readings_string = "\"<{}>\"\n\t\"{}\" {{{}}} [cy] {} :{}:\n".format(token[0][7:-8], token[0][7:-8], token[1], " ".join(tag_morphology(pos[pos.index(":")+1:])), token[0][7:-8])
 			elif token[0][0:3] == "[*S" and token[0][-2:] == "*]":
@@ -382,9 +407,9 @@ def get_reading(token_id, token):
 				readings_string = "\"<{}>\"\n\t\"{}\" {{{}}} [cy] {} :{}:\n".format(token[0][5:-6], token[0][5:-6], token[1], " ".join(tag_morphology(pos[pos.index(":")+1:])), token[0][5:-6])
 			else:
 				readings_string = "\"<{}>\"\n\t\"{}\" {{{}}} [cy] {} :{}:\n".format(token[0][4:-5], token[0][4:-5], token[1], " ".join(tag_morphology(pos[pos.index(":")+1:])), token[0][4:-5])
-			stats["pre-cg"]["with_readings"] += 1
-			stats["pre-cg"]["definite_tag"] += 1
-			stats["pre-cg"]["non_welsh"] += 1
+			pre_cg_stats["with_readings"] += 1
+			pre_cg_stats["definite_tag"] += 1
+			pre_cg_stats["non_welsh"] += 1
 		elif pos == "Gw:Gwann":
 			token[0] = token[0].replace("~", "")
 			if token[0] in ["[", "]"]:
@@ -393,26 +418,26 @@ def get_reading(token_id, token):
 				elif token[0] == "]":
 					pos = "Atd:Atdde"
 				readings_string = "\"<{}>\"\n\t\"{}\" {{{}}} [cy] {} :{}:\n".format(token[0], token[0], token[1], " ".join(tag_morphology(pos[pos.index(":")+1:])), token[0])
-				stats["pre-cg"]["with_readings"] += 1
-				stats["pre-cg"]["definite_tag"] += 1
-				stats["pre-cg"]["non_alpha"] += 1
+				pre_cg_stats["with_readings"] += 1
+				pre_cg_stats["definite_tag"] += 1
+				pre_cg_stats["non_alpha"] += 1
 			else:
 				readings_string = "\"<{}>\"\n\t\"{}\" {{{}}} [cy] {} :{}:\n".format(token[0], token[0], token[1], " ".join(tag_morphology(pos[pos.index(":")+1:])), token[0])
-				stats["pre-cg"]["with_readings"] += 1
-				stats["pre-cg"]["definite_tag"] += 1
-				stats["pre-cg"]["non_alpha"] += 1		
+				pre_cg_stats["with_readings"] += 1
+				pre_cg_stats["definite_tag"] += 1
+				pre_cg_stats["non_alpha"] += 1		
 		elif pos != "" and (pos[:pos.index(":")] == "Atd" or pos[pos.index(":")+1:] in ["Gwsym", "Gwdig", "Gwacr", "Gwtalf"]):
 			readings.append("definite")
 			readings_string = "\"<{}>\"\n\t\"{}\" {{{}}} [cy] {} :{}:\n".format(token[0], token[0], token[1], " ".join(tag_morphology(pos[pos.index(":")+1:])), token[0])
-			stats["pre-cg"]["with_readings"] += 1
-			stats["pre-cg"]["definite_tag"] += 1
-			stats["pre-cg"]["non_alpha"] += 1
+			pre_cg_stats["with_readings"] += 1
+			pre_cg_stats["definite_tag"] += 1
+			pre_cg_stats["non_alpha"] += 1
 		else:
 			token[0] = token[0].replace(" ", "_")
 			readings_string += "\"<{}>\"\n".format(token[0])
 			readings = lookup_readings(token[0])
 			if len(readings) == 0:
-				empty_lookup, count_readings = handle_empty_lookup(token)
+				empty_lookup, count_readings = handle_empty_lookup(token, pre_cg_stats)
 				if empty_lookup != "":
 					readings_string += empty_lookup
 					if count_readings == True:
@@ -428,152 +453,154 @@ def get_reading(token_id, token):
 					for index in to_remove:
 						del readings[index]
 				for reading in readings:
-					en_lemmas = format_en_lemmas(reading[3])
-					tags = " ".join(reading[1][0])
+					""" The reading tail already holds the entry's own English lemma, so only lemmas merged in from the readings above need adding """
+					merged_lemmas = " " + format_en_lemmas(reading[3][1:]) if len(reading[3]) > 1 else ""
 					mutation_desc = " + {}".format(reading[4]) if reading[4] != "" else ""
-					readings_string += "\t\"{}\" {{{}}} [cy] {} {}{}\n".format(reading[2], token[1], tags, en_lemmas, mutation_desc)
-				stats["pre-cg"]["with_readings"] += 1
+					readings_string += "\t" + reading[5] + token[1] + reading[6] + merged_lemmas + mutation_desc + "\n"
+				pre_cg_stats["with_readings"] += 1
 	if len(readings) == 1:
-		stats["pre-cg"]["single_reading"] += 1
+		pre_cg_stats["single_reading"] += 1
 	if len(readings) > 1:
-		stats["pre-cg"]["multiple_readings"] += 1
+		pre_cg_stats["multiple_readings"] += 1
 	if len(readings) == 0:
-		stats["pre-cg"]["no_readings"] += 1
-	pre_cg_reading_counts[token_id] = len(readings)
-	return readings_string
+		pre_cg_stats["no_readings"] += 1
+	return readings_string, len(readings)
+
+def reading_cache_key():
+	""" Return the key that a saved reading cache must have been built under to be used: a fingerprint of the compiled lexicon and gazetteers, the English word lists, and the code that produces readings """
+	sources = [os.path.abspath(__file__), "{}/shared/reference_lists.py".format(os.path.dirname(os.path.abspath(__file__))), "{}/../cy_gazetteers/contractions_and_prefixes.json".format(os.path.dirname(os.path.abspath(__file__))), gazetteer_cache, en_dict.source, en_dict_full.source]
+	return file_fingerprint(sources, "{}:{}".format(reading_cache_version, table_fingerprint(lexicon_table)))
 
 def check_gazetteers(token):
 	""" Check whether a given token is present in the CyTag gazetteers """
 	tags = []
-	if token in gazetteers["givennames_m"] or token in gazetteers["givennames_f"] or token in gazetteers["surnames"] or token in gazetteers["places"]:
+	categories = gazetteer_index.categories(token)
+	if categories & proper_noun_categories:
 		tags.append("E")
-		if token in gazetteers["givennames_m"] and token not in gazetteers["givennames_f"]:
+		given_m, given_f = categories & gazetteer_categories["givennames_m"], categories & gazetteer_categories["givennames_f"]
+		if given_m and not given_f:
 			tags.append("Epg")
-		elif token in gazetteers["givennames_f"] and token not in gazetteers["givennames_m"]:
+		elif given_f and not given_m:
 			tags.append("Epb")
-		elif token in gazetteers["givennames_f"] and token in gazetteers["givennames_m"]:
+		elif given_f and given_m:
 			tags.append("Ep")
-		elif token in gazetteers["surnames"] or token in gazetteers["places"]:
+		elif categories & (gazetteer_categories["surnames"] | gazetteer_categories["places"]):
 			tags.append("Ep")
-	elif token.lower() in trade_names:
+	elif gazetteer_index.categories(token.lower()) & gazetteer_categories["other_proper"]:
 		tags.append("E")
 		tags.append("Ep")
 	else:
 		unmutated_tokens = lookup_mutation(token)
 		if len(unmutated_tokens) != 0:
-			for unmut_tok in unmutated_tokens:
-				unmut_tok = unmut_tok[0][0].upper() + unmut_tok[0][1:].lower()
-				if unmut_tok[0] in gazetteers["givennames_m"] or unmut_tok[0] in gazetteers["givennames_f"] or unmut_tok[0] in gazetteers["surnames"] or unmut_tok[0] in gazetteers["places"] or unmut_tok[0].lower() in trade_names:
-					tags = ["Ep", unmut_tok[1]]
-				else:
-					tags = ["unk", "unk"]
+			""" Only the last candidate decides the result (as when every candidate was checked in turn, each overwriting the last) """
+			unmut_tok = unmutated_tokens[-1][0][0].upper() + unmutated_tokens[-1][0][1:].lower()
+			if gazetteer_index.categories(unmut_tok[0]) & proper_noun_categories or gazetteer_index.categories(unmut_tok[0].lower()) & gazetteer_categories["other_proper"]:
+				tags = ["Ep", unmut_tok[1]]
+			else:
+				tags = ["unk", "unk"]
 		else:
 			tags = ["unk", "unk"]
 	return tags
 
 def list_readings(readings):
-	""" Convert readings in string (VISL CG-3 output) format to a list of readings and their component parts """
+	""" Convert readings in string (VISL CG-3 output) format to a list of Reading records """
 	processed_readings = []
 	for reading in readings:
-		for lemma in re.findall(r'\"(.+?)\" {', reading):
-			reading = reading.replace(lemma, lemma.replace(" ", "_"))
 		mutation = None
-		info = re.split(r"\s+", reading.strip())
+		info = reading_fields(reading)
 		if info[-2] == "+":
-			mutation = "\t+{}".format(info[-1])
+			mutation = "+{}".format(info[-1])
 			info = info[:-2]
 		i = len(info)-1
 		while len(info[i]) > 1 and info[i][:1] == ":" and info[i][-1:] == ":":
 			info = info[:-1]
 			i = i - 1
 		pos_tag = " ".join(info[3:])
-		processed_readings.append([info[1][1:-1], info[0][1:-1], pos_tag, mutation])
+		processed_readings.append(Reading(info[1][1:-1], info[0][1:-1], pos_tag, mutation))
 	return(processed_readings)
 
+def basic_tag(rich_tag):
+	""" Return the basic POS tag for a rich POS tag (or the rich tag itself, if it isn't in any of the tag categories) """
+	return basic_tags.get(rich_tag, rich_tag)
+
 def process_still_ambiguous(token_id, token, readings, token_position):
-	""" Return an appropriate string of tab-separated values for a token that couldn't be disambiguated """
+	""" Return a TaggedToken for a token that couldn't be disambiguated, listing all of its possible lemmas and tags """
 	processed_readings = list_readings(readings)
-	possible_lemmas = [x[1].replace("_", " ") for x in processed_readings]
-	possible_tags = [x[2].replace(" ", "") for x in processed_readings]
-	possible_basics = []
-	for tag in possible_tags:
-		basic = [x[0] for x in tag_categories if tag in x[1]][0] if len([x[0] for x in tag_categories if tag in x[1]]) > 0 else tag
-		possible_basics.append(basic)
-	processed_token = "{}\t{}\t{}\t{}\t{}\t{}\t".format(token_id, token, processed_readings[0][0], " | ".join(possible_lemmas), " | ".join(possible_basics), " | ".join(possible_tags))
-	return(processed_token)
+	possible_lemmas = [x.lemma.replace("_", " ") for x in processed_readings]
+	possible_tags = [x.tags.replace(" ", "") for x in processed_readings]
+	possible_basics = [basic_tag(tag) for tag in possible_tags]
+	return(TaggedToken(token_id, token, processed_readings[0].position, " | ".join(possible_lemmas), " | ".join(possible_basics), " | ".join(possible_tags)))
 
-def process_multiple_reading(token_id, token, readings):
-	""" Return a token with multiple readings as a string of tab-separated values """
-	processed_token = ""
+def process_multiple_reading(token_id, token, readings, post_cg_stats):
+	""" Return a TaggedToken for a token with multiple readings (or None, if it couldn't be disambiguated) """
+	processed_token = None
 	processed_readings = list_readings(readings)
-	position, lemma = processed_readings[0][0], processed_readings[0][1].replace("_", " ")
+	position, lemma = processed_readings[0].position, processed_readings[0].lemma.replace("_", " ")
 	if lemma == "":
 		lemma = token
 	checked_tags = check_gazetteers(token)
 	if checked_tags != ["unk", "unk"]:
-		processed_token = "{}\t{}\t{}\t{}\t{}\t{}\t".format(token_id, token, position, lemma, checked_tags[0], checked_tags[1])
-		stats["post-cg"]["disambiguated"] += 1
-		stats["post-cg"]["ambiguous_gazetteer"] += 1
+		processed_token = TaggedToken(token_id, token, position, lemma, checked_tags[0], checked_tags[1])
+		post_cg_stats["disambiguated"] += 1
+		post_cg_stats["ambiguous_gazetteer"] += 1
 	else:
 		if check_coverage == True:
 			if token in cy_coverage.keys():
 				tags = cy_coverage[token].split(":")
-				processed_token = "{}\t{}\t{}\t{}\t{}\t{}\t".format(token_id, token, position, lemma, tags[0], tags[1])
-				stats["post-cg"]["disambiguated"] += 1
-				stats["post-cg"]["in_coverage"] += 1
+				processed_token = TaggedToken(token_id, token, position, lemma, tags[0], tags[1])
+				post_cg_stats["disambiguated"] += 1
+				post_cg_stats["in_coverage"] += 1
 			else:
-				stats["post-cg"]["undisambiguated"] += 1
-				stats["post-cg"]["still_ambiguous"] += 1
+				post_cg_stats["undisambiguated"] += 1
+				post_cg_stats["still_ambiguous"] += 1
 		else:
-			stats["post-cg"]["undisambiguated"] += 1
-			stats["post-cg"]["still_ambiguous"] += 1
+			post_cg_stats["undisambiguated"] += 1
+			post_cg_stats["still_ambiguous"] += 1
 	return(processed_token)
 
-def process_double_reading(token_id, token, readings):
-	""" Return a token that has two readings as a string of tab-separated values """
-	processed_token = ""
+def process_double_reading(token_id, token, readings, post_cg_stats):
+	""" Return a TaggedToken for a token that has two readings (or None, if it couldn't be disambiguated) """
+	processed_token = None
 	processed_readings = list_readings(readings)
-	position, lemma = processed_readings[0][0], processed_readings[0][1].replace("_", " ")
+	position, lemma = processed_readings[0].position, processed_readings[0].lemma.replace("_", " ")
 	if lemma == "":
 		lemma = token
-	if "E p b" in [x[2] for x in processed_readings] and "E p g" in [x[2] for x in processed_readings]:
+	reading_tags = [x.tags for x in processed_readings]
+	if "E p b" in reading_tags and "E p g" in reading_tags:
 		checked_tags = check_gazetteers(token)
 		if checked_tags == ["unk", "unk"]:
-			processed_token = "{}\t{}\t{}\t{}\tE\tEp\t".format(token_id, token, position, lemma)
-			stats["post-cg"]["neutral_pns"] += 1
-			stats["post-cg"]["disambiguated"] += 1
+			processed_token = TaggedToken(token_id, token, position, lemma, "E", "Ep")
+			post_cg_stats["neutral_pns"] += 1
+			post_cg_stats["disambiguated"] += 1
 		else:
-			processed_token = "{}\t{}\t{}\t{}\t{}\t{}\t".format(token_id, token, position, lemma, checked_tags[0], checked_tags[1])
-			stats["post-cg"]["disambiguated"] += 1
-			stats["post-cg"]["pns_gazetteer"] += 1
-	elif [x[2] for x in processed_readings][0] == [x[2] for x in processed_readings][1]:
-		rich_tag = processed_readings[0][2].replace(" ", "")
-		basic_tag = [x[0] for x in tag_categories if rich_tag in x[1]][0] if len([x[0] for x in tag_categories if rich_tag in x[1]]) > 0 else rich_tag
-		processed_token = "{}\t{}\t{}\t{}\t{}\t{}\t".format(token_id, token, position, lemma, basic_tag, rich_tag)
-		stats["post-cg"]["disambiguated"] += 1
-		stats["post-cg"]["same_tag"] += 1
+			processed_token = TaggedToken(token_id, token, position, lemma, checked_tags[0], checked_tags[1])
+			post_cg_stats["disambiguated"] += 1
+			post_cg_stats["pns_gazetteer"] += 1
+	elif reading_tags[0] == reading_tags[1]:
+		rich_tag = reading_tags[0].replace(" ", "")
+		processed_token = TaggedToken(token_id, token, position, lemma, basic_tag(rich_tag), rich_tag)
+		post_cg_stats["disambiguated"] += 1
+		post_cg_stats["same_tag"] += 1
 	else:
 		if check_coverage == True:
 			if token in cy_coverage.keys():
 				tags = cy_coverage[token].split(":")
-				processed_token = "{}\t{}\t{}\t{}\t{}\t{}\t".format(token_id, token, position, lemma, tags[0], tags[1])
-				stats["post-cg"]["disambiguated"] += 1
-				stats["post-cg"]["in_coverage"] += 1
+				processed_token = TaggedToken(token_id, token, position, lemma, tags[0], tags[1])
+				post_cg_stats["disambiguated"] += 1
+				post_cg_stats["in_coverage"] += 1
 			else:
-				stats["post-cg"]["undisambiguated"] += 1
-				stats["post-cg"]["still_ambiguous"] += 1
+				post_cg_stats["undisambiguated"] += 1
+				post_cg_stats["still_ambiguous"] += 1
 		else:
-			stats["post-cg"]["undisambiguated"] += 1
-			stats["post-cg"]["still_ambiguous"] += 1
+			post_cg_stats["undisambiguated"] += 1
+			post_cg_stats["still_ambiguous"] += 1
 	return(processed_token)
 
-def process_single_reading(token_id, token, reading):
-	""" Return a token with a single reading as a string of tab-separated values """
-	processed_token = ""
-	position, lemma, mutation, basic_tag, rich_tag = "", "", "", "", ""
-	for quoted_lemma in re.findall(r'\"([^{]+?)\" ', reading):
-		reading = reading.replace(quoted_lemma, quoted_lemma.replace(" ", "_"))
-	info = re.split(r"\s+", reading.strip())
+def process_single_reading(token_id, token, reading, post_cg_stats, unknown_words=None):
+	""" Return a TaggedToken for a token with a single reading (adding it to a set of unknown words, if one is given and the token is unknown) """
+	processed_token = None
+	position, lemma, mutation, rich_tag = "", "", "", ""
+	info = reading_fields(reading, single_lemma_field)
 	position, lemma = info[1][1:-1], info[0][1:-1].replace("_", " ")
 	if lemma == "":
 		lemma = token
@@ -585,146 +612,31 @@ def process_single_reading(token_id, token, reading):
 		while len(info[i]) > 1 and info[i][:1] == ":" and info[i][-1:] == ":":
 			info = info[:-1]
 			i = i - 1
-		pos_tag = " ".join(info[3:])
-		rich_tag = pos_tag.replace(" ", "")
-		basic_tag = [x[0] for x in tag_categories if rich_tag in x[1]][0] if len([x[0] for x in tag_categories if rich_tag in x[1]]) > 0 else rich_tag
+		rich_tag = "".join(info[3:])
 		if token == "\\\\":
 			token = "\\"
 			lemma = "\\"
-		processed_token = "{}\t{}\t{}\t{}\t{}\t{}\t{}".format(token_id, token, position, lemma, basic_tag, rich_tag, mutation)
-		stats["post-cg"]["disambiguated"] += 1
-		stats["post-cg"]["one_reading"] += 1
+		processed_token = TaggedToken(token_id, token, position, lemma, basic_tag(rich_tag), rich_tag, mutation)
+		post_cg_stats["disambiguated"] += 1
+		post_cg_stats["one_reading"] += 1
 	else:
 		checked_tags = check_gazetteers(token)
 		if checked_tags == ["unk", "unk"]:
-			processed_token = "{}\t{}\t{}\t{}\tunk\tunk\t".format(token_id, token, position, lemma)
-			stats["post-cg"]["undisambiguated"] += 1
-			if output["unknown_words"] != None:
-				new_unknown_words.append(token)
+			processed_token = TaggedToken(token_id, token, position, lemma, "unk", "unk")
+			post_cg_stats["undisambiguated"] += 1
+			if unknown_words != None:
+				unknown_words.add(token)
 		elif checked_tags[0] == "Ep":
-			processed_token = "{}\t{}\t{}\t{}\t{}\t{}\t+{}".format(token_id, token, position, lemma, "E", "Ep", checked_tags[1])
-			stats["post-cg"]["disambiguated"] += 1
-			stats["post-cg"]["unknown_gazetteer"] += 1
+			processed_token = TaggedToken(token_id, token, position, lemma, "E", "Ep", "+{}".format(checked_tags[1]))
+			post_cg_stats["disambiguated"] += 1
+			post_cg_stats["unknown_gazetteer"] += 1
 		else:
-			processed_token = "{}\t{}\t{}\t{}\t{}\t{}\t".format(token_id, token, position, lemma, checked_tags[0], checked_tags[1])
-			stats["post-cg"]["disambiguated"] += 1
-			stats["post-cg"]["unknown_gazetteer"] += 1
-		stats["post-cg"]["unknown"] += 1
+			processed_token = TaggedToken(token_id, token, position, lemma, checked_tags[0], checked_tags[1])
+			post_cg_stats["disambiguated"] += 1
+			post_cg_stats["unknown_gazetteer"] += 1
+		post_cg_stats["unknown"] += 1
 	return(processed_token)
 
-def append_xml_token(token_parts, reading_count):
-	""" Format a token and append it to the XML output tree """
-	token = etree.Element("token")
-	token.attrib["id"] = token_parts[0]
-	token.attrib["readings"] = str(pre_cg_reading_counts[int(token_parts[0])]) #str(reading_count)
-	token.attrib["lemma"] = token_parts[3]
-	token.attrib["basic_pos"] = token_parts[4]
-	token.attrib["rich_pos"] = token_parts[5]
-	if token_parts[6] != "":
-		token.attrib["mutation"] = token_parts[6]
-	token.attrib["position"] = token_parts[2]
-	token.text = token_parts[1]
-	#xml_tree = output["tree"]
-	sentence = output["tree"].xpath("file/sentence[@id='{}']".format(token_parts[2].split(",")[0]))[0]
-	sentence.append(token)
-	#output["tree"] = xml_tree
-
-def process_cg_token(token_id, token_readings, token_position):
-	""" Process a given token and its readings, returning it as a string of tab-separated values """
-	token, readings = token_readings[0][2:-2], token_readings[1:]
-	processed_token = ""
-	if len(readings) == 1:
-		processed_token = process_single_reading(token_id, token, readings[0])
-	else:
-		stats["post-cg"]["multiple_readings"] += 1
-		if len(readings) == 2:
-			processed_token = process_double_reading(token_id, token, readings)
-		else:
-			processed_token = process_multiple_reading(token_id, token, readings)
-	if processed_token == "":
-		processed_token = process_still_ambiguous(token_id, token, readings, token_position)
-	if output["xml"] != None:
-		append_xml_token(processed_token.split("\t"), len(readings))
-	sentence = processed_token.split("\t")[2].split(",")[0]
-	return("{}\n".format(processed_token))
-
-def get_token_position(current_reading):
-	""" Get the sentence position (first or last word, or somewhere in the middle) for a given token """
-	current_position = re.search(r"{\d+,\d+}", current_reading).group()[1:-1]
-	sentence, token = current_position.split(",")
-	sentence_length = sentence_lengths[int(sentence)-1]
-	if sentence_length < 3:
-		return("small_sentence")
-	else:
-		if int(token) == 1:
-			return("first")
-		else:
-			if int(token) == sentence_length:
-				return("last")
-			else:
-				return("mid")
-
-def map_cg(cg_output, mapping_bar=None):
-	""" Map CG output to tokens as CyTag-formatted tab separated values """
-	mapped_output = ""
-	cg_readings = []
-	cg_readingcount = 0
-	cg_tokens = cg_output.strip().splitlines()
-	for i, line in enumerate(cg_tokens):
-		if line != "":
-			if "~EOS~" not in line:
-				if line[:1] != "\t":
-					cg_readings.append([line])
-					cg_readingcount += 1
-					if cg_readingcount > 1:
-						if mapping_bar != None:
-							mapping_bar.next()
-						mapped_output += process_cg_token(cg_readingcount-1, cg_readings[cg_readingcount-2], get_token_position(cg_readings[cg_readingcount-2][1]))
-				else:
-					cg_readings[cg_readingcount-1].append(line)
-	if mapping_bar != None:
-			mapping_bar.next()
-	mapped_output += process_cg_token(cg_readingcount, cg_readings[cg_readingcount-1], get_token_position(cg_readings[cg_readingcount-1][1]))
-	if mapping_bar != None:
-		mapping_bar.finish()
-	return(mapped_output)
-
-def run_cg(cg_readings, vislcg3_location):
-	""" Given a set of CG-formatted readings, run VISL CG-3 """
-	cg_process = subprocess.Popen([vislcg3_location, '--soft-limit', '20', '--hard-limit', "45", "-v", "0", '-g', '{}/../grammars/cy_grammar_2020'.format(os.path.dirname(os.path.abspath(__file__)))], stdin=subprocess.PIPE, stdout=subprocess.PIPE)
-	cg_output = cg_process.communicate(input=cg_readings.encode("utf-8"))[0]
-	return(cg_output.decode("utf-8"))
-
-def sentence_readings(tokenised_sentence, total_tokens, eof="N"):
-	""" Return a set of CG-formatted readings for a tokenised sentence """
-	tokens = tokenised_sentence.splitlines()
-	sentence_lengths.append(len(tokens))
-	readings = ""
-	for i, token in enumerate([token.split("\t") for token in tokens]):
-		""" token[1] = the token; token[2] = sentence number and token position (e.g. 3,12) """
-		retrieved_readings = get_reading(total_tokens+i+1, [token[1], token[2]])
-		readings += retrieved_readings
-		#pre_cg_reading_counts[len(pre_cg_reading_counts.keys())+1] = len(retrieved_readings.strip().split("\n"))-1
-
-	if output["readings"] != None:
-		if eof == "Y":
-			readings += '"<~EOS~>"' + "\n" + '\t"~EOS~" {0,0} [cy] Atd t :~EOS~:' + "\n"
-		else:
-			readings += "\n"
-		print(readings, file=output["readings"])
-	return readings
-
-def print_cytag(cytag_output, filename_dict):
-	filename = ""
-	for line in cytag_output.splitlines():
-		if line != "":
-			lineparts = line.split("\t")
-			sentence = int(lineparts[2].split(",")[0])
-			if sentence in filename_dict:
-				filename = filename_dict[sentence]
-		line = filename + "\t" + line
-		print(line, file=output["tsv"])
-
 def time_elapsed(started):
 	""" Calculate the elapsed time, given a start time """
 	now = int(time.time())
@@ -732,116 +644,631 @@ def time_elapsed(started):
 	h, m = divmod(m, 60)
 	return("{hour:02d}h, {min:02d}m, {sec:02d}s".format(hour=h, min=m, sec=s))
 
-def save_unknown_words():
-	""" Save the words CyTag didn't know to the appropriate output file """
-	global new_unknown_words, existing_unknown_words
-	new_unknown_words = list(set(new_unknown_words))
-	all_unknown_words = list(set(existing_unknown_words+new_unknown_words))
-	for word in all_unknown_words:
-		print(word, file=output["unknown_words"])
-
-def output_setup(output_name, directory, output_format):
-	""" Set up the necessary folders and output files for running CyTag """
-	create_folders(output_name, directory)
-	output["directory"] = "{}/../outputs/{}".format(os.path.dirname(os.path.abspath(__file__)), output_name if directory == None else directory)
-	for output_file in ["readings", "readingsPostCG"]:
-		if output_file == "readings" and os.path.exists("{}/{}_{}".format(output["directory"], output_name, output_file)):
-			os.remove("{}/{}_{}".format(output["directory"], output_name, output_file))
-			output["{}".format(output_file)] = open("{}/{}_{}".format(output["directory"], output_name, output_file), "a")
-		else:
-			output["{}".format(output_file)] = open("{}/{}_{}".format(output["directory"], output_name, output_file), "w")
-	if os.path.exists("{}/../outputs/unknown_words".format(os.path.dirname(os.path.abspath(__file__)))):
-		with open("{}/../outputs/unknown_words".format(os.path.dirname(os.path.abspath(__file__)))) as loaded_unknown_words:
-			existing_unknown_words = loaded_unknown_words.read().splitlines()
-	output["unknown_words"] = open("{}/../outputs/unknown_words".format(os.path.dirname(os.path.abspath(__file__))), "w")
-	if output_format in ["tsv", "all"]:
-		output["tsv"] = open("{}/{}.tsv".format(output["directory"], output_name), "w")
-	if output_format in ["xml", "all"]:
-		output["xml"] = open("{}/{}.xml".format(output["directory"], output_name), "w")
-
-def pos_tagger(input_data, output_name="None", directory="None", output_format=None, separate="n"):
-	filename_dict = {}
-	""" For a provided input (files, or text as a string): 
-		--- Produce a set of CG-formatted readings
-		--- Run VISL CG-3 to prune the readings
-		--- Map the CG-3 output to tokens as CyTag-formatted tab-separated values
+def window_boundary(readings):
+	""" Check whether a set of CG-formatted readings ends with a cohort that VISL CG-3 will always treat as the end of a window (one whose readings are all 'Atd' - see DELIMITERS in the grammar) """
+	last_cohort = readings.rstrip("\n").rpartition("\n\"<")[2].splitlines()[1:]
+	return len(last_cohort) > 0 and all(" [cy] Atd " in reading for reading in last_cohort)
+
+def reading_chunks(sentences, chunk_size=None, max_chunk_size=None):
+	""" Group per-sentence readings into chunks of at least 'chunk_size' tokens (or a single chunk, if no size is given), yielding (readings, token count, whether this is the last chunk).
+		Chunks only end at a window boundary, so the grammar never sees a window split between two VISL CG-3 runs, and the output is the same as running it over everything at once.
+		If a 'max_chunk_size' is given, a chunk that has reached that many tokens without a window boundary is ended anyway (after a whole sentence), so that input without sentence-final punctuation can't make a chunk grow without limit.
+		A chunk ended that way can split what would otherwise have been one window (the grammar also ends windows at its soft and hard limits, and at SOFT-DELIMITERS), so long stretches of input without sentence-final punctuation may then be tagged differently from a single run over the whole input
 	"""
-	if output_format != None and len(missing_libraries) > 0: 
-		raise ImportError("The following libraries (required when an output format is specified) are missing: {}".format(missing_libraries))
-	else:
-		readings = ""
-		total_sentences, total_tokens = 0, 0
-		started = int(time.time())
-		if output_format != None:
-			print("\ncy_postagger - A part-of-speech (POS) tagger for Welsh texts\n------------------------------------------------------------\n")
-			output_setup(output_name, directory, output_format, )
-			print("Producing readings...\n")
+	chunk, chunk_tokens = [], 0
+	for readings, token_count in sentences:
+		chunk.append(readings)
+		chunk_tokens += token_count
+		if chunk_size != None and chunk_tokens >= max(chunk_size, 1) and ((max_chunk_size != None and chunk_tokens >= max_chunk_size) or window_boundary(readings)):
+			yield "".join(chunk), chunk_tokens, False
+			chunk, chunk_tokens = [], 0
+	yield "".join(chunk), chunk_tokens, True
+
+def input_shards(input_data, shard_size, verbose=False, log=sys.stdout):
+	""" Split a list of input files into shards for tagging in parallel, each a list of (file number, file, whether the shard starts the file, segments).
+		Small files make up a shard each, and larger files are split into shards of around 'shard_size' characters, after segments that end with sentence-final punctuation (which will usually end a CG window as well)
+	"""
+	for file_id, file in enumerate(input_data):
+		if verbose:
+			print("Processing file %s of %s: %s " % (str(file_id+1), str(len(input_data)), file), file=log)
+		# The file is read a segment at a time, and a shard is only cut once another segment follows it (so the last shard of a file is only empty if the file is)
+		segments, length, starts_file, cut = [], 0, True, False
+		for segment in file_segments(file):
+			if cut:
+				yield [(file_id, file, starts_file, segments)]
+				segments, length, starts_file = [], 0, False
+			segments.append(segment)
+			length += len(segment)
+			cut = length >= shard_size and segment.rstrip().endswith((".", "!", "?"))
+		yield [(file_id, file, starts_file, segments)]
+
+""" The Tagger used by a worker process (see 'start_shard_worker') """
+shard_tagger = None
+
+def start_shard_worker(vislcg3, reading_cache_size, reading_cache_file, binary_stream=None):
+	""" Set up the Tagger for a worker process, loading the reading cache into it (see 'tag_in_parallel') """
+	global shard_tagger
+	shard_tagger = Tagger(vislcg3, reading_cache_size, binary_stream)
+	if reading_cache_file != None:
+		shard_tagger.reading_cache.load(reading_cache_file, reading_cache_key())
+
+def tag_shard(shard, chunk_size=None, keep_readings=False, keep_post_cg=False, keep_reading_counts=False, keep_unknown_words=False, keep_cache_entries=False):
+	""" Tag a shard of the input (see 'input_shards') in a worker process, numbering its sentences and tokens from 1, and return the results (with the statistics and unknown words it added) as a dictionary.
+		VISL CG-3 is only run over the sentences between the first and last window boundaries in the shard (see 'window_boundary'). The sentences before and after them (the 'head' and 'tail') may share a window with the shards either side, so they are returned untagged, with the readings and details needed to tag them when the shards are merged (see 'tag_in_parallel')
+	"""
+	run = TaggingRun(shard_tagger)
+	run.output["readings"] = io.StringIO() if keep_readings else None
+	run.output["readingsPostCG"] = io.StringIO() if keep_post_cg else None
+	run.output["unknown_words"] = io.StringIO() if keep_unknown_words else None
+	known_words = set(shard_tagger.reading_cache.entries) if keep_cache_entries else set()
+	counts = {"sentences": 0, "tokens": 0}
+	result = {"files": [], "cytag_output": [], "reading_counts": {}, "head": None, "tail": []}
+	def sentences():
+		""" Yield the readings for the sentences between the first and last window boundaries, keeping the rest as the head and tail """
+		for file_id, file, file_start, segments in shard:
+			result["files"].append((file_id, file, file_start, counts["sentences"]))
+			for readings, token_count in run.segment_readings(segments, counts, eof="Y"):
+				first_token = counts["tokens"]-token_count+1
+				result["tail"].append((readings, counts["sentences"], first_token, token_count, run.sentence_lengths.get(counts["sentences"]), [run.pre_cg_reading_counts[token_id] for token_id in range(first_token, counts["tokens"]+1)]))
+				if window_boundary(readings):
+					if result["head"] == None:
+						result["head"] = result["tail"]
+					else:
+						for sentence in result["tail"]:
+							yield sentence[0], sentence[3]
+					result["tail"] = []
+	for tagged_tokens in run.tag_chunks(shard, sentences(), counts, chunk_size=chunk_size, allow_empty=True):
+		result["cytag_output"].extend(tagged_tokens)
+		if keep_reading_counts:
+			result["reading_counts"].update(run.pre_cg_reading_counts)
+	if result["head"] == None:
+		result["head"] = []
+	result["readings"] = run.output["readings"].getvalue() if keep_readings else ""
+	result["post_cg"] = run.output["readingsPostCG"].getvalue() if keep_post_cg else ""
+	result["sentences"], result["tokens"] = counts["sentences"], counts["tokens"]
+	result["stats"] = run.stats
+	result["unknown_words"] = run.new_unknown_words
+	result["cache_entries"] = [(word, entry) for word, entry in shard_tagger.reading_cache.entries.items() if word not in known_words] if keep_cache_entries else []
+	return result
+
+def renumber_readings(readings, sentence_offset):
+	""" Move the sentence numbers in a set of CG-formatted readings on by a given offset (leaving the end-of-sentence markers at 0) """
+	return reading_sentence.sub(lambda match: match.group(1) + (str(int(match.group(2))+sentence_offset) if match.group(2) != "0" else "0"), readings)
+
+def renumber_tagged_tokens(tagged_tokens, sentence_offset, token_offset):
+	""" Move the token ids and sentence numbers of a list of TaggedTokens on by the given offsets (in place, returning the list) """
+	for tagged_token in tagged_tokens:
+		sentence, position = tagged_token.position.split(",")
+		tagged_token.id += token_offset
+		tagged_token.position = "{},{}".format(int(sentence)+sentence_offset, position)
+	return tagged_tokens
+
+class Tagger:
+	""" A POS tagger, holding the resources that are shared between (and reused across) tagging runs: the location of VISL CG-3, the vislcg3 processes that are kept running, and the reading cache.
+		Each call to 'tag' or 'iter_tag' gets its own output files, statistics and unknown words (see 'TaggingRun'), so a Tagger can be used for any number of runs, including from several threads at once
+	"""
+
+	def __init__(self, vislcg3=None, reading_cache_size=100000, binary_stream=None):
+		self.vislcg3_location = vislcg3_location if vislcg3 == None else vislcg3
+		""" Whether to pass readings to VISL CG-3 in its binary stream format (True), or in the CG text format (False) - if not given, the binary format is used if the installed vislcg3 supports it (see 'uses_binary_stream') """
+		self.binary_stream = binary_stream
+		self.reading_cache = ReadingCache(reading_cache_size)
+		self.lock = threading.Lock()
+		""" The vislcg3 processes that aren't being used by a run at the moment (see 'run_cg') """
+		self.cg_processes = []
+
+	def check_vislcg3(self):
+		if self.vislcg3_location == None or self.vislcg3_location == "" or self.vislcg3_location == bytearray():
+			raise ValueError("VISL CG-3 could not be found, and is required to continue using CyTag. Please follow the instructions in the README file to install it\n")
+
+	def cg_command(self):
+		return [self.vislcg3_location, '--soft-limit', str(cg_soft_limit), '--hard-limit', str(cg_hard_limit), "-v", "0", '-g', '{}/../grammars/cy_grammar_2020'.format(os.path.dirname(os.path.abspath(__file__)))]
+
+	def uses_binary_stream(self):
+		""" Check whether readings are passed to VISL CG-3 in its binary stream format (checking whether the installed vislcg3 supports it, the first time this is called, if it wasn't set when the Tagger was created) """
+		if self.binary_stream == None and self.vislcg3_location not in [None, "", bytearray()]:
+			self.binary_stream = binary_stream_supported(self.cg_command())
+		return self.binary_stream == True
+
+	def run_cg(self, cg_readings):
+		""" Given a set of CG-formatted readings, run VISL CG-3 (through a vislcg3 process that is kept running for later calls, with one process for each run going on at the same time).
+			The output is a binary stream (bytes) if the readings are passed in the binary stream format, and CG-formatted readings otherwise (see 'cohorts' and 'cg_text' in 'cg_stream.py')
+		"""
+		binary = self.uses_binary_stream()
+		with self.lock:
+			cg_process = self.cg_processes.pop() if len(self.cg_processes) > 0 else None
+		if cg_process == None:
+			cg_process = CGProcess(self.cg_command(), binary)
+		try:
+			if binary:
+				return(cg_process.run(encode_readings(cg_readings, cg_soft_limit, cg_hard_limit, cg_delimiters, cg_soft_delimiters)))
+			return(cg_process.run(cg_readings))
+		finally:
+			with self.lock:
+				self.cg_processes.append(cg_process)
+
+	def tag(self, input_data, output_name="None", directory="None", output_format=None, reading_cache_file=None, chunk_size=None, workers=None, append_db=None, output_path=None, compression=None):
+		""" Tag a provided input (files, or text as a string) - see 'TaggingRun.pos_tagger' """
+		return TaggingRun(self).pos_tagger(input_data, output_name, directory, output_format, reading_cache_file=reading_cache_file, chunk_size=chunk_size, workers=workers, append_db=append_db, output_path=output_path, compression=compression)
+
+	def iter_tag(self, input_data, chunk_size=1000, reading_cache_file=None):
+		""" Yield the POS tagged sentences of a provided input as they are tagged - see 'TaggingRun.iter_tag' """
+		return TaggingRun(self).iter_tag(input_data, chunk_size, reading_cache_file)
+
+	def tag_lines(self, lines, output_path="-", chunk_size=50, max_chunk_size=1000, reading_cache_file=None):
+		""" Tag text given a line at a time, writing each batch of sentences as it is tagged - see 'TaggingRun.tag_lines' """
+		return TaggingRun(self).tag_lines(lines, output_path, chunk_size, max_chunk_size, reading_cache_file)
+
+	def close(self):
+		""" Stop the vislcg3 processes that are being kept running """
+		with self.lock:
+			cg_processes, self.cg_processes = self.cg_processes, []
+		for cg_process in cg_processes:
+			cg_process.close()
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, exc_type, exc_value, traceback):
+		self.close()
+
+class TaggingRun:
+	""" The state of a single tagging run (its output files, statistics, unknown words, and the details of the sentences waiting to be mapped from the CG output), using the resources of a Tagger """
+
+	def __init__(self, tagger):
+		self.tagger = tagger
+		self.stats = new_stats()
+		self.output = {"directory": None, "readings": None, "readingsPostCG": None, "unknown_words": None, "tsv": None, "xml": None, "vrt": None, "conllu": None, "db": None, "append_db": False, "writers": []}
+		""" Sentence number -> number of tokens, for the sentences that have been given readings but not yet mapped from the CG output """
+		self.sentence_lengths = {}
+		self.pre_cg_reading_counts = {}
+		self.existing_unknown_words = []
+		self.new_unknown_words = set()
+		""" Where progress messages and statistics are printed (standard error, when the TSV output is written to standard output) """
+		self.log = sys.stdout
+
+	def get_reading(self, token_id, token):
+		""" Get CG-formatted readings for a given token (from the reading cache, if the same word has been seen before) """
+		if position_marker in token[0]:
+			readings_string, reading_count = build_reading(token, self.stats["pre-cg"])
+			self.pre_cg_reading_counts[token_id] = reading_count
+			return readings_string
+		cached = self.tagger.reading_cache.get(token[0])
+		if cached is None:
+			cached = type_reading(token[0])
+			self.tagger.reading_cache.put(token[0], cached)
+		parts, stat_changes, reading_count = cached
+		for stat, change in stat_changes.items():
+			self.stats["pre-cg"][stat] += change
+		self.pre_cg_reading_counts[token_id] = reading_count
+		return token[1].join(parts)
+
+	def start_writers(self, output_name, filename_dict, files=True):
+		""" Create the writers for the output formats that are written a token at a time as the CG output is mapped (TSV, XML, VRT, CoNLL-U, database).
+			The formats that are structured by file (all but TSV) are only written for input files
+		"""
+		if self.output["tsv"] != None:
+			self.output["writers"].append(TSVWriter(self.output["tsv"], filename_dict))
+		if not files:
+			return
+		if self.output["xml"] != None:
+			self.output["writers"].append(XMLWriter(self.output["xml"], output_name))
+		if self.output["vrt"] != None:
+			self.output["writers"].append(VRTWriter(self.output["vrt"], output_name))
+		if self.output["conllu"] != None:
+			self.output["writers"].append(CoNLLUWriter(self.output["conllu"], output_name))
+		if self.output["db"] != None:
+			self.output["writers"].append(DBWriter(self.output["db"], output_name, self.output["append_db"]))
+
+	def write_token(self, tagged_token):
+		""" Add a TaggedToken to each of the output writers """
+		for writer in self.output["writers"]:
+			writer.add_token(tagged_token, self.pre_cg_reading_counts[tagged_token.id])
+
+	def process_cg_token(self, token_id, wordform, readings):
+		""" Process a given token (its CG wordform line) and its reading lines, returning it as a TaggedToken """
+		token = wordform[2:-2]
+		processed_token = None
+		if len(readings) == 1:
+			processed_token = process_single_reading(token_id, token, readings[0], self.stats["post-cg"], self.new_unknown_words if self.output["unknown_words"] != None else None)
+		else:
+			self.stats["post-cg"]["multiple_readings"] += 1
+			if len(readings) == 2:
+				processed_token = process_double_reading(token_id, token, readings, self.stats["post-cg"])
+			else:
+				processed_token = process_multiple_reading(token_id, token, readings, self.stats["post-cg"])
+		if processed_token == None:
+			processed_token = process_still_ambiguous(token_id, token, readings, self.get_token_position(readings[0]))
+		if len(self.output["writers"]) > 0:
+			self.write_token(processed_token)
+		return(processed_token)
+
+	def get_token_position(self, current_reading):
+		""" Get the sentence position (first or last word, or somewhere in the middle) for a given token """
+		current_position = reading_fields(current_reading)[1][1:-1]
+		sentence, token = current_position.split(",")
+		sentence_length = self.sentence_lengths[int(sentence)]
+		if sentence_length < 3:
+			return("small_sentence")
+		else:
+			if int(token) == 1:
+				return("first")
+			else:
+				if int(token) == sentence_length:
+					return("last")
+				else:
+					return("mid")
+
+	def map_cg(self, cg_output, mapping_bar=None, token_offset=0):
+		""" Map CG output to a list of TaggedTokens (numbering them on from 'token_offset', when mapping one chunk of a longer run) """
+		mapped_output = []
+		for cohort_id, (wordform, readings) in enumerate(cohorts(cg_output), token_offset+1):
+			if mapping_bar != None:
+				mapping_bar.next()
+			mapped_output.append(self.process_cg_token(cohort_id, wordform, readings))
+		if mapping_bar != None:
+			mapping_bar.finish()
+		return(mapped_output)
+
+	def sentence_readings(self, tokens, eof="N"):
+		""" Return a set of CG-formatted readings for a tokenised sentence (a list of Token records) """
+		if len(tokens) > 0:
+			self.sentence_lengths[tokens[0].sentence] = len(tokens)
+		readings = "".join([self.get_reading(token.id, [token.text, token.position_tag()]) for token in tokens])
+
+		if self.output["readings"] != None:
+			if eof == "Y":
+				readings += '"<~EOS~>"' + "\n" + '\t"~EOS~" {0,0} [cy] Atd t :~EOS~:' + "\n"
+			else:
+				readings += "\n"
+			print(readings, file=self.output["readings"])
+		return readings
+
+	def save_unknown_words(self):
+		""" Save the words CyTag didn't know to the appropriate output file """
+		all_unknown_words = list(set(self.existing_unknown_words) | self.new_unknown_words)
+		for word in all_unknown_words:
+			print(word, file=self.output["unknown_words"])
+
+	def output_setup(self, output_name, directory, output_format, append_db=None, output_path=None, compression=None):
+		""" Set up the necessary folders and output files for running CyTag.
+			Output is saved to a folder in CyTag's 'outputs' folder, unless an absolute path is given for the folder (in which case the list of unknown words is saved there too, rather than to the 'outputs' folder).
+			The TSV output is written to 'output_path' if one is given ('-' for standard output).
+			If a compression format is given ('gz', 'bz2' or 'xz'), the readings files and TSV output in the output folder are compressed with it (as is the TSV output written to 'output_path', if its name ends with a compression extension)
+		"""
+		create_folders(output_name, directory)
+		outputs = "{}/../outputs".format(os.path.dirname(os.path.abspath(__file__)))
+		folder = "{}".format(output_name if directory == None else directory)
+		self.output["directory"] = os.path.join(outputs, folder)
+		if os.path.isabs(folder):
+			outputs = self.output["directory"]
+		extension = "" if compression == None else ".{}".format(compression)
+		for output_file in ["readings", "readingsPostCG"]:
+			if output_file == "readings" and os.path.exists("{}/{}_{}{}".format(self.output["directory"], output_name, output_file, extension)):
+				os.remove("{}/{}_{}{}".format(self.output["directory"], output_name, output_file, extension))
+				self.output["{}".format(output_file)] = open_text_output("{}/{}_{}{}".format(self.output["directory"], output_name, output_file, extension), "a")
+			else:
+				self.output["{}".format(output_file)] = open_text_output("{}/{}_{}{}".format(self.output["directory"], output_name, output_file, extension), "w")
+		if os.path.exists("{}/unknown_words".format(outputs)):
+			with open("{}/unknown_words".format(outputs)) as loaded_unknown_words:
+				self.existing_unknown_words = loaded_unknown_words.read().splitlines()
+		self.output["unknown_words"] = open("{}/unknown_words".format(outputs), "w")
+		if output_path != None:
+			self.output["tsv"] = open_output(output_path)
+		elif output_format in ["tsv", "all"]:
+			self.output["tsv"] = open_text_output("{}/{}.tsv{}".format(self.output["directory"], output_name, extension), "w")
+		if output_format in ["xml", "all"]:
+			self.output["xml"] = open("{}/{}.xml".format(self.output["directory"], output_name), "wb")
+		if output_format in ["vrt", "all"]:
+			self.output["vrt"] = open("{}/{}.vrt".format(self.output["directory"], output_name), "w", encoding="utf-8")
+		if output_format in ["conllu", "all"]:
+			self.output["conllu"] = open("{}/{}.conllu".format(self.output["directory"], output_name), "w", encoding="utf-8")
+		if output_format in ["db", "all"]:
+			if append_db != None:
+				self.output["db"], self.output["append_db"] = append_db, True
+			else:
+				self.output["db"] = "{}/{}.db".format(self.output["directory"], output_name)
+
+	def close_outputs(self):
+		""" Close the output files opened for this run """
+		for output_file in ["readings", "readingsPostCG", "unknown_words", "tsv", "xml", "vrt", "conllu"]:
+			if self.output[output_file] != None:
+				close_output(self.output[output_file])
+		for writer in self.output["writers"]:
+			if isinstance(writer, DBWriter):
+				writer.connection.close()
+
+	def sentence_readings_from(self, input_data, output_name, filename_dict, counts, verbose=False):
+		""" Yield the CG-formatted readings for each sentence of the input (files, or text as a string), along with the number of tokens in the sentence """
 		if isinstance(input_data, list):
-			if output["xml"] != None:
-				output["tree"] = etree.Element("corpus")
-				output["tree"].attrib["name"] = output_name
 			for file_id, file in enumerate(input_data):
 				file_name = os.path.basename(file)
-				filename_dict[total_sentences+1] = file_name
-				if output_format != None:
-					print("Processing file %s of %s: %s " % (str(file_id+1), str(len(input_data)), file))
-				file_element = None
-				if output["xml"] != None:
-					file_element = etree.Element("file")
-					file_element.attrib["id"] = str(file_id+1)
-					file_element.attrib["name"] = file.split("/")[-1]
-				with open(file, encoding="utf-8") as file_text:
-					for segment_id, segment in enumerate(segment_text(file_text.read())):
-						for sentence_id, sentence in enumerate(split_sentences(segment)):
-							sentence_element = None
-							if output["xml"] != None:
-								sentence_element = etree.Element("sentence")
-								sentence_element.attrib["id"] = str(total_sentences+1)
-							total_sentences += 1
-							tokens = tokenise(sentence, total_sentences, total_tokens)
-							readings += sentence_readings(tokens, total_tokens, eof="Y")
-							total_tokens += len(tokens.splitlines())
-							if output["xml"] != None:
-								file_element.append(sentence_element)
-				if output["xml"] != None:
-					output["tree"].append(file_element)
+				filename_dict[counts["sentences"]+1] = file_name
+				if verbose:
+					print("Processing file %s of %s: %s " % (str(file_id+1), str(len(input_data)), file), file=self.log)
+				for writer in self.output["writers"]:
+					writer.add_file(file_id+1, file.split("/")[-1])
+				yield from self.segment_readings(file_segments(file), counts, self.output["writers"], eof="Y")
 		elif isinstance(input_data, str):
-			for segment_id, segment in enumerate(segment_text(input_data.replace("\\n", "\n"))):
-				for sentence_id, sentence in enumerate(split_sentences(segment)):
-					total_sentences += 1
-					tokens = tokenise(sentence, total_sentences, total_tokens)
-					readings += sentence_readings(tokens, total_tokens)
-					total_tokens += len(tokens.splitlines())
-		if output_format != None:
-			print("From {} file(s):\n--- {} tokens were given readings\n------ {} tokens only have a single reading pre-CG\n--------- {} of which were definite tags (punctuation, symbols etc.)\n------ {} tokens have multiple readings pre-CG\n------ {} tokens have no readings pre-CG\n------ {} tokens without readings may be proper nouns\n--- {} tokens are still without readings (marked as 'unknown')\n".format(str(len(input_data)), stats["pre-cg"]["with_readings"], stats["pre-cg"]["single_reading"], stats["pre-cg"]["definite_tag"], stats["pre-cg"]["multiple_readings"], stats["pre-cg"]["no_readings"], stats["pre-cg"]["assumed_proper"], stats["pre-cg"]["without_readings"]))
-		if vislcg3_location == None or vislcg3_location == "" or vislcg3_location == bytearray():
-			raise ValueError("VISL CG-3 could not be found, and is required to continue using CyTag. Please follow the instructions in the README file to install it\n")
-		else:
-			if output_format != None:
-				print("Running VISL CG-3 over {} tokens...\n".format(total_tokens))
-			cg_output = run_cg(readings, vislcg3_location)
-			if cg_output == "":
-				raise ValueError("An empty output was returned from VISL CG-3. If details of an error were printed above this message, please try and resolve them. Otherwise, contact us via the details in the README file\n")
-			elif cg_output.splitlines()[0].startswith("\"<") == False and cg_output.splitlines()[0].endswith(">\"") == False:
-				raise ValueError("The returned output was not CG-formatted readings ---\n{}".format(cg_output))
-			else:
-				if output["readingsPostCG"] != None:
-					print(cg_output.strip(), file=output["readingsPostCG"])
+			yield from self.segment_readings(segment_text(input_data.replace("\\n", "\n")), counts)
+
+	def segment_readings(self, segments, counts, writers=(), eof="N"):
+		""" Yield the CG-formatted readings for each sentence in a list of segments, along with the number of tokens in the sentence (and add each sentence to the given output writers) """
+		for segment_id, segment in enumerate(segments):
+			for sentence_id, sentence in enumerate(split_sentences(segment)):
+				for writer in writers:
+					writer.add_sentence(counts["sentences"]+1)
+				counts["sentences"] += 1
+				tokens = tokenise_records(sentence, counts["sentences"], counts["tokens"])
+				token_count = len(tokens)
+				readings = self.sentence_readings(tokens, eof=eof)
+				counts["tokens"] += token_count
+				yield readings, token_count
+
+	def print_pre_cg_stats(self, input_data):
+		print("From {} file(s):\n--- {} tokens were given readings\n------ {} tokens only have a single reading pre-CG\n--------- {} of which were definite tags (punctuation, symbols etc.)\n------ {} tokens have multiple readings pre-CG\n------ {} tokens have no readings pre-CG\n------ {} tokens without readings may be proper nouns\n--- {} tokens are still without readings (marked as 'unknown')\n".format(str(len(input_data)), self.stats["pre-cg"]["with_readings"], self.stats["pre-cg"]["single_reading"], self.stats["pre-cg"]["definite_tag"], self.stats["pre-cg"]["multiple_readings"], self.stats["pre-cg"]["no_readings"], self.stats["pre-cg"]["assumed_proper"], self.stats["pre-cg"]["without_readings"]), file=self.log)
+
+	def run_checked_cg(self, readings):
+		""" Run VISL CG-3 over a set of readings, checking that CG-formatted readings were returned """
+		cg_output = self.tagger.run_cg(readings)
+		if cg_output == "" or cg_output == stream_header:
+			raise ValueError("An empty output was returned from VISL CG-3. If details of an error were printed above this message, please try and resolve them. Otherwise, contact us via the details in the README file\n")
+		elif isinstance(cg_output, bytes):
+			if cg_output.startswith(stream_header) == False:
+				raise ValueError("The returned output was not a VISL CG-3 binary stream ---\n{}".format(cg_output[:200]))
+		elif cg_output.splitlines()[0].startswith("\"<") == False and cg_output.splitlines()[0].endswith(">\"") == False:
+			raise ValueError("The returned output was not CG-formatted readings ---\n{}".format(cg_output))
+		return cg_output
+
+	def print_post_cg(self, cg_output, post_cg_gap=None):
+		""" Write the CG output for one chunk to the post-CG readings file (in the CG text format, whichever format it was returned in), so that across all chunks the file holds the same as it would for a single run.
+			The whitespace at the end of the chunk is held back and returned, to be passed in (and written) with the next chunk ('post_cg_gap' is None for the first chunk)
+		"""
+		cg_output = cg_text(cg_output)
+		post_cg = cg_output.lstrip() if post_cg_gap == None else post_cg_gap + cg_output
+		post_cg_body = post_cg.rstrip()
+		print(post_cg_body, end="", file=self.output["readingsPostCG"])
+		return post_cg[len(post_cg_body):]
+
+	def tag_chunks(self, input_data, sentences, counts, verbose=False, chunk_size=None, reading_cache_file=None, allow_empty=False, max_chunk_size=None):
+		""" Run VISL CG-3 over the readings for each sentence of the input a chunk at a time (see 'reading_chunks'), and yield the TaggedTokens for each chunk as it is mapped.
+			An input without any readings is an error, unless 'allow_empty' is set (when tagging part of a larger input), in which case nothing is yielded
+		"""
+		if reading_cache_file != None:
+			cache_key = reading_cache_key()
+			self.tagger.reading_cache.load(reading_cache_file, cache_key)
+		mapped_tokens, first_chunk, post_cg_gap = 0, True, None
+		for readings, chunk_tokens, last_chunk in reading_chunks(sentences, chunk_size, max_chunk_size):
+			if last_chunk:
+				if reading_cache_file != None:
+					self.tagger.reading_cache.save(reading_cache_file, cache_key)
+				if verbose:
+					self.print_pre_cg_stats(input_data)
+			self.tagger.check_vislcg3()
+			if last_chunk:
+				if verbose:
+					print("Running VISL CG-3 over {} tokens...\n".format(counts["tokens"]), file=self.log)
+				if readings == "" and (allow_empty or not first_chunk):
+					break
+			cg_output = self.run_checked_cg(readings)
+			if self.output["readingsPostCG"] != None:
+				post_cg_gap = self.print_post_cg(cg_output, post_cg_gap)
+			first_chunk = False
+			if chunk_tokens > 0 or (mapped_tokens == 0 and not allow_empty):
 				#mapping_bar = None if output_format == None else Bar("Mapping CG output tokens to CyTag output formats", max=total_tokens)
 				mapping_bar = None
-				cytag_output = map_cg(cg_output.strip(), mapping_bar)
-				if output["unknown_words"] != None:
-					save_unknown_words()
-				if output["tsv"] != None:
-					print_cytag(cytag_output, filename_dict)
-				if output["xml"] != None:
-					tree = etree.ElementTree(output["tree"])
-					tree.write(output["xml"].name, pretty_print=True, xml_declaration=True, encoding='UTF-8')
-				if output_format == None:
-					return(cytag_output.strip())
-				else:
-					print("\nFinal statistics from {} tokens:\n--- {} tokens disambiguated\n------ {} pruned to one reading post-CG\n------ {} ambiguous post-CG, but:\n--------- {} found to have two readings with the same POS tag\n--------- {} found to be proper nouns of ambiguous gender\n------------ {} of these came from the gazetteers\n--------- {} ambiguous, but found in the gazetteers\n--------- {} assigned a POS tag based on the coverage dictionary\n------ {} unknown, but then found in gazetteers\n--- {} tokens undisambiguated\n------ {} still ambiguous post-CG\n------ {} unknown\n".format(total_tokens, stats["post-cg"]["disambiguated"], stats["post-cg"]["one_reading"], stats["post-cg"]["multiple_readings"]-stats["post-cg"]["still_ambiguous"], stats["post-cg"]["same_tag"], stats["post-cg"]["pns_gazetteer"]+stats["post-cg"]["neutral_pns"], stats["post-cg"]["pns_gazetteer"], stats["post-cg"]["ambiguous_gazetteer"], stats["post-cg"]["in_coverage"], stats["post-cg"]["unknown_gazetteer"], stats["post-cg"]["undisambiguated"], stats["post-cg"]["still_ambiguous"], stats["post-cg"]["unknown"]))
-					print("Time taken to tag {} tokens from {} sentences: {}\n".format(total_tokens, total_sentences, time_elapsed(started)))
+				cytag_output = self.map_cg(cg_output, mapping_bar, mapped_tokens)
+				mapped_tokens += chunk_tokens
+				yield cytag_output
+			self.pre_cg_reading_counts.clear()
+			self.sentence_lengths.clear()
+		if self.output["readingsPostCG"] != None and not first_chunk:
+			print("", file=self.output["readingsPostCG"])
+
+	def iter_tag(self, input_data, chunk_size=1000, reading_cache_file=None):
+		""" For a provided input (files, or text as a string), yield (file name, POS tagged sentence as CyTag-formatted tab-separated values) for each sentence in turn.
+			VISL CG-3 is run over chunks of at least 'chunk_size' tokens as the input is read, so memory use stays bounded however large the input is, and results are available as soon as the chunk holding them has been tagged (file names are None for text given as a string)
+		"""
+		filename_dict, counts = {}, {"sentences": 0, "tokens": 0}
+		file_name = None if isinstance(input_data, str) else ""
+		for tagged_tokens in self.tag_chunks(input_data, self.sentence_readings_from(input_data, None, filename_dict, counts), counts, False, chunk_size, reading_cache_file):
+			sentence_number, sentence = None, []
+			for tagged_token in tagged_tokens:
+				token_sentence = tagged_token.sentence()
+				if token_sentence != sentence_number:
+					if len(sentence) > 0:
+						yield file_name, "\n".join(sentence)
+					sentence_number, sentence = token_sentence, []
+					file_name = filename_dict.get(token_sentence, file_name)
+				sentence.append(tagged_token.tsv())
+			if len(sentence) > 0:
+				yield file_name, "\n".join(sentence)
+
+	def tag_lines(self, lines, output_path="-", chunk_size=50, max_chunk_size=1000, reading_cache_file=None):
+		""" Tag text given a line at a time (e.g. standard input, as a filter in a pipeline), writing the tab-separated values for each batch of sentences to 'output_path' ('-' for standard output) as soon as the batch has been tagged.
+			VISL CG-3 is run over batches of at least 'chunk_size' tokens, ending at a window boundary (or after 'max_chunk_size' tokens, if there isn't one - see 'reading_chunks'), so memory use and the delay before each sentence is written stay bounded however long the input is.
+			The tags are the same as for the whole input tagged at once, except where a batch had to be ended without a window boundary (more than 'max_chunk_size' tokens without sentence-final punctuation), where the sentences either side of the cut may be tagged differently.
+			Lines are written in full as each batch is tagged, so unlike the text returned by 'pos_tagger', the output isn't stripped (the last line keeps its trailing tab, like every other line)
+		"""
+		counts = {"sentences": 0, "tokens": 0}
+		segments = (segment for line in lines for segment in segment_text(line.replace("\\n", "\n")))
+		output_file = open_output(output_path)
+		try:
+			writer = TSVWriter(output_file)
+			for tagged_tokens in self.tag_chunks(None, self.segment_readings(segments, counts), counts, chunk_size=chunk_size, reading_cache_file=reading_cache_file, allow_empty=True, max_chunk_size=max_chunk_size):
+				for tagged_token in tagged_tokens:
+					writer.add_token(tagged_token, None)
+				writer.flush()
+		finally:
+			close_output(output_file)
+
+	def tag_boundary(self, sentences, post_cg_gap=None):
+		""" Run VISL CG-3 over the untagged sentences around the boundary between two shards (see 'tag_shard'), each given as (readings, sentence number, first token id, number of tokens, sentence length, pre-CG reading counts) numbered for the whole input.
+			Returns the TaggedTokens for the sentences, and the whitespace held back from the post-CG readings file (see 'print_post_cg')
+		"""
+		readings = "".join(sentence[0] for sentence in sentences)
+		if readings == "":
+			return [], post_cg_gap
+		cg_output = self.run_checked_cg(readings)
+		if self.output["readingsPostCG"] != None:
+			post_cg_gap = self.print_post_cg(cg_output, post_cg_gap)
+		cytag_output = []
+		if sum(sentence[3] for sentence in sentences) > 0:
+			for readings, sentence_number, first_token, token_count, sentence_length, reading_counts in sentences:
+				if sentence_length != None:
+					self.sentence_lengths[sentence_number] = sentence_length
+				for token_id, reading_count in enumerate(reading_counts, first_token):
+					self.pre_cg_reading_counts[token_id] = reading_count
+			cytag_output = self.map_cg(cg_output, None, sentences[0][2]-1)
+			self.pre_cg_reading_counts.clear()
+			self.sentence_lengths.clear()
+		return cytag_output, post_cg_gap
+
+	def tag_in_parallel(self, input_data, output_name, filename_dict, counts, workers, verbose=False, chunk_size=None, reading_cache_file=None, shard_size=200000):
+		""" Tag a list of input files over a pool of worker processes, yielding the TaggedTokens in the order of the input.
+			Each shard of the input (see 'input_shards') is tagged independently, from segmentation to mapping the CG output, with its sentences and tokens numbered from 1, and is renumbered as it is merged, so the output is the same as tagging the files one after another.
+			The sentences on either side of the boundary between two shards are tagged together as the shards are merged, so that VISL CG-3 sees the same windows as it would in a single run
+		"""
+		writers = self.output["writers"]
+		keep = {"keep_readings": self.output["readings"] != None, "keep_post_cg": self.output["readingsPostCG"] != None, "keep_reading_counts": len(writers) > 0, "keep_unknown_words": self.output["unknown_words"] != None, "keep_cache_entries": reading_cache_file != None}
+		if reading_cache_file != None:
+			cache_key = reading_cache_key()
+			self.tagger.reading_cache.load(reading_cache_file, cache_key)
+		def ordered_results(pool):
+			""" Yield the result for each shard in turn, keeping a bounded number of shards in progress """
+			in_progress = deque()
+			shards = input_shards(input_data, shard_size, verbose, self.log)
+			while True:
+				for shard in shards:
+					in_progress.append(pool.submit(tag_shard, shard, chunk_size, **keep))
+					if len(in_progress) >= 2 * workers:
+						break
+				if len(in_progress) == 0:
+					break
+				yield in_progress.popleft().result()
+		carried, post_cg_gap = [], None
+		with ProcessPoolExecutor(max_workers=workers, initializer=start_shard_worker, initargs=(self.tagger.vislcg3_location, self.tagger.reading_cache.size, reading_cache_file, self.tagger.uses_binary_stream())) as pool:
+			for result in ordered_results(pool):
+				sentence_offset, token_offset = counts["sentences"], counts["tokens"]
+				for piece_id, (file_id, file, file_start, first_sentence) in enumerate(result["files"]):
+					if file_start:
+						filename_dict[sentence_offset+first_sentence+1] = os.path.basename(file)
+						for writer in writers:
+							writer.add_file(file_id+1, file.split("/")[-1])
+					if len(writers) > 0:
+						last_sentence = result["files"][piece_id+1][3] if piece_id+1 < len(result["files"]) else result["sentences"]
+						for sentence in range(first_sentence, last_sentence):
+							for writer in writers:
+								writer.add_sentence(sentence_offset+sentence+1)
+				counts["sentences"] += result["sentences"]
+				counts["tokens"] += result["tokens"]
+				for stage, stage_stats in result["stats"].items():
+					for stat, change in stage_stats.items():
+						self.stats[stage][stat] += change
+				self.new_unknown_words.update(result["unknown_words"])
+				for word, entry in result["cache_entries"]:
+					self.tagger.reading_cache.put(word, entry)
+				if self.output["readings"] != None:
+					print(renumber_readings(result["readings"], sentence_offset), end="", file=self.output["readings"])
+				head, tail = [[(renumber_readings(readings, sentence_offset), sentence_number+sentence_offset, first_token+token_offset, token_count, sentence_length, reading_counts) for readings, sentence_number, first_token, token_count, sentence_length, reading_counts in sentences] for sentences in (result["head"], result["tail"])]
+				if len(head) > 0:
+					cytag_output, post_cg_gap = self.tag_boundary(carried + head, post_cg_gap)
+					carried = []
+					yield cytag_output
+				if self.output["readingsPostCG"] != None and result["post_cg"] != "":
+					post_cg_gap = self.print_post_cg(renumber_readings(result["post_cg"], sentence_offset), post_cg_gap)
+				cytag_output = renumber_tagged_tokens(result["cytag_output"], sentence_offset, token_offset+sum(sentence[3] for sentence in head))
+				if len(writers) > 0:
+					for token_id, reading_count in result["reading_counts"].items():
+						self.pre_cg_reading_counts[token_id+token_offset] = reading_count
+					for tagged_token in cytag_output:
+						self.write_token(tagged_token)
+					self.pre_cg_reading_counts.clear()
+				yield cytag_output
+				carried += tail
+		if reading_cache_file != None:
+			self.tagger.reading_cache.save(reading_cache_file, cache_key)
+		if verbose:
+			self.print_pre_cg_stats(input_data)
+			print("Running VISL CG-3 over {} tokens...\n".format(counts["tokens"]), file=self.log)
+		cytag_output, post_cg_gap = self.tag_boundary(carried, post_cg_gap)
+		if self.output["readingsPostCG"] != None and post_cg_gap != None:
+			print("", file=self.output["readingsPostCG"])
+		yield cytag_output
+
+	def pos_tagger(self, input_data, output_name="None", directory="None", output_format=None, separate="n", reading_cache_file=None, chunk_size=None, workers=None, append_db=None, output_path=None, compression=None):
+		filename_dict = {}
+		""" For a provided input (files, or text as a string): 
+			--- Produce a set of CG-formatted readings
+			--- Run VISL CG-3 to prune the readings
+			--- Map the CG-3 output to tokens as CyTag-formatted tab-separated values
+			If a reading cache file is given, the readings cached there by earlier runs are reused (if they are still current), and the cache is saved back to it once the readings have been produced
+			If a chunk size is given, VISL CG-3 is run over chunks of (at least) that many tokens as the input is read, and the TSV output is written as each chunk is tagged, rather than holding the whole input in memory and tagging it in one run
+			If a number of workers (more than one) is given for a list of files, the files are tagged in parallel over that many processes (see 'tag_in_parallel')
+			If an existing corpus database is given as 'append_db', the tagged corpus is added to it (with the 'db' or 'all' output formats) rather than written to a new database in the output directory (see 'shared/db_writer.py')
+			If an output path is given ('-' for standard output), the TSV output is written to it as the CG output is mapped: as CyTag-formatted TSV if an output format is given, or otherwise as the tab-separated values would be returned (and printed)
+			Input files may be compressed (with gzip, bzip2 or xz), and are decompressed as they are read. If a compression format is given ('gz', 'bz2' or 'xz'), the readings files and TSV output are compressed with it (see 'output_setup')
+		"""
+		if output_format != None and len(missing_libraries) > 0: 
+			raise ImportError("The following libraries (required when an output format is specified) are missing: {}".format(missing_libraries))
+		try:
+			counts = {"sentences": 0, "tokens": 0}
+			started = int(time.time())
+			if output_path == "-":
+				self.log = sys.stderr
+			if output_format != None:
+				print("\ncy_postagger - A part-of-speech (POS) tagger for Welsh texts\n------------------------------------------------------------\n", file=self.log)
+				self.output_setup(output_name, directory, output_format, append_db, output_path, compression)
+				print("Producing readings...\n", file=self.log)
+				self.start_writers(output_name, filename_dict, isinstance(input_data, list))
+			elif output_path != None:
+				self.output["tsv"] = open_output(output_path)
+				self.output["writers"].append(TSVWriter(self.output["tsv"], strip=True))
+			cytag_outputs = []
+			if workers != None and workers > 1 and isinstance(input_data, list):
+				tagged_chunks = self.tag_in_parallel(input_data, output_name, filename_dict, counts, workers, output_format != None, chunk_size, reading_cache_file)
+			else:
+				tagged_chunks = self.tag_chunks(input_data, self.sentence_readings_from(input_data, output_name, filename_dict, counts, output_format != None), counts, output_format != None, chunk_size, reading_cache_file)
+			for tagged_tokens in tagged_chunks:
+				if output_format == None and output_path == None:
+					cytag_outputs.extend(tagged_token.tsv() + "\n" for tagged_token in tagged_tokens)
+			if self.output["unknown_words"] != None:
+				self.save_unknown_words()
+			for writer in self.output["writers"]:
+				writer.close()
+			if output_format == None:
+				if output_path == None:
+					return("".join(cytag_outputs).strip())
+			else:
+				total_tokens, total_sentences = counts["tokens"], counts["sentences"]
+				print("\nFinal statistics from {} tokens:\n--- {} tokens disambiguated\n------ {} pruned to one reading post-CG\n------ {} ambiguous post-CG, but:\n--------- {} found to have two readings with the same POS tag\n--------- {} found to be proper nouns of ambiguous gender\n------------ {} of these came from the gazetteers\n--------- {} ambiguous, but found in the gazetteers\n--------- {} assigned a POS tag based on the coverage dictionary\n------ {} unknown, but then found in gazetteers\n--- {} tokens undisambiguated\n------ {} still ambiguous post-CG\n------ {} unknown\n".format(total_tokens, self.stats["post-cg"]["disambiguated"], self.stats["post-cg"]["one_reading"], self.stats["post-cg"]["multiple_readings"]-self.stats["post-cg"]["still_ambiguous"], self.stats["post-cg"]["same_tag"], self.stats["post-cg"]["pns_gazetteer"]+self.stats["post-cg"]["neutral_pns"], self.stats["post-cg"]["pns_gazetteer"], self.stats["post-cg"]["ambiguous_gazetteer"], self.stats["post-cg"]["in_coverage"], self.stats["post-cg"]["unknown_gazetteer"], self.stats["post-cg"]["undisambiguated"], self.stats["post-cg"]["still_ambiguous"], self.stats["post-cg"]["unknown"]), file=self.log)
+				print("Time taken to tag {} tokens from {} sentences: {}\n".format(total_tokens, total_sentences, time_elapsed(started)), file=self.log)
+		finally:
+			self.close_outputs()
+
+
+""" The Tagger used by the module-level functions below (created the first time it is needed) """
+tagger = None
+tagger_lock = threading.Lock()
+
+def default_tagger():
+	global tagger
+	with tagger_lock:
+		if tagger == None:
+			tagger = Tagger()
+	return tagger
+
+def pos_tagger(input_data, output_name="None", directory="None", output_format=None, separate="n", reading_cache_file=None, chunk_size=None, workers=None, append_db=None, output_path=None, compression=None):
+	""" Tag a provided input (files, or text as a string) with the default Tagger - see 'TaggingRun.pos_tagger' """
+	return default_tagger().tag(input_data, output_name, directory, output_format, reading_cache_file=reading_cache_file, chunk_size=chunk_size, workers=workers, append_db=append_db, output_path=output_path, compression=compression)
+
+def iter_tag(input_data, chunk_size=1000, reading_cache_file=None):
+	""" Yield the POS tagged sentences of a provided input with the default Tagger - see 'TaggingRun.iter_tag' """
+	return default_tagger().iter_tag(input_data, chunk_size, reading_cache_file)
+
+def tag_lines(lines, output_path="-", chunk_size=50, max_chunk_size=1000, reading_cache_file=None):
+	""" Tag text given a line at a time (e.g. standard input) with the default Tagger, writing each batch of sentences as it is tagged - see 'TaggingRun.tag_lines' """
+	return default_tagger().tag_lines(lines, output_path, chunk_size, max_chunk_size, reading_cache_file)
 
 def parse_arguments(arguments):
 	""" Parse command line arguments """
@@ -850,19 +1277,27 @@ def parse_arguments(arguments):
 	required = parser.add_argument_group("required arguments")
 	required.add_argument("-i", "--input", help="Input file path(s)", nargs="+", required=True)
 	optional.add_argument("-n", "--name", help="Output file name")
-	optional.add_argument("-d", "--dir", help="Output directory")
-	optional.add_argument("-f", "--format", help="Output file format ('tsv', 'xml', 'all')")
+	optional.add_argument("-d", "--dir", help="Output directory (in CyTag's 'outputs' folder, unless an absolute path is given)")
+	optional.add_argument("-o", "--output", help="A file to write the TSV output to ('-' for standard output), rather than the output directory (compressed, if its name ends with .gz, .bz2 or .xz)")
+	optional.add_argument("-z", "--compress", choices=["gz", "bz2", "xz"], help="Compress the readings files and TSV output with gzip, bzip2 or xz")
+	optional.add_argument("-f", "--format", help="Output file format ('tsv', 'xml', 'vrt', 'conllu', 'db', 'all')")
+	optional.add_argument("-a", "--append", help="An existing corpus database to add the tagged corpus to (with '-f db' or '-f all'), rather than writing a new database to the output directory")
+	optional.add_argument("-r", "--reading_cache", help="A file in which to keep the reading cache between runs (created if it doesn't exist)")
+	optional.add_argument("-w", "--workers", type=int, help="Tag the input files in parallel over this many processes")
+	optional.add_argument("-s", "--chunk_size", type=int, help="Run VISL CG-3 over chunks of (at least) this many tokens as the input is read, writing output as each chunk is tagged (bounds memory use on large inputs)")
 	parser._action_groups.append(optional)
 	return(parser.parse_args())
 
 if __name__ == "__main__":
 	""" Split the provided input (text as a string, or files) into single tokens tagged with their appropriate part-of-speech (POS) """
 	args = sys.argv[1:]
-	if len(args) == 0 and not sys.stdin.isatty():
-		pos_tagger(input_data=sys.stdin.read())
-	else:
-		if len(args) == 1 and os.path.isfile(args[0]) != True and args[0].startswith("-") != True:
+	try:
+		if len(args) == 0 and not sys.stdin.isatty():
+			tag_lines(sys.stdin)
+		elif len(args) == 1 and os.path.isfile(args[0]) != True and args[0].startswith("-") != True:
 			pos_tagger(input_data=args[0])
 		else:
 			arguments = parse_arguments(args)
-			pos_tagger(arguments.input, output_name=arguments.name, directory=arguments.dir, output_format=arguments.format)
+			pos_tagger(arguments.input, output_name=arguments.name, directory=arguments.dir, output_format=arguments.format, reading_cache_file=arguments.reading_cache, chunk_size=arguments.chunk_size, workers=arguments.workers, append_db=arguments.append, output_path=arguments.output, compression=arguments.compress)
+	except BrokenPipeError:
+		exit_on_closed_output()
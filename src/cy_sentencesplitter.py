@@ -28,53 +28,76 @@ import os
 import re
 import json
 from shared.reference_lists import *
-from cy_textsegmenter import segment_text
-
-
+from cy_textsegmenter import segment_text, file_segments
+
+
+
+""" Sentence boundaries: whitespace preceded by certain punctuation marks, but not by certain combinations of letters and punctuation marks (the 'abbreviations' gazetteer is checked separately, in 'preceded_by_abbreviation') """
+sentence_boundary = re.compile(r"(?<=[.|!?])(?<!\s[A-Z][.])(?<![A-Z][.][A-Z][.])(?<![.]\s[.])(?<![.][.])\s")
+
+""" Patterns used to tidy up markup tags before splitting """
+leading_space = re.compile(r"^[ \t]+")
+markup_tag = re.compile(r"<([\\=\w]+)>")
+markup_tag_space_before = re.compile(r"  <([\\=\w]+)>")
+markup_tag_space_after = re.compile(r"<([\\=\w]+)>  ")
+en_tag_gair = re.compile(r'<en( gair ?= ?"[^"]+")?> ?')
+open_tag_space = re.compile(r"<(en|N|anon)> ")
+close_tag_space = re.compile(r"</(en|N|anon)> ")
+close_tag_no_space = re.compile(r"</(en|N|anon)>(\S)")
+open_tag_no_space = re.compile(r"(\S)<(en|N|anon)>")
+en_section = re.compile(r"(<en>[^<]+</en>)")
+en_tag = re.compile(r"</?en>")
+
+""" The abbreviations gazetteer, grouped by length into sets (rebuilt if the gazetteer is reloaded) """
+abbreviation_index = {"terms": None, "by_length": {}}
+
+def preceded_by_abbreviation(text, position):
+	""" Check whether the text immediately before a given position ends with any of the terms in the 'abbreviations' gazetteer """
+	if abbreviation_index["terms"] is not gazetteers["abbreviations"]:
+		by_length = {}
+		for term in gazetteers["abbreviations"]:
+			by_length.setdefault(len(term), set()).add(term)
+		abbreviation_index["by_length"] = by_length
+		abbreviation_index["terms"] = gazetteers["abbreviations"]
+	for length, terms in abbreviation_index["by_length"].items():
+		if length <= position and text[position-length:position] in terms:
+			return True
+	return False
 
 """ Primary functions """
 
 def split_sentences(input_text):
 	""" Split a string of text into sentences, and return them as a list """
 
-	# Split the given input text into sentences based on a regex pattern - whitespace preceded by certain punctuation marks, but not by certain combinations of letters and punctuation marks or by any of the negative lookbehind assertions created for the 'abbreviations' gazetteer
+	# Split the given input text into sentences at each candidate boundary (whitespace preceded by sentence-final punctuation) that does not immediately follow an abbreviation
 	output = []
-	input_text = re.sub(r"^[ \t]+", r"", input_text)
-	input_text = re.sub(r"<([\\=\w]+)>", r" <\1> ", input_text)
-	input_text = re.sub(r"  <([\\=\w]+)>", r" <\1>", input_text)
-	input_text = re.sub(r"<([\\=\w]+)>  ", r"<\1> ", input_text)
-	input_text = re.sub(r'<en( gair ?= ?"[^"]+")?> ?', "<en>", input_text)
-	input_text = re.sub(r"<(en|N|anon)> ", r"<\1>", input_text)
-	input_text = re.sub(r"</(en|N|anon)> ", r"</\1>", input_text)
-	input_text = re.sub(r"</(en|N|anon)>(\S)", r"</\1> \2", input_text)
-	input_text = re.sub(r"(\S)<(en|N|anon)>", r"\1 </\2>", input_text)
+	input_text = leading_space.sub(r"", input_text)
+	input_text = markup_tag.sub(r" <\1> ", input_text)
+	input_text = markup_tag_space_before.sub(r" <\1>", input_text)
+	input_text = markup_tag_space_after.sub(r"<\1> ", input_text)
+	input_text = en_tag_gair.sub("<en>", input_text)
+	input_text = open_tag_space.sub(r"<\1>", input_text)
+	input_text = close_tag_space.sub(r"</\1>", input_text)
+	input_text = close_tag_no_space.sub(r"</\1> \2", input_text)
+	input_text = open_tag_no_space.sub(r"\1 </\2>", input_text)
 	if input_text.find("<en>") != -1 or input_text.find("</en>") != -1:
-		en_tagged = re.split(r"(<en>[^<]+</en>)", input_text)
+		en_tagged = en_section.split(input_text)
 		en_tagged = list(filter(None, en_tagged))
 		for i, section in enumerate(en_tagged):
 			if not section.startswith("<en>") or not section.endswith("</en>"):
-				en_tagged[i] = re.sub(r"</?en>", "", section)
+				en_tagged[i] = en_tag.sub("", section)
 				# section = split_sentences(section)
 				# output += section
 		input_text = "".join(en_tagged)
-	pattern = gazetteers["abbreviations_regex"] + r"(?<=[.|!|?])(?<!\s[A-Z][.])(?<![A-Z][.][A-Z][.])(?<![.]\s[.])(?<![.][.])[\s]"
-	sentences = re.split(pattern, input_text)
-	# Iterate through the split sentences
-	k = 0
-	while k < len(sentences):
-		# If an empty sentence is encountered, delete it
-		if sentences[k] == "":
-			del sentences[k]
-		else:
-			# If this is not the last sentence...
-			if k < len(sentences)-1:
-				# If the next sentence splits according to the regex pattern...
-				if re.match(pattern, sentences[k+1]):
-					# Append the next sentence to the current one, and delete it
-					sentences[k] = sentences[k] + sentences[k+1].strip()
-					del sentences[k+1]
-			k+=1
-	output += sentences
+	sentences = []
+	start = 0
+	for boundary in sentence_boundary.finditer(input_text):
+		if not preceded_by_abbreviation(input_text, boundary.start()):
+			sentences.append(input_text[start:boundary.start()])
+			start = boundary.end()
+	sentences.append(input_text[start:])
+	# Discard any empty sentences
+	output += [sentence for sentence in sentences if sentence != ""]
 	return output
 
 def sentence_splitter(input_data):
@@ -87,10 +110,9 @@ def sentence_splitter(input_data):
 			# Create a list containing the file name, and an empty list to hold the sentences
 			sentences.append([file, []])
 			# Segment each file, and loop through its segments
-			with open(file) as file_text:
-				for segment in segment_text(file_text.read()):
-					# Split each segment into sentences, and add them to appropriate file in the 'sentences' list
-					sentences[file_id][1].append(split_sentences(segment))
+			for segment in file_segments(file):
+				# Split each segment into sentences, and add them to appropriate file in the 'sentences' list
+				sentences[file_id][1].append(split_sentences(segment))
 	# If a string was given as input data, split it into segments, and then split each segment into a list of sentences
 	elif isinstance(input_data, str):
 		segments = segment_text(input_data.replace("\\n", "\n"))
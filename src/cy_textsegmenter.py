@@ -8,7 +8,7 @@ A text segmenter for Welsh texts.
 Accepts as arguments:
 	--- REQUIRED: A string of Welsh language text.
 	or:
-	--- REQUIRED: One or more Welsh input text files (raw text).
+	--- REQUIRED: One or more Welsh input text files (raw text, or compressed with gzip, bzip2 or xz).
 
 Returns:
 	--- A list of input text split into segments (separated by file if files were passed)
@@ -25,7 +25,10 @@ You should have received a copy of the GNU General Public License along with thi
 
 import sys
 import os
+import mmap
+import codecs
 
+from shared.compression import compression_module
 
 """ Primary functions """
 
@@ -36,6 +39,63 @@ def segment_text(input_text):
 	return(segments)
 
 
+def line_segments(lines):
+	""" Decode lines of UTF-8 (as bytes, each ending with a line break bar perhaps the last) as they are read, and yield the segments in them in turn, each with the byte offset it starts at """
+	decoder = codecs.getincrementaldecoder("utf-8")()
+	offset = 0
+	for line in lines:
+		text = decoder.decode(line)
+		segments = text.splitlines()
+		if len(segments) == 1:
+			yield offset, segments[0]
+		else:
+			# A line can hold more than one segment, if it contains line breaks other than '\n' (see 'str.splitlines')
+			segment_offset = offset
+			for segment, segment_with_break in zip(segments, text.splitlines(True)):
+				yield segment_offset, segment
+				segment_offset += len(segment_with_break.encode("utf-8"))
+		offset += len(line)
+	decoder.decode(b"", final=True)
+
+
+def mapped_lines(mapped_file, release_size=16777216):
+	""" Yield the lines of a memory-mapped file in turn, letting go of the pages that have been read every 'release_size' bytes (so the part of the file held in memory stays the same size, however large the file is) """
+	released = 0
+	for line in iter(mapped_file.readline, b""):
+		yield line
+		position = mapped_file.tell()
+		if position - released >= release_size and hasattr(mmap, "MADV_DONTNEED"):
+			release_end = position - position % mmap.PAGESIZE
+			mapped_file.madvise(mmap.MADV_DONTNEED, released, release_end - released)
+			released = release_end
+
+
+def iter_segments(file):
+	""" Yield the segments of a file in turn, each with the byte offset it starts at, without holding the file (or a list of its segments) in memory.
+		A raw text file is memory-mapped and read a line at a time, while a compressed file is decompressed as it is read (and the offsets are those in the decompressed text).
+		The segments are the same as 'segment_text' would give for the whole of the file's text
+	"""
+	module = compression_module(file)
+	if module != None:
+		with module.open(file, "rb") as input_file:
+			yield from line_segments(input_file)
+		return
+	with open(file, "rb") as input_file:
+		# Empty files can't be memory-mapped (and have no segments)
+		if os.fstat(input_file.fileno()).st_size == 0:
+			return
+		with mmap.mmap(input_file.fileno(), 0, access=mmap.ACCESS_READ) as mapped_file:
+			if hasattr(mmap, "MADV_SEQUENTIAL"):
+				mapped_file.madvise(mmap.MADV_SEQUENTIAL)
+			yield from line_segments(mapped_lines(mapped_file))
+
+
+def file_segments(file):
+	""" Yield the segments of a file in turn (see 'iter_segments'), without their offsets """
+	for offset, segment in iter_segments(file):
+		yield segment
+
+
 def text_segmenter(input_data):
 	""" Take an input string or a list of files, and return a list of segments (file separated if applicable) """
 	
@@ -43,8 +103,7 @@ def text_segmenter(input_data):
 	# If a list of files was given as input data, open each file and return a list containing a nested lists of segments for each file
 	if isinstance(input_data, list):
 		for file_id, file in enumerate(input_data):
-			with open(file) as file_text:
-				segmented_text.append([file, segment_text(file_text.read())])
+			segmented_text.append([file, list(file_segments(file))])
 	# If a string was given as input data, return it as a list of segments (lines)
 	elif isinstance(input_data, str):
 		segmented_text = segment_text(input_data.replace("\\n", "\n"))
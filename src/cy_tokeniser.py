@@ -33,6 +33,8 @@ from cy_textsegmenter import *
 from cy_sentencesplitter import *
 from shared.reference_lists import *
 from shared.en_lexica import *
+from shared.records import Token
+from shared.text_writers import StrippedOutput, open_output, close_output
 
 
 def check_html_tags(token):
@@ -76,94 +78,91 @@ def check_html_tags(token):
 		return token
 	return token
 
+""" Compiled patterns used by 'normalise_markup' """
+removed_tag = re.compile(r'^(?:</?(sillafu|silafu|sillafui|sillafu|sllafu|ynganu|ynagnu|ynghanu)( eng?)?>|<sync time="[\d\.]+"/>)$')
+noise_tag = re.compile(r'<((?:s[wŵ]n) [^<>\n]+?)>')
+tag_parts = re.compile(r"/?[<> ]")
+breath_direction = re.compile(r"mewn|fewn|allan")
+speaker_tag_start = re.compile(r"<>?[sS]\d")
+speaker_tag_split = re.compile(r"(<>?[sS]\d+\??[> ])")
+speaker_tag = re.compile(r"<>?[sS](\d+\??)>?$")
+
+def normalise_markup(token):
+	""" Normalise the markup in a single token (see 'remove_markup'), returning the normalised token, or an empty string if the token was only markup to be removed.
+		Tokens without a '<' have no markup, and are returned as they are
+	"""
+	if "<" not in token:
+		return token
+	normalised = token
+	# Spelling and pronunciation tags, and time codes, are removed
+	if removed_tag.match(token):
+		normalised = ""
+	if token[:3].upper() == "<D>":
+		normalised = normalised[3:]
+	if token[-4:].upper() == "</D>":
+		normalised = normalised[:-4]
+	if token.upper() in {"<D>", "</D>"}:
+		normalised = ""
+	# Noises (<sŵn ...>) and the transcribers' codes are rewritten as [~...~]
+	if token.startswith(("<swn", "<sŵn", "<sw^n", "<sw?n")):
+		token = token.replace("sw^n", "sŵn").replace("sw?n", "sŵn")
+		if token in {"<swn>", "<sŵn>"}:
+			normalised = "[~sŵn~]"
+		noise = noise_tag.match(token)
+		if noise:
+			normalised = "[~" + noise.group(1) + "~]"
+	if token.lower() in aneglur_misspellings:
+		token = "<aneglur>"
+	if token.lower().replace("< ", "<").replace(" >", ">") in transcriber_codes:
+		normalised = "[~" + "_".join(tag_parts.split(token.lower())[1:-1]) + "~]"
+	if token.lower().startswith("<anadlu"):
+		if token.lower() == "<anadlu>":
+			normalised = "[~anadlu~]"
+		elif breath_direction.search(token.lower()) and token.endswith(">"):
+			normalised = "[~" + "_".join(tag_parts.split(token.lower())[1:-1]) + "~]"
+	if token.upper() == "<N>":
+		normalised = "[~"
+	if token[:3].upper() == "<N>":
+		normalised = "[~" + normalised[3:]
+	if token.upper() == "</N>":
+		normalised = "~]"
+	if token[-4:].upper() == "</N>":
+		normalised = normalised[:-4] + "~]"
+	if token[:7] == "<rhegi>":
+		normalised = normalised[7:]
+	if token[-8:] == "</rhegi>":
+		normalised = normalised[:-8]
+	# Speaker tags (<S1>, <s2?>, ...) are rewritten as [*S...*], and split from the text around them
+	if speaker_tag_start.search(normalised):
+		pieces = [piece for piece in speaker_tag_split.split(normalised) if piece != ""]
+		for piece_id, piece in enumerate(pieces):
+			speaker = speaker_tag.match(piece)
+			if speaker:
+				pieces[piece_id] = "[*S" + speaker.group(1) + "*]"
+		normalised = " ".join(pieces)
+	if normalised == "</>":
+		normalised = "[~/~]"
+	elif "</>" in normalised:
+		# The text after the first '</>' is normalised in turn (and the text before it is left out)
+		normalised = "[~/~]" + normalise_markup(normalised.partition("</>")[2])
+	elif "<>" in normalised:
+		normalised = normalised.replace("<>", " ")
+	elif "< >" in normalised:
+		normalised = normalised.replace("< >", " ")
+	elif "<" in normalised and ">" in normalised and not normalised.startswith("["):
+		normalised = check_html_tags(normalised)
+	return normalised.replace("<ym>", "ymm")
+
 def remove_markup(tokens):
-	""" Remove markup tags (opening, closing, or both) from tokens, with the exception of some tags with special meaning for the CorCenCC data """
-	for i, token in enumerate(tokens):
-		discards = re.match(r"^</?(sillafu|silafu|sillafui|sillafu|sllafu|ynganu|ynagnu|ynghanu)( eng?)?>$", token)
-		if discards:
-			tokens[i] = ""
-		time_code = re.match(r'^<sync time="[\d\.]+"/>$', token)
-		if time_code:
-			tokens[i] = ""
-		if token[:3].upper() == "<D>":
-			tokens[i] = tokens[i][3:]
-		if token[-4:].upper() == "</D>":
-			tokens[i] = tokens[i][:-4]
-		if token.upper() in ["<D>", "</D>"]:
-			tokens[i] = ""
-		if token.startswith("<swn") or token.startswith("<sŵn") or token.startswith("<sw^n") or token.startswith("<sw?n"):
-			token = token.replace("sw^n", "sŵn")
-			token = token.replace("sw?n", "sŵn")
-			if token in ["<swn>", "<sŵn>"]:
-				tokens[i] = "[~sŵn~]"
-			noise_tag = re.match(r'<((?:s[wŵ]n) [^<>\n]+?)>', token)
-			if noise_tag:
-				tokens[i] = "[~" + noise_tag.group(1) + "~]"
-		if token.lower() in ["<aneglur>", "</aneglur>" "< aneglur ", "< aneglur2", "< aneglur", "< aneglur?", "<anaglur", "<anegleur?", "<aneglir", "<anegliur", "<anegllur?", "<aneglru", "<aneglu 2", "<aneglu2", "<aneglu3", "<aneglu", "<aneglu?", "<aneglue", "<aneglulr?", "<aneglur 1", "<aneglur 2", "<aneglur 3", "<aneglur 4", "<aneglur 8", "<aneglur ", "<aneglur ?", "<aneglur10", "<aneglur1", "<aneglur1", "<aneglur2", "<aneglur2", "<aneglur2?", "<aneglur3", "<aneglur3?", "<aneglur4", "<aneglur5", "<aneglur5?", "<aneglur6", "<aneglur7", "<aneglur8", "<aneglur9", "<aneglur", "<aneglur", "<aneglur?", "<aneglur?", "<aneglur??", "<aneglur???", "<aneglurl", "<aneglwyr", "<aneglyr2", "<aneglyr", "<anegrlur", "<anegulr2", "<anegulr", "<anegur1", "<anegur2", "<anegur", "<anegur?", "<anelglur?", "<anelgur1", "<anelgur2", "<anelgur3", "<anelgur", "<anelgur?", "<anelugr", "<anelur", "<anelur?", "<aneneglur1", "<aneneglur?", "<anerglu?", "<anesglur?", "<anewglur", "<angeglru", "<angeglur", "<angelur2", "<angelur", "<angelur?", "<anglur2", "<anglur", "<anglur?", "<anneglur", "<anneglur?", "<anwglur>"]:
-			token = "<aneglur>"
-		if token.lower().replace("< ", "<").replace(" >", ">") in transcriber_codes:
-			token_parts = re.split(r"/?[<> ]", token.lower())
-			new_token = "[~" + "_".join(token_parts[1:-1]) + "~]"
-			tokens[i] = new_token
-		if token.lower().startswith("<anadlu"):
-			if token.lower() == "<anadlu>":
-				tokens[i] = "[~anadlu~]"
-			elif len((re.split(r"(mewn|fewn|allan)", token.lower()))) != 1 and token.endswith(">"):
-				token_parts = re.split(r"/?[<> ]", token.lower())
-				new_token = "[~" + "_".join(token_parts[1:-1]) + "~]"
-				tokens[i] = new_token
-		if token.upper() == "<N>":
-			tokens[i] = "[~"
-		if token[:3].upper() == "<N>":
-			tokens[i] = "[~" + tokens[i][3:]
-		if token.upper() == "</N>":
-			tokens[i] = "~]"
-		if token[-4:].upper() == "</N>":
-			tokens[i] = tokens[i][:-4] + "~]"
-		if token[:7] == "<rhegi>":
-			tokens[i] = tokens[i][7:]
-		if token[-8:] == "</rhegi>":
-			tokens[i] = tokens[i][:-8]
-	for i, token in enumerate(tokens):
-		tok_split = re.split(r"(<>?[sS]\d+\??[> ])", token)
-		tok_split = list(filter(None,tok_split))
-		for its, ts in enumerate(tok_split):
-			match_speaker_tag = re.match(r"<>?[sS](\d+\??)>?$", ts)
-			if match_speaker_tag:
-				tok_split[its] = "[*S" + match_speaker_tag.group(1) + "*]"
-		tokens[i] = " ".join(tok_split)
-	for i, token in enumerate(tokens):
-		if token == "</>":
-			tokens[i] = "[~/~]"
-		elif "</>" in token:
-			tok_split = re.split(r"(</>)", token)
-			ts_index = tok_split.index("</>")
-			tail = ""
-			head = ""
-			if ts_index == 1:
-				tail = "".join(tok_split[ts_index+1:])
-				tail = " ".join(remove_markup([tail]))
-			elif ts_index == -1:
-				head = "".join(tok_split[:ts_index])
-				head = " ".join(remove_markup([head]))
-			else:
-				tail = "".join(tok_split[ts_index+1:])
-				tail = " ".join(remove_markup([tail]))
-				head = "".join(tok_split[:ts_index])
-				head = " ".join(remove_markup([head]))
-			tokens[i] = head + "[~/~]" + tail
-		elif "<>" in token:
-			tokens[i] = token.replace("<>", " ")
-		elif "< >" in token:
-			tokens[i] = token.replace("< >", " ")
-		elif "<" in token and ">" in token and not token.startswith("["):
-			tokens[i] = check_html_tags(token)
-	tokens = list(filter(None, tokens))
-	if tokens != []:
-		for i,tok in enumerate(tokens):
-			tokens[i] = (re.sub(r"<ym>", "ymm", tok))
-		return tokens
-	return []
+	""" Remove markup tags (opening, closing, or both) from tokens, with the exception of some tags with special meaning for the CorCenCC data.
+		Each token is normalised in a single pass (see 'normalise_markup'), and tokens left empty are dropped
+	"""
+	normalised_tokens = []
+	for token in tokens:
+		normalised = normalise_markup(token)
+		if normalised != "":
+			normalised_tokens.append(normalised)
+	return normalised_tokens
 
 def en_tag_check(sentence):
 	""" Ensure that content in <en> tags is kept together """
@@ -265,9 +264,9 @@ def token_split(sent, total_tokens):
 			for i, token in enumerate(token_list):
 				if " " in token and token not in ['', ' ']:
 					for tok in list(filter(None, token.split(" "))):
-						tokens = tokens + check_token(tok)
+						tokens.extend(check_token(tok))
 				elif token not in ['', ' ']:
-					tokens = tokens + check_token(token)
+					tokens.extend(check_token(token))
 	for i,t in enumerate(tokens):
 		blank = re.match(r"[\s]+", t)
 		if blank:
@@ -275,258 +274,316 @@ def token_split(sent, total_tokens):
 	tokens = list(filter(None, tokens))
 	return(tokens)
 
-def check_token(token):
+""" Characters that are split off the start or end of a token """
+split_punctuation = {"\\", ",", ".", ":", ";", '"', "!", "?", "<", ">", "{", "}", "[", "]", "(", ")", "*", "…", "¶", "+"}
+
+""" Tokens that are always kept whole """
+kept_tokens = {"<=>", "</=>", "<saib>", "<aneglur>", "<aneglur?>", "</>"}
+kept_token_length = max(len(kept) for kept in kept_tokens)
+
+""" Compiled patterns used by 'split_token' """
+english_token = re.compile(r"^(\[\*en( gair=\"[a-zA-Z]+\")?>([\w'\-]+)</en\*\])(.*)$")
+english_gair = re.compile(r"\[\*en gair=\"[a-zA-Z]+\" ?>")
+anon_token = re.compile(r"^(\[\*anon>[\w'\-\d+]+</anon\*\])(.*)$")
+speaker_token = re.compile(r"\[\*[sS](\d*\??)\*\]$")
+slashes = re.compile(r"([\\/]+)")
+initialism = re.compile(r"^([a-zA-Z]\.)+$")
+word_then_symbols = re.compile(r"^([\w']+)([^\w'\-¢%]+)$")
+symbols_then_word = re.compile(r"^([^\w\-'#@¥£€$]+)([\w']+)$")
+hashtag_whole = re.compile(r"#\w+$")
+hashtag_front = re.compile(r"^(#\w+)(\W.*)$")
+hashtag_end = re.compile(r"^(.*)(#\w+)$")
+hashtag_mid = re.compile(r"^(.+)(#\w+)(\W.*)$")
+semicolon_join = re.compile(r"^([\w]+);([\w]+)$")
+word_symbols_word = re.compile(r"^([A-Za-zÂÊÎÔÛŴŶÄÏÖËÁÉÍÓÚẂÝÀÈÌÒÙẀỲâêîôûŵŷäïöëáéíóúẃýàèìòùẁỳ']+)([^A-Za-zÂÊÎÔÛŴŶÄÏÖËÁÉÍÓÚẂÝÀÈÌÒÙẀỲâêîôûŵŷäïöëáéíóúẃýàèìòùẁỳ']+)([A-Za-zÂÊÎÔÛŴŶÄÏÖËÁÉÍÓÚẂÝÀÈÌÒÙẀỲâêîôûŵŷäïöëáéíóúẃýàèìòùẁỳ]+)$")
+apostrophes = re.compile(r"(')")
+decade = re.compile(r"^['’]?([12]?\d)?[0-9][0-9][']?(au|s)?$")
+currency_amount = re.compile(r"^[\$€£¥][0-9]+([,\.]?[0-9]+)?[p¢ckKmM]?$")
+time_of_day = re.compile(r"^((?:[012]?[0-9][:\.]?)?[012345][0-9])(yh|am|yb|pm|y\.h\.|a\.m\.|y\.b\.|p\.m\.|ybore|yrhwyr|yp)$")
+year_era = re.compile(r"^[123]?\d(\d\d)?(oc|cc|bc|bce|ce|ad|a\.\d\.|b\.c\.|b\.c\.e\.|o\.c\.|c\.c\.|c\.e\.)")
+date_day_first = re.compile(r"^[0123]?\d[\\\-\.\/–][0123]?\d[\\\-\.\/–][12]\d\d\d")
+date_year_first = re.compile(r"^[12]\d\d\d[\\\-\.\/–][0123]?\d[\\\-\.\/–][0123]?\d")
+decimal_number = re.compile(r"^-?[0-9]+[,\.]\d+%?$")
+decimal_time = re.compile(r"^-?\d+\:?[0-9]+[,\.]\d+%?$")
+number_then_text = re.compile(r"^([0-9\.,]+)([^0-9\.,]+)$")
+text_then_number = re.compile(r"^([^0-9\.,]+)([0-9\.,]+)$")
+number_then_any = re.compile(r"^([0-9\.,]+)(.+)$")
+currency_value = re.compile(r"[0-9\.,]+[¢cpMmkK]?$")
+
+def split_token(token):
+	""" Make a single splitting decision for a token, returning a list of (final, text) parts: tokens that are final, and pieces that still need to be checked """
 	### Words tagged in CorCenCC raw data as English (<en>point</en>) should be
 	### returned with their tagging so that the postagger
 	### can tag them correctly.
 	if len(token) == 1:
-		return [token]
-	match_english = re.match(r"^(\[\*en( gair=\"[a-zA-Z]+\")?>([\w'\-]+)</en\*\])(.*)$", token)
+		return [(True, token)]
+	match_english = english_token.match(token)
 	if match_english is not None:
-		no_gair = (re.sub(r"\[\*en gair=\"[a-zA-Z]+\" ?>", "[*en>", match_english.group(1)))
+		no_gair = english_gair.sub("[*en>", match_english.group(1))
 		if match_english.group(4) != "":
-			return [no_gair] + check_token(match_english.group(4))
+			return [(True, no_gair), (False, match_english.group(4))]
 		else:
-			return [no_gair]
-	match_anon = re.match(r"^(\[\*anon>[\w'\-\d+]+</anon\*\])(.*)$", token)
+			return [(True, no_gair)]
+	match_anon = anon_token.match(token)
 	if match_anon is not None:
 		if match_anon.group(2) != "":
-			return [match_anon.group(1)] + check_token(match_anon.group(2))
+			return [(True, match_anon.group(1)), (False, match_anon.group(2))]
 		else:
-			return [match_anon.group(1)]
-	match_speaker_tag = re.search(r"\[\*[sS](\d*\??)\*\]$", token)
-	if match_speaker_tag is not None:
-		return [token]
+			return [(True, match_anon.group(1))]
+	if token[-2:] == "*]" and speaker_token.search(token) is not None:
+		return [(True, token)]
 	if token[0:2] == "[~" or token[-2:] == "~]":
-		return [token]
-	if token in ["<=>", "</=>", "<saib>", "<aneglur>", "<aneglur?>", "</>"]:
-		return [token]
-	if len(re.findall(r"[\\/]", token)) > 0:
+		return [(True, token)]
+	if token in kept_tokens:
+		return [(True, token)]
+	if "\\" in token or "/" in token:
 		if len(set(token)) == 1:
 			if token == "/":
-				return [token]
+				return [(True, token)]
 			else:
-				return ["\\\\"]
-		result = []
-		split = list(filter(None, re.split(r"([\\/]+)", token)))
-		for s in split:
+				return [(True, "\\\\")]
+		parts = []
+		for s in list(filter(None, slashes.split(token))):
 			check_s = s.replace("\\", "")
 			check_s = check_s.replace("/", "")
-			if check_s == "":
-				result.append(s)
-			else:
-				result += check_token(s)
-		return result
+			parts.append((check_s == "", s))
+		return parts
 	### !!!!?:!! => ! !!!?:!! 
-	if token[0] in ["\\", ",", ".", ",", ":", ";", '"', "!", "?", "<", ">", "{", "}", "[", "]", "(", ")", "*", "…", "¶", "+"]:
-		return [token[0]] + check_token(token[1:])
-	if token[-1] in ["\\", ",", ".", ",", ":", ";", '"', "!", "?", "<", ">", "{", "}", "[", "]", "(", ")", "*", "…", "¶", "+"]:
-		return check_token(token[0:-1]) + [token[-1]]
+	### (a whole run of leading punctuation is split off at once, stopping wherever the rest of the token would be handled by one of the checks above)
+	if token[0] in split_punctuation:
+		parts = [(True, token[0])]
+		i = 1
+		while i < len(token) and token[i] in split_punctuation and not token.startswith("[*", i) and not token.startswith("[~", i) and not (len(token)-i <= kept_token_length and token[i:] in kept_tokens):
+			parts.append((True, token[i]))
+			i += 1
+		if i < len(token):
+			parts.append((False, token[i:]))
+		return parts
+	### (likewise for a run of trailing punctuation)
+	if token[-1] in split_punctuation:
+		j = len(token)-1
+		while token[j-1] in split_punctuation and not token.endswith("*]", 0, j) and not token.endswith("~]", 0, j):
+			j -= 1
+		return [(False, token[:j])] + [(True, char) for char in token[j:]]
 	### !!!! aaaaa Ffffff 
 	if len(set(token.lower())) == 1:
-		return [token]
+		return [(True, token)]
 	### gair 100
 	if token.isalpha() or token.isnumeric():
-		return [token]
+		return [(True, token)]
 	### B.B.C.
-	match_initialism = re.match(r"^([a-zA-Z]\.)+$", token)
-	if match_initialism is not None:
-		return [token]
+	if initialism.match(token) is not None:
+		return [(True, token)]
 	if token.lower() == "s4c":
-		return[token]
+		return [(True, token)]
 	### word09:!!!!!!() => word09  :!!!!!!()
-	match_end = re.match(r"^([\w']+)([^\w'\-¢%]+)$", token)
+	match_end = word_then_symbols.match(token)
 	if match_end is not None:
-		return check_token(match_end.group(1)) + check_token(match_end.group(2))
+		return [(False, match_end.group(1)), (False, match_end.group(2))]
 	### !!!!!!()word_90 => !!!!!!() word_90
-	match_start = re.match(r"^([^\w\-'#@¥£€$]+)([\w']+)$", token)
+	match_start = symbols_then_word.match(token)
 	if match_start is not None:
-		return check_token(match_start.group(1)) + check_token(match_start.group(2))
+		return [(False, match_start.group(1)), (False, match_start.group(2))]
 	### hashtags
-	if len(re.findall(r"#", token)) > 0:
-		if re.match(r"#\w+$", token):
-			return [token]
-		hashtag_front = re.match(r"^(#\w+)(\W.*)$", token)
-		if hashtag_front is not None:
-			return [hashtag_front.group(1)] + check_token(hashtag_front.group(2))
-		hashtag_end = re.match(r"^(.*)(#\w+)$", token)
-		if hashtag_end is not None:
-			return check_token(hashtag_end.group(1)) + [hashtag_end.group(2)]
-		hashtag_mid = re.match(r"^(.+)(#\w+)(\W.*)$", token)
-		if hashtag_mid is not None:
-			return check_token(hashtag_mid.group(1)) + [hashtag_mid.group(2)] + check_token(hashtag_mid.group(3))
+	if "#" in token:
+		if hashtag_whole.match(token):
+			return [(True, token)]
+		match_hashtag = hashtag_front.match(token)
+		if match_hashtag is not None:
+			return [(True, match_hashtag.group(1)), (False, match_hashtag.group(2))]
+		match_hashtag = hashtag_end.match(token)
+		if match_hashtag is not None:
+			return [(False, match_hashtag.group(1)), (True, match_hashtag.group(2))]
+		match_hashtag = hashtag_mid.match(token)
+		if match_hashtag is not None:
+			return [(False, match_hashtag.group(1)), (True, match_hashtag.group(2)), (False, match_hashtag.group(3))]
 	### hyphens
-	if len(re.findall("-", token)) != 0:
+	if "-" in token:
 		if token.lower() in cy_lexicon:
-			return [token]
+			return [(True, token)]
 		elif token[0] == "-":
-			return ["-"] + check_token(token[1:])
+			return [(True, "-"), (False, token[1:])]
 		elif token[-1] == "-":
-			return ["-"] + check_token(token[:-1])
+			return [(True, "-"), (False, token[:-1])]
 		elif token.count("-") == 1:
 			hyph_index = token.index("-")
 			if token[:hyph_index+1] in cy_lexicon:
-				return [token[:hyph_index+1]] + check_token(token[hyph_index+1:])
+				return [(True, token[:hyph_index+1]), (False, token[hyph_index+1:])]
 			else:
-				return check_token(token[:hyph_index]) + ["-"] + check_token(token[hyph_index+1:])
+				return [(False, token[:hyph_index]), (True, "-"), (False, token[hyph_index+1:])]
 		else:
-			return [token]
+			return [(True, token)]
 	### word;word => word ; word
-	match_semic = re.match(r"^([\w]+);([\w]+)$", token)
+	match_semic = semicolon_join.match(token)
 	if match_semic is not None:
-		apos_replace1 = (match_semic.group(1))
 		apos_replace2 = "'" + (match_semic.group(2))
 		if apos_replace2.lower() in cy_lexicon:
 			split2 = ";" + apos_replace2[1:]
-			return [(match_semic.group(1)), split2]
+			return [(True, match_semic.group(1)), (True, split2)]
 		else:
-			return [(match_semic.group(1)), ";", (match_semic.group(2))]
+			return [(True, match_semic.group(1)), (True, ";"), (True, match_semic.group(2))]
 	### word!word => word ! word
-	match_mid = re.match(r"^([A-Za-zÂÊÎÔÛŴŶÄÏÖËÁÉÍÓÚẂÝÀÈÌÒÙẀỲâêîôûŵŷäïöëáéíóúẃýàèìòùẁỳ']+)([^A-Za-zÂÊÎÔÛŴŶÄÏÖËÁÉÍÓÚẂÝÀÈÌÒÙẀỲâêîôûŵŷäïöëáéíóúẃýàèìòùẁỳ']+)([A-Za-zÂÊÎÔÛŴŶÄÏÖËÁÉÍÓÚẂÝÀÈÌÒÙẀỲâêîôûŵŷäïöëáéíóúẃýàèìòùẁỳ]+)$", token)
+	match_mid = word_symbols_word.match(token)
 	if match_mid is not None:
-		return check_token(match_mid.group(1)) + check_token(match_mid.group(2)) + check_token(match_mid.group(3))
+		return [(False, match_mid.group(1)), (False, match_mid.group(2)), (False, match_mid.group(3))]
 	### apostrophes
-	if len(re.findall("'", token)) != 0:
+	if "'" in token:
 		if token.lower() in cy_lexicon:
-			return [token]
+			return [(True, token)]
 		if token[0] == "'" and token[-1] == "'" and len(token) > 2:
-			return ["'"] + check_token(token[1:-1]) + ["'"]
+			return [(True, "'"), (False, token[1:-1]), (True, "'")]
 		elif token[0] == "'":
 			### 'em-all => 'em - all
-			if not token[1:].isalpha():
-				result = []
-				split = check_token(token[1:])
-				if len(split) > 1:
-					split[0] = "'" + split[0]
-					for sp in split:
-						result = result + check_token(sp)	
-					return result	
-			return ["'"] + check_token(token[1:])
+			split = check_token(token[1:])
+			if not token[1:].isalpha() and len(split) > 1:
+				split[0] = "'" + split[0]
+				return [(False, sp) for sp in split]
+			return [(True, "'")] + [(True, sp) for sp in split]
 		elif token[-1] == "'":
 			###os-f' => os - f'
-			if not token[:-1].isalpha():
-				result = []
-				split = check_token(token[:-1])
-				if len(split) > 1:
-					split[-1] = split[-1] + "'"
-					for sp in split:
-						result = result + check_token(sp)	
-					return result	
-			return check_token(token[:-1]) + ["'"
-			]
+			split = check_token(token[:-1])
+			if not token[:-1].isalpha() and len(split) > 1:
+				split[-1] = split[-1] + "'"
+				return [(False, sp) for sp in split]
+			return [(True, sp) for sp in split] + [(True, "'")]
 		else:
 			apos = "'"
-			split = list(filter(None, re.split(r"(')", token)))
-			result = []
+			split = list(filter(None, apostrophes.split(token)))
+			parts = []
 			if len(split) == 3 and split[0].isalpha() and split[2].isalpha:
 				if split[1] + split[2] in cy_lexicon:
-					return [split[0], (split[1] + split[2])]
+					return [(True, split[0]), (True, split[1] + split[2])]
 				elif split[1] + split[2] in en_dict:
-					return [split[0], (split[1] + split[2])]
+					return [(True, split[0]), (True, split[1] + split[2])]
 				else:
-					return [token]
+					return [(True, token)]
 			else:
 				for i, s in enumerate(split):
 					before = apos + s
 					after = s + apos
 					if s not in ["'", ""]:
 						if i == 1 and len(split) == 3 and split[i-1] == "'" and split[i+1] == "'":
-								result = result + [apos] + check_token(s) + [apos]
+								parts += [(True, apos), (False, s), (True, apos)]
 						if i == 0:
 							if split[i+1] == "'":
 								if after in contractions_and_prefixes:
-									result.append(after)
+									parts.append((True, after))
 									split[i+1] = ""
 								else:
-									result = result + check_token(s)
+									parts.append((False, s))
 							else:
-								result = result + check_token(s)
+								parts.append((False, s))
 						if i != 0 and i != len(split)-1:
 							if split[i-1] == "'" and (before in contractions_and_prefixes):
-								result.append(before)
+								parts.append((True, before))
 							elif split[i-1] == "'":
 								if split[i+1] == "'" and (after in contractions_and_prefixes):
-									result.append(after)
-									split[i+1] == ""
+									parts.append((True, after))
 								else:
-									result = result + [apos] + check_token(s)
+									parts += [(True, apos), (False, s)]
 							else:
-								result = result + check_token(s)
+								parts.append((False, s))
 						elif i == len(split)-1:
 							if split[i-1] == "'" and (before in contractions_and_prefixes):
-								result.append(before)
+								parts.append((True, before))
 							elif split[i-1] == "'":
-								result = result + ["'"] + check_token(s)
+								parts += [(True, "'"), (False, s)]
 							else:
-								result = result + check_token(s)
-			return result
+								parts.append((False, s))
+			return parts
 	### numerical strings
 	if token[0].isnumeric():
 		### 1990au 1990s 90s 90's 90au
-		if re.match(r"^['’]?([12]?\d)?[0-9][0-9][']?(au|s)?$", token):
-			return [token]
+		if decade.match(token):
+			return [(True, token)]
 		### 90c 75p 99K
-		if re.match(r"^[\$€£¥][0-9]+([,\.]?[0-9]+)?[p¢ckKmM]?$", token):
-			return [token]
+		if currency_amount.match(token):
+			return [(True, token)]
 		### 6pm 7yh 9a.m.
-		if re.match(r"^((?:[012]?[0-9][:\.]?)?[012345][0-9])(yh|am|yb|pm|y\.h\.|a\.m\.|y\.b\.|p\.m\.|ybore|yrhwyr|yp)$", token):
-			time = re.match(r"^((?:[012]?[0-9][:\.]?)?[012345][0-9])(yh|am|yb|pm|y\.h\.|a\.m\.|y\.b\.|p\.m\.|ybore|yrhwyr|yp)?$", token)
-			return [time.group(1)] + check_token(time.group(2))
+		match_time = time_of_day.match(token)
+		if match_time:
+			return [(True, match_time.group(1)), (False, match_time.group(2))]
 		### 654BC
-		if re.match(r"^[123]?\d(\d\d)?(oc|cc|bc|bce|ce|ad|a\.\d\.|b\.c\.|b\.c\.e\.|o\.c\.|c\.c\.|c\.e\.)", token.lower()):
-			return [token]
+		if year_era.match(token.lower()):
+			return [(True, token)]
 		### 09\07\2007
-		if re.match(r"^[0123]?\d[\\\-\.\/–][0123]?\d[\\\-\.\/–][12]\d\d\d", token) or re.match(r"^[12]\d\d\d[\\\-\.\/–][0123]?\d[\\\-\.\/–][0123]?\d", token):
-			return [token]
-		if re.match(r"^-?[0-9]+[,\.]\d+%?$", token) or re.match(r"^-?\d+\:?[0-9]+[,\.]\d+%?$", token):
-			return [token]
+		if date_day_first.match(token) or date_year_first.match(token):
+			return [(True, token)]
+		if decimal_number.match(token) or decimal_time.match(token):
+			return [(True, token)]
 	### 100people => 100 people
-	match_num1 = re.match(r"^([0-9\.,]+)([^0-9\.,]+)$", token)
-	if match_num1 is not None:
-		return check_token(match_num1.group(1)) + check_token(match_num1.group(2))
-	match_num2 = re.match(r"^([^0-9\.,]+)([0-9\.,]+)$", token)
-	if match_num2 is not None:
-		return check_token(match_num2.group(1)) + check_token(match_num2.group(2))
-	match_num3 = re.match(r"^([0-9\.,]+)(.+)$", token)
-	if match_num3 is not None:
-		return check_token(match_num3.group(1)) + check_token(match_num3.group(2))		
+	match_num = number_then_text.match(token)
+	if match_num is not None:
+		return [(False, match_num.group(1)), (False, match_num.group(2))]
+	match_num = text_then_number.match(token)
+	if match_num is not None:
+		return [(False, match_num.group(1)), (False, match_num.group(2))]
+	match_num = number_then_any.match(token)
+	if match_num is not None:
+		return [(False, match_num.group(1)), (False, match_num.group(2))]
 	### 90c 75p 99K
-	if token[0] in ["$", "€", "£", "¥"] and re.match(r"[0-9\.,]+[¢cpMmkK]?$", token[1:]):
-		return [token]
-	return [token]
+	if token[0] in ["$", "€", "£", "¥"] and currency_value.match(token[1:]):
+		return [(True, token)]
+	return [(True, token)]
 
-def tokenise(sentence, total_sentences=None, total_tokens=None):
-	""" Split an input sentence into tokens, and return them as tab-separated values """
-	split_tokens = ""
+def check_token(token):
+	""" Split a token into a list of tokens, working through a stack of the pieces that still need to be checked (rather than recursing).
+		The one exception is a token that starts or ends with an apostrophe (see 'split_token'): whether the apostrophe is split off depends on how the rest of the token splits as a whole, so the rest is split first with a nested 'check_token' (one level for each apostrophe stripped from the ends, so the nesting is only as deep as the token has leading or trailing apostrophes)
+	"""
+	tokens = []
+	pending = [(False, token)]
+	while pending:
+		final, text = pending.pop()
+		if final:
+			tokens.append(text)
+		else:
+			pending.extend(reversed(split_token(text)))
+	return tokens
+
+def tokenise_records(sentence, total_sentences=None, total_tokens=None):
+	""" Split an input sentence into tokens, and return them as a list of Token records """
 	#if sentence[-1:] == "." and sentence[-2:] != " .":
 		#sentence = "{}{}".format(sentence[:-1], " .")
 	tokens = token_split(sentence, total_tokens)
-	for token_id, token in enumerate(tokens):
-		if token not in ["", " ", "  "]:
-			split_tokens += "{}\t{}\t{}\n".format(total_tokens+token_id+1, token, "{},{}".format(total_sentences, token_id+1))
-	return split_tokens
+	return [Token(total_tokens+token_id+1, token, total_sentences, token_id+1) for token_id, token in enumerate(tokens) if token not in ["", " ", "  "]]
 
-def tokeniser(input_data):
-	""" Segment, sentence split, and then tokenise the input files/text """
-	tokenised = ""
+def tokenise(sentence, total_sentences=None, total_tokens=None):
+	""" Split an input sentence into tokens, and return them as tab-separated values """
+	return "".join(token.tsv() + "\n" for token in tokenise_records(sentence, total_sentences, total_tokens))
+
+def tokenised_sentences(input_data):
+	""" Segment, sentence split, and then tokenise the input files/text, yielding the tokens of each sentence in turn as tab-separated values """
 	total_sentences, total_tokens = 0, 0
 	if isinstance(input_data, list):
 		for file_id, file in enumerate(input_data):
-			with open(file, encoding="utf-8") as file_text:
-				for segment_id, segment in enumerate(segment_text(file_text.read())):
-					for sentence_id, sentence in enumerate(split_sentences(segment)):
-						total_sentences += 1
-						split_tokens = tokenise(sentence, total_sentences, total_tokens)
-						tokenised += split_tokens
-						total_tokens += len(split_tokens.splitlines())
+			for segment_id, segment in enumerate(file_segments(file)):
+				for sentence_id, sentence in enumerate(split_sentences(segment)):
+					total_sentences += 1
+					split_tokens = tokenise(sentence, total_sentences, total_tokens)
+					yield split_tokens
+					total_tokens += len(split_tokens.splitlines())
 	elif isinstance(input_data, str):
 		for segment_id, segment in enumerate(segment_text(input_data.replace("\\n", "\n"))):
 			for sentence_id, sentence in enumerate(split_sentences(segment)):
 				total_sentences += 1
 				split_tokens = tokenise(sentence, total_sentences, total_tokens)
-				tokenised += split_tokens
+				yield split_tokens
 				total_tokens += len(split_tokens.splitlines())
-	return(tokenised.strip())
+
+def tokeniser(input_data, output_path=None):
+	""" Segment, sentence split, and then tokenise the input files/text.
+		If an output path is given ('-' for standard output), the tokens are written to it as each sentence is tokenised (as the returned text would be printed), rather than returned
+	"""
+	if output_path == None:
+		return("".join(tokenised_sentences(input_data)).strip())
+	output_file = open_output(output_path)
+	try:
+		output = StrippedOutput(output_file)
+		for split_tokens in tokenised_sentences(input_data):
+			output.write(split_tokens)
+		output.close()
+	finally:
+		close_output(output_file)
 
 if __name__ == "__main__":
 	""" Split the provided input into tokens (text as a string, or files) """
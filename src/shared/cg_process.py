@@ -0,0 +1,175 @@
+#!usr/bin/env python3
+#-*- coding: utf-8 -*-
+"""
+'cg_process.py'
+
+A long-running VISL CG-3 process, fed CG-formatted readings through its standard input and read back through its standard output, so that repeated runs don't pay for starting vislcg3 and parsing the grammar every time.
+
+Each set of readings is followed by a '<STREAMCMD:FLUSH>' line, which makes vislcg3 finish the current window, write out everything it has read so far and echo the flush line back; the output for the run is everything before the echoed line.
+A process can instead pass CG-3's binary stream format (see 'cg_stream.py'), if the installed vislcg3 supports it (see 'binary_stream_supported'): each set of readings is then sent as window packets followed by a flush command packet, and the output is the packets that come back before the echoed flush command.
+If the process dies, it is started again (and the run retried once) the next time it is used. It is shut down when it is closed, or (if it is still in use) when the interpreter exits.
+
+Developed at Cardiff University as part of the CorCenCC project (www.corcencc.org).
+
+This program is free software: you can redistribute it and/or modify it under the terms of the GNU General Public License as published by the Free Software Foundation, either version 3 of the License or (at your option) any later version.
+This program is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for more details.
+You should have received a copy of the GNU General Public License along with this program. If not, see <http://www.gnu.org/licenses>.
+"""
+
+import os
+import atexit
+import struct
+import subprocess
+import threading
+import weakref
+
+from shared.cg_stream import stream_header, packet_start, encode_command, encode_readings, binary_cohorts
+from shared.cg_stream import flush_command as binary_flush_command
+
+flush_command = "<STREAMCMD:FLUSH>"
+
+""" The CGProcesses that are still in use (held weakly, so that a process that is no longer referenced can be garbage collected, e.g. when a Tagger is created for each request in a long-running service) """
+live_processes = weakref.WeakSet()
+
+def close_all():
+	""" Stop every CGProcess that is still in use (registered once, to run when the interpreter exits) """
+	for cg_process in list(live_processes):
+		cg_process.close()
+
+atexit.register(close_all)
+
+binary_flags = ["--in-binary", "--out-binary"]
+
+""" Whether each vislcg3 command that has been checked supports the binary stream format (see 'binary_stream_supported') """
+binary_support = {}
+
+def binary_stream_supported(command, timeout=60):
+	""" Check (once for each command) whether a vislcg3 command supports the binary stream format, by passing a single cohort through it in binary and checking that the same cohort comes back, followed by the flush command.
+		Any failure (an older vislcg3 that doesn't know the binary flags, a build without binary support, output that can't be decoded) means that it doesn't, and the text format is used instead
+	"""
+	key = tuple(command)
+	if key not in binary_support:
+		probe = [("\"<probe>\"", [("\"probe\"", ["{0,0}", "[cy]", "Atd"])])]
+		try:
+			probe_run = subprocess.run(list(command) + binary_flags, input=stream_header + encode_readings("\"<probe>\"\n\t\"probe\" {0,0} [cy] Atd\n", 20, 45, {"Atd"}, set()) + encode_command(binary_flush_command), stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, timeout=timeout)
+			binary_support[key] = probe_run.returncode == 0 and probe_run.stdout.startswith(stream_header) and probe_run.stdout.endswith(encode_command(binary_flush_command)) and list(binary_cohorts(probe_run.stdout)) == probe
+		except (OSError, subprocess.SubprocessError, ValueError, IndexError, struct.error):
+			binary_support[key] = False
+	return binary_support[key]
+
+class CGProcess:
+	""" A VISL CG-3 process running the given command, which is started the first time it is used (and again, in a process forked from the one that started it).
+		If 'binary' is set, the process is run with the binary stream format, and is passed window packets (bytes) rather than CG-formatted readings
+	"""
+
+	def __init__(self, command, binary=False):
+		self.command = command + binary_flags if binary else command
+		self.binary = binary
+		self.process = None
+		self.pid = None
+		self.lock = threading.Lock()
+		live_processes.add(self)
+
+	def start(self):
+		self.process = subprocess.Popen(self.command, stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+		self.pid = os.getpid()
+		""" The stream header is sent before the first set of packets, and read back before the first output """
+		self.header_pending = self.binary
+
+	def running(self):
+		return self.process != None and self.pid == os.getpid() and self.process.poll() == None
+
+	def _write(self, data):
+		""" Write to the process's standard input (from a separate thread, so that a large input can't fill the pipes and deadlock against the output) """
+		try:
+			self.process.stdin.write(data)
+			self.process.stdin.flush()
+		except (BrokenPipeError, ValueError):
+			pass
+
+	def _run(self, readings):
+		""" Pass a set of readings through the process, returning its output (or None if the process died before finishing it) """
+		if not readings.endswith("\n"):
+			readings += "\n"
+		writer = threading.Thread(target=self._write, args=("{}{}\n".format(readings, flush_command).encode("utf-8"),), daemon=True)
+		writer.start()
+		output = []
+		flush_line = flush_command.encode("utf-8")
+		for line in iter(self.process.stdout.readline, b""):
+			if line.rstrip(b"\r\n") == flush_line:
+				writer.join()
+				return b"".join(output).decode("utf-8")
+			output.append(line)
+		writer.join()
+		return None
+
+	def _read_packet(self):
+		""" Read a packet from the process's standard output (or None, at the end of the output) """
+		start = self.process.stdout.read(packet_start.size)
+		if len(start) < packet_start.size:
+			return None
+		length = packet_start.unpack(start)[1]
+		payload = self.process.stdout.read(length)
+		return start + payload if len(payload) == length else None
+
+	def _run_binary(self, window_packets):
+		""" Pass a set of window packets through the process, returning its output as a binary stream (or None if the process died before finishing it) """
+		flush_packet = encode_command(binary_flush_command)
+		data = window_packets + flush_packet
+		if self.header_pending:
+			data = stream_header + data
+		writer = threading.Thread(target=self._write, args=(data,), daemon=True)
+		writer.start()
+		output = [stream_header]
+		if self.header_pending:
+			self.header_pending = False
+			if self.process.stdout.read(len(stream_header)) != stream_header:
+				writer.join()
+				return None
+		packet = self._read_packet()
+		while packet != None:
+			if packet == flush_packet:
+				writer.join()
+				return b"".join(output)
+			output.append(packet)
+			packet = self._read_packet()
+		writer.join()
+		return None
+
+	def run(self, readings):
+		""" Run VISL CG-3 over a set of readings (or window packets, for a binary process), (re)starting the process if it isn't running """
+		with self.lock:
+			for attempt in range(2):
+				if not self.running():
+					self.stop()
+					self.start()
+				cg_output = self._run_binary(readings) if self.binary else self._run(readings)
+				if cg_output != None:
+					return cg_output
+				self.stop()
+			raise ValueError("VISL CG-3 stopped unexpectedly (twice) while processing the readings. If details of an error were printed above this message, please try and resolve them. Otherwise, contact us via the details in the README file\n")
+
+	def stop(self):
+		""" Stop the process (if this process started it), giving it a few seconds to finish cleanly """
+		if self.process != None and self.pid == os.getpid():
+			try:
+				self.process.stdin.close()
+			except OSError:
+				pass
+			try:
+				self.process.wait(timeout=5)
+			except subprocess.TimeoutExpired:
+				self.process.kill()
+				self.process.wait()
+			self.process.stdout.close()
+		self.process = None
+
+	def close(self):
+		with self.lock:
+			self.stop()
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, exc_type, exc_value, traceback):
+		self.close()
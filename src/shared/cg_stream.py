@@ -0,0 +1,205 @@
+#!usr/bin/env python3
+#-*- coding: utf-8 -*-
+"""
+'cg_stream.py'
+
+The two streams CyTag uses to pass readings to VISL CG-3 and map its output back to tagged tokens: CG-3's binary stream format (when the installed vislcg3 supports it - see 'binary_stream_supported' in 'cg_process.py') and the CG text format.
+
+In the binary stream, each window of cohorts is sent as a packet holding the window's tags once, with each cohort's wordform and each reading's baseform and tags given as indexes into them:
+
+	header:		"CGBF", uint32 version
+	packet:		uint8 type (1 = window, 2 = command, 3 = text), uint32 length, payload
+	window:		uint16 flags, uint16 tag count, tags (uint16 length, UTF-8), uint16 cohort count, cohorts
+	cohort:		uint16 flags, uint16 wordform, uint32 self, uint32 parent, uint16 reading count, readings
+	reading:	uint16 flags, uint16 baseform, uint16 tag count, uint16 tags
+	command:	uint8 command (1 = flush, 2 = exit)
+
+(all little-endian), so the readings that come back are read without any parsing of the reading lines at all.
+In the text format, the output is read one cohort at a time:
+
+	"<wordform>"
+		"lemma" {sentence,token} [cy] tag tag ... :english_lemma: ... + mutation
+
+and each reading line is split into its fields directly (lemma, position, language, tags, English lemmas, mutation), rather than with a regular expression search and replace over the whole line.
+Readings that the direct split can't be sure to handle in the same way as the original regular expressions (those with quotes or braces in their lemmas, for example) are split with the regular expressions instead, so the fields are always the same.
+
+Developed at Cardiff University as part of the CorCenCC project (www.corcencc.org).
+
+This program is free software: you can redistribute it and/or modify it under the terms of the GNU General Public License as published by the Free Software Foundation, either version 3 of the License or (at your option) any later version.
+This program is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for more details.
+You should have received a copy of the GNU General Public License along with this program. If not, see <http://www.gnu.org/licenses>.
+"""
+
+import re
+import struct
+
+""" The lemma of a reading, when splitting a token's readings for disambiguation (see 'list_readings' in 'cy_postagger.py') """
+lemma_field = re.compile(r'\"(.+?)\" {')
+""" The lemma of a reading, when splitting a token's only reading (see 'process_single_reading' in 'cy_postagger.py') """
+single_lemma_field = re.compile(r'\"([^{]+?)\" ')
+
+stream_header = b"CGBF" + struct.pack("<I", 1)
+window_packet, command_packet, text_packet = 1, 2, 3
+flush_command, exit_command = 1, 2
+
+packet_start = struct.Struct("<BI")
+count = struct.Struct("<H")
+cohort_start = struct.Struct("<HHIIH")
+reading_start = struct.Struct("<HHH")
+
+def encode_command(command_code):
+	""" A command packet (e.g. 'flush_command', which makes vislcg3 finish the current window and write out everything it has read so far, followed by the same command) """
+	return packet_start.pack(command_packet, 1) + bytes([command_code])
+
+def encode_window(window):
+	""" Encode a window (a list of (wordform, list of (baseform, list of tags)) cohorts) as a window packet """
+	tags, tag_ids = [], {}
+	def tag_id(tag):
+		if tag not in tag_ids:
+			tag_ids[tag] = len(tags)
+			tags.append(tag)
+		return tag_ids[tag]
+	cohort_data = []
+	for wordform, readings in window:
+		cohort_data.append(cohort_start.pack(0, tag_id(wordform), 0, 0, len(readings)))
+		for baseform, reading_tags in readings:
+			ids = [tag_id(tag) for tag in reading_tags]
+			cohort_data.append(reading_start.pack(0, tag_id(baseform), len(ids)))
+			cohort_data.append(struct.pack("<{}H".format(len(ids)), *ids))
+	tag_data = []
+	for tag in tags:
+		encoded_tag = tag.encode("utf-8")
+		tag_data.append(count.pack(len(encoded_tag)))
+		tag_data.append(encoded_tag)
+	payload = b"".join([count.pack(0), count.pack(len(tags))] + tag_data + [count.pack(len(window))] + cohort_data)
+	return packet_start.pack(window_packet, len(payload)) + payload
+
+def text_cohorts(readings):
+	""" Yield (wordform, list of (baseform, list of tags)) for each cohort in a set of CG-formatted readings produced by CyTag (whose baseforms are always followed by the reading's position) """
+	wordform, cohort_readings = None, []
+	for line in readings.splitlines():
+		if line == "":
+			continue
+		if line[:1] != "\t":
+			if wordform != None:
+				yield wordform, cohort_readings
+			wordform, cohort_readings = line, []
+		else:
+			baseform_end = line.find("\" {", 2)
+			if baseform_end == -1:
+				baseform_end = line.find("\" ", 2)
+			if baseform_end == -1:
+				cohort_readings.append((line[1:], []))
+			else:
+				cohort_readings.append((line[1:baseform_end+1], line[baseform_end+2:].split()))
+	if wordform != None:
+		yield wordform, cohort_readings
+
+def encode_readings(readings, soft_limit, hard_limit, delimiters, soft_delimiters):
+	""" Encode a set of CG-formatted readings as window packets, cutting the windows where VISL CG-3 would cut them when reading the text format: after a cohort with a reading tagged with one of the 'delimiters', after a cohort whose wordform is one of the 'soft_delimiters' once the window has 'soft_limit' cohorts, and at 'hard_limit' cohorts """
+	packets, window = [], []
+	for wordform, cohort_readings in text_cohorts(readings):
+		window.append((wordform, cohort_readings))
+		if len(window) >= hard_limit or (len(window) >= soft_limit and wordform in soft_delimiters) or any(not delimiters.isdisjoint(reading_tags) for baseform, reading_tags in cohort_readings):
+			packets.append(encode_window(window))
+			window = []
+	if len(window) > 0:
+		packets.append(encode_window(window))
+	return b"".join(packets)
+
+def packets(cg_output):
+	""" Yield (packet type, payload) for each packet in a binary stream (with or without its header) """
+	data = memoryview(cg_output)
+	position = len(stream_header) if data[:len(stream_header)] == stream_header else 0
+	while position < len(data):
+		packet_type, length = packet_start.unpack_from(data, position)
+		position += packet_start.size
+		yield packet_type, data[position:position+length]
+		position += length
+
+def decode_window(payload):
+	""" Return the cohorts in a window packet's payload, as a list of (wordform, list of (baseform, list of tags)).
+		The counts and tag indexes (little-endian uint16s) are read a byte at a time, which is quicker than a 'struct' call for each of them
+	"""
+	payload = bytes(payload)
+	tag_count, = count.unpack_from(payload, 2)
+	position = 4
+	tags = []
+	for tag_number in range(tag_count):
+		end = position + 2 + payload[position] + (payload[position+1] << 8)
+		tags.append(payload[position+2:end].decode("utf-8"))
+		position = end
+	cohort_count, = count.unpack_from(payload, position)
+	position += 2
+	window = []
+	for cohort_number in range(cohort_count):
+		wordform, reading_count = payload[position+2] + (payload[position+3] << 8), payload[position+12] + (payload[position+13] << 8)
+		position += cohort_start.size
+		cohort_readings = []
+		for reading_number in range(reading_count):
+			baseform, reading_tag_count = payload[position+2] + (payload[position+3] << 8), payload[position+4] + (payload[position+5] << 8)
+			position += reading_start.size
+			cohort_readings.append((tags[baseform], [tags[tag] for tag in struct.unpack_from("<{}H".format(reading_tag_count), payload, position)]))
+			position += 2 * reading_tag_count
+		window.append((tags[wordform], cohort_readings))
+	return window
+
+def binary_cohorts(cg_output):
+	""" Yield (wordform, list of (baseform, list of tags)) for each cohort in a binary stream, in order """
+	for packet_type, payload in packets(cg_output):
+		if packet_type == window_packet:
+			yield from decode_window(payload)
+
+def cohorts(cg_output):
+	""" Yield (wordform line, list of readings) for each cohort in VISL CG-3 output, in order, skipping blank lines and the end-of-sentence markers.
+		For a binary stream (bytes), each reading is a (baseform, list of tags) pair; for the text format, each reading is a reading line (either can be split with 'reading_fields')
+	"""
+	if isinstance(cg_output, bytes):
+		for wordform, readings in binary_cohorts(cg_output):
+			if "~EOS~" not in wordform:
+				yield wordform, readings
+		return
+	wordform, readings = None, []
+	for line in cg_output.strip().splitlines():
+		if line == "" or "~EOS~" in line:
+			continue
+		if line[:1] != "\t":
+			if wordform != None:
+				yield wordform, readings
+			wordform, readings = line, []
+		else:
+			readings.append(line)
+	if wordform != None:
+		yield wordform, readings
+
+def cg_text(cg_output):
+	""" Return VISL CG-3 output in the CG text format (rendering a binary stream as vislcg3 would have written it for the same readings in text) """
+	if not isinstance(cg_output, bytes):
+		return cg_output
+	lines = []
+	for packet_type, payload in packets(cg_output):
+		if packet_type == window_packet:
+			for wordform, readings in decode_window(payload):
+				lines.append(wordform)
+				lines.extend("\t{}".format(" ".join([baseform] + tags)) for baseform, tags in readings)
+		elif packet_type == text_packet:
+			lines.append(str(payload, "utf-8").rstrip("\n"))
+	return "".join("{}\n".format(line) for line in lines)
+
+def reading_fields(reading, lemma_pattern=lemma_field):
+	""" Split a reading into its fields, with any spaces in its (quoted) lemma replaced by underscores so that the lemma stays a single field.
+		Readings from a binary stream are already split; reading lines from the text format are split on whitespace
+	"""
+	if isinstance(reading, tuple):
+		return [reading[0].replace(" ", "_")] + reading[1]
+	if reading[:2] == "\t\"":
+		lemma_end = reading.find("\" {", 2)
+		if lemma_end != -1:
+			lemma, rest = reading[2:lemma_end], reading[lemma_end+1:]
+			if "\"" not in lemma and "{" not in lemma and "\"" not in rest and lemma.replace(" ", "").isprintable() and (" " not in lemma or lemma not in rest):
+				fields = rest.split()
+				fields.insert(0, "\"{}\"".format(lemma.replace(" ", "_")))
+				return fields
+	for lemma in lemma_pattern.findall(reading):
+		reading = reading.replace(lemma, lemma.replace(" ", "_"))
+	return re.split(r"\s+", reading.strip())
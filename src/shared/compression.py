@@ -0,0 +1,60 @@
+#!usr/bin/env python3
+#-*- coding: utf-8 -*-
+"""
+'compression.py'
+
+Reads and writes compressed (gzip, bzip2 or xz) text files transparently, so that CyTag can work with archived corpora without decompressing them to disk first:
+	--- 'open_text': opens an input file as text, decompressing it as it is read if it is compressed (found by its extension - .gz, .bz2, .xz - or, failing that, by the magic bytes at its start).
+	--- 'open_text_output': opens an output file, compressing what is written to it if its name ends with one of those extensions.
+
+Developed at Cardiff University as part of the CorCenCC project (www.corcencc.org).
+
+This program is free software: you can redistribute it and/or modify it under the terms of the GNU General Public License as published by the Free Software Foundation, either version 3 of the License or (at your option) any later version.
+This program is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for more details.
+You should have received a copy of the GNU General Public License along with this program. If not, see <http://www.gnu.org/licenses>.
+"""
+
+import os
+import gzip
+import bz2
+import lzma
+
+""" The compression formats CyTag can read and write: file extension -> module """
+compression_formats = {".gz": gzip, ".bz2": bz2, ".xz": lzma}
+
+def magic_compression(start):
+	""" Return the module for the compression format that a file starting with the given bytes is in (or None, if it isn't compressed) """
+	if start[:2] == b"\x1f\x8b":
+		return gzip
+	if start[:6] == b"\xfd7zXZ\x00":
+		return lzma
+	""" bzip2 streams start with 'BZh', the block size (1-9), and then the magic number of either the first block or the end of the stream """
+	if start[:3] == b"BZh" and start[3:4] in b"123456789" and start[4:10] in [b"1AY&SY", b"\x17rE8P\x90"]:
+		return bz2
+	return None
+
+def compression_module(path, check_contents=True):
+	""" Return the module for the compression format of a file, from its extension or (if 'check_contents' is set) its first few bytes, or None if it isn't compressed """
+	extension = os.path.splitext(path)[1].lower()
+	if extension in compression_formats:
+		return compression_formats[extension]
+	if check_contents:
+		with open(path, "rb") as input_file:
+			return magic_compression(input_file.read(10))
+	return None
+
+def open_text(path):
+	""" Open an input file as UTF-8 text, decompressing it as it is read if it is compressed """
+	module = compression_module(path)
+	if module == None:
+		return open(path, encoding="utf-8")
+	return module.open(path, "rt", encoding="utf-8")
+
+def open_text_output(path, mode="w", encoding=None):
+	""" Open an output file for text, compressing it if its name ends with a compression extension (compressed files are always written as UTF-8) """
+	module = compression_module(path, check_contents=False)
+	if module == None:
+		return open(path, mode, encoding=encoding)
+	if module == gzip:
+		return gzip.open(path, mode + "t", compresslevel=6, encoding="utf-8")
+	return module.open(path, mode + "t", encoding="utf-8")
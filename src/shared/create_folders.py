@@ -18,7 +18,7 @@ import sys
 import os
 
 def create_folders(output_name, directory):
-	""" Given an output name and a directory name, create the necessary folders to store CyTag output """
-	directory = output_name if directory == None else directory
-	if not os.path.exists("{}/../../{}/{}".format(os.path.dirname(os.path.abspath(__file__)), "outputs", directory)):
-		os.makedirs("{}/../../{}/{}".format(os.path.dirname(os.path.abspath(__file__)), "outputs", directory))
\ No newline at end of file
+	""" Given an output name and a directory name, create the necessary folders to store CyTag output (in CyTag's 'outputs' folder, unless the directory is given as an absolute path) """
+	directory = os.path.join("{}/../../{}".format(os.path.dirname(os.path.abspath(__file__)), "outputs"), "{}".format(output_name if directory == None else directory))
+	if not os.path.exists(directory):
+		os.makedirs(directory)
\ No newline at end of file
@@ -0,0 +1,95 @@
+#!usr/bin/env python3
+#-*- coding: utf-8 -*-
+"""
+'db_writer.py'
+
+Writes CyTag's output to a (local, SQLite) corpus database, with a table for each level of the corpus:
+
+	corpora (id, name)
+	files (id, corpus, file_id, name)
+	sentences (id, corpus, file, sentence_id)
+	tokens (id, sentence, token_id, token, position, lemma, basic_pos, rich_pos, mutation, readings)
+
+('file_id', 'sentence_id' and 'token_id' are the ids given in CyTag's other output formats, counted from 1 in each run, while 'id' is unique across the database.)
+
+Files and sentences are added as they are read, and tokens as they are tagged, and are inserted in batches (one transaction for each), rather than a row at a time.
+The tokens are indexed by lemma, rich POS tag and surface form (the token itself). A new database is indexed once all of its tokens have been inserted, while the rows added to an existing database (when appending another corpus to it) are indexed as they are inserted.
+
+Developed at Cardiff University as part of the CorCenCC project (www.corcencc.org).
+
+This program is free software: you can redistribute it and/or modify it under the terms of the GNU General Public License as published by the Free Software Foundation, either version 3 of the License or (at your option) any later version.
+This program is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for more details.
+You should have received a copy of the GNU General Public License along with this program. If not, see <http://www.gnu.org/licenses>.
+"""
+
+import os
+import sqlite3
+
+schema = [
+	"CREATE TABLE IF NOT EXISTS corpora (id INTEGER PRIMARY KEY, name TEXT)",
+	"CREATE TABLE IF NOT EXISTS files (id INTEGER PRIMARY KEY, corpus INTEGER REFERENCES corpora(id), file_id INTEGER, name TEXT)",
+	"CREATE TABLE IF NOT EXISTS sentences (id INTEGER PRIMARY KEY, corpus INTEGER REFERENCES corpora(id), file INTEGER REFERENCES files(id), sentence_id INTEGER)",
+	"CREATE TABLE IF NOT EXISTS tokens (id INTEGER PRIMARY KEY, sentence INTEGER REFERENCES sentences(id), token_id INTEGER, token TEXT, position TEXT, lemma TEXT, basic_pos TEXT, rich_pos TEXT, mutation TEXT, readings INTEGER)"
+]
+
+indexes = [
+	"CREATE INDEX IF NOT EXISTS tokens_lemma ON tokens (lemma)",
+	"CREATE INDEX IF NOT EXISTS tokens_rich_pos ON tokens (rich_pos)",
+	"CREATE INDEX IF NOT EXISTS tokens_token ON tokens (token)",
+	"CREATE INDEX IF NOT EXISTS tokens_sentence ON tokens (sentence)"
+]
+
+class DBWriter:
+	""" A writer for a CyTag corpus database, inserting rows in batches of (at least) 'batch_size' tokens.
+		Unless 'append' is set, any existing database at the given path is replaced
+	"""
+
+	def __init__(self, path, corpus_name, append=False, batch_size=50000):
+		if not append:
+			for existing_file in [path, "{}-journal".format(path)]:
+				if os.path.exists(existing_file):
+					os.remove(existing_file)
+		self.connection = sqlite3.connect(path)
+		self.batch_size = batch_size
+		for statement in schema:
+			self.connection.execute(statement)
+		self.indexed = append
+		if append:
+			for statement in indexes:
+				self.connection.execute(statement)
+		""" The rows of this run are given ids following on from those already in the database """
+		self.file_offset, self.sentence_offset, self.token_offset = [self.connection.execute("SELECT COALESCE(MAX(id), 0) FROM {}".format(table)).fetchone()[0] for table in ["files", "sentences", "tokens"]]
+		self.corpus = self.connection.execute("INSERT INTO corpora (name) VALUES (?)", (corpus_name,)).lastrowid
+		self.file = None
+		self.files, self.sentences, self.tokens = [], [], []
+
+	def add_file(self, file_id, name):
+		self.file = self.file_offset + file_id
+		self.files.append((self.file, self.corpus, file_id, name))
+
+	def add_sentence(self, sentence_id):
+		self.sentences.append((self.sentence_offset + sentence_id, self.corpus, self.file, sentence_id))
+
+	def add_token(self, tagged_token, readings):
+		""" Add a TaggedToken (with the number of readings it had before CG), inserting the rows added so far once there is a full batch of tokens """
+		self.tokens.append((self.token_offset + tagged_token.id, self.sentence_offset + tagged_token.sentence(), tagged_token.id, tagged_token.token, tagged_token.position, tagged_token.lemma, tagged_token.basic_pos, tagged_token.rich_pos, tagged_token.mutation if tagged_token.mutation != "" else None, readings))
+		if len(self.tokens) >= self.batch_size:
+			self.flush()
+
+	def flush(self):
+		""" Insert the files, sentences and tokens added since the last batch, in a single transaction """
+		with self.connection:
+			self.connection.executemany("INSERT INTO files VALUES (?, ?, ?, ?)", self.files)
+			self.connection.executemany("INSERT INTO sentences VALUES (?, ?, ?, ?)", self.sentences)
+			self.connection.executemany("INSERT INTO tokens VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", self.tokens)
+		self.files, self.sentences, self.tokens = [], [], []
+
+	def close(self):
+		""" Insert everything that is left, index the tokens (if the database is new) and close the database """
+		self.flush()
+		if not self.indexed:
+			with self.connection:
+				for statement in indexes:
+					self.connection.execute(statement)
+			self.indexed = True
+		self.connection.close()
@@ -8,6 +8,10 @@ A script for loading Welsh gazetteers for use in CyTag.
 Returns:
 	--- A dictionary containing various gazetteers.
 
+The compiled gazetteers ('gazetteer_dict.json') record a fingerprint of each gazetteer file, and 'refresh_gazetteers' rebuilds any gazetteer whose file has changed.
+
+'refresh_gazetteers' also keeps a compiled gazetteer index (a memory-mapped table, see 'mapped_table.py') up to date, which maps each term to a bitmask of the gazetteers it appears in (see 'gazetteer_categories').
+
 Developed at Cardiff University as part of the CorCenCC project (www.corcencc.org).
 
 2016-2018 Steve Neale <steveneale3000@gmail.com, NealeS2@cardiff.ac.uk>
@@ -21,23 +25,99 @@ import sys
 import os
 import json
 
+from shared.mapped_table import MappedTable, write_mapped_table, file_fingerprint, table_fingerprint, compiled_tables
+
+gazetteer_folder = "{}/../../cy_gazetteers".format(os.path.dirname(os.path.abspath(__file__)))
+gazetteer_cache = "{}/gazetteer_dict.json".format(gazetteer_folder)
+gazetteer_table = "{}/gazetteer_table".format(compiled_tables)
+
+""" The bit for each gazetteer in the gazetteer index """
+gazetteer_categories = {"givennames_m": 1, "givennames_f": 2, "surnames": 4, "places": 8, "other_proper": 16, "acronyms": 32, "abbreviations": 64}
+""" The gazetteers that hold proper nouns (as opposed to trade names, acronyms and abbreviations) """
+proper_noun_categories = gazetteer_categories["givennames_m"] | gazetteer_categories["givennames_f"] | gazetteer_categories["surnames"] | gazetteer_categories["places"]
+
+""" Bump this whenever a change to this file alters what goes into the compiled gazetteers, so that existing copies are rebuilt """
+gazetteer_version = "2"
+
+def gazetteer_files():
+	""" Return the names of the gazetteer source files in the 'cy_gazetteers' folder """
+	return [gaz for gaz in os.listdir(gazetteer_folder) if gaz.rpartition(".")[-1] not in ["py", "json", "tmp"] and gaz.startswith("._") == False]
+
+def load_gazetteer(gaz):
+	""" Load a single gazetteer file, and return a dictionary containing its terms """
+	gazetteer = {}
+	with open("{}/{}".format(gazetteer_folder, gaz), encoding="utf-8") as loaded_gazetteer:
+		terms = loaded_gazetteer.read().splitlines()
+		gaz_name, gaz_ext = os.path.splitext(gaz)
+		gazetteer[gaz_ext[1:]] = terms
+	return gazetteer
+
 def load_gaz():
 	""" Load Welsh gazetteers into a dictionary, and return it """
 	gazetteers = {}
-	for gaz in os.listdir("{}/../../cy_gazetteers".format(os.path.dirname(os.path.abspath(__file__)))):
-		if gaz.rpartition(".")[-1] not in ["py", "json"] and gaz.startswith("._") == False: 
-			with open("{}/../../cy_gazetteers/{}".format(os.path.dirname(os.path.abspath(__file__)), gaz), encoding="utf-8") as loaded_gazetteer:
-				exclude_string = ""
-				terms = loaded_gazetteer.read().splitlines()
-				for term in terms:
-					term = term.replace(".", "[.]")
-					exclude_string = exclude_string + "(?<!" + term + ")"
-				gaz_name, gaz_ext = os.path.splitext(gaz)
-				gazetteers[gaz_ext[1:]] = terms
-				gazetteers["{}_regex".format(gaz_ext[1:])] = exclude_string
+	for gaz in gazetteer_files():
+		gazetteers.update(load_gazetteer(gaz))
 	return gazetteers
 
+def save_gazetteers(gaz_dict, fingerprints):
+	""" Write compiled gazetteers (and the fingerprints of the files they came from) to 'gazetteer_dict.json', atomically (leaving it as it is if the 'cy_gazetteers' folder can't be written to, in which case the gazetteers are compiled again on the next run) """
+	temporary_path = "{}.{}.tmp".format(gazetteer_cache, os.getpid())
+	try:
+		with open(temporary_path, "w") as loaded:
+			json.dump({"fingerprints": fingerprints, "gazetteers": gaz_dict}, loaded)
+		os.replace(temporary_path, gazetteer_cache)
+	except OSError:
+		if os.path.exists(temporary_path):
+			os.remove(temporary_path)
+
 def load_gazetteers():
+	""" Rebuild all of the compiled gazetteers, and return them """
+	fingerprints = {gaz: file_fingerprint(["{}/{}".format(gazetteer_folder, gaz)], gazetteer_version) for gaz in gazetteer_files()}
 	gaz_dict = load_gaz()
-	with open("{}/../../cy_gazetteers/gazetteer_dict.json".format(os.path.dirname(os.path.abspath(__file__))), "w") as loaded:
-		json.dump(gaz_dict, loaded)
\ No newline at end of file
+	save_gazetteers(gaz_dict, fingerprints)
+	save_gazetteer_index(gaz_dict, index_fingerprint(fingerprints))
+	return gaz_dict
+
+def refresh_gazetteers():
+	""" Return the compiled gazetteers, first rebuilding (only) those whose files have changed since they were compiled """
+	cached = {"fingerprints": {}, "gazetteers": {}}
+	if os.path.exists(gazetteer_cache):
+		with open(gazetteer_cache) as loaded:
+			cached = json.load(loaded)
+		if "fingerprints" not in cached:
+			cached = {"fingerprints": {}, "gazetteers": {}}
+	fingerprints = {gaz: file_fingerprint(["{}/{}".format(gazetteer_folder, gaz)], gazetteer_version) for gaz in gazetteer_files()}
+	if fingerprints == cached["fingerprints"]:
+		if table_fingerprint(gazetteer_table) != index_fingerprint(fingerprints):
+			save_gazetteer_index(cached["gazetteers"], index_fingerprint(fingerprints))
+		return cached["gazetteers"]
+	gaz_dict = {}
+	for gaz, fingerprint in fingerprints.items():
+		if cached["fingerprints"].get(gaz) == fingerprint:
+			gaz_name = os.path.splitext(gaz)[1][1:]
+			gaz_dict[gaz_name] = cached["gazetteers"][gaz_name]
+		else:
+			gaz_dict.update(load_gazetteer(gaz))
+	save_gazetteers(gaz_dict, fingerprints)
+	save_gazetteer_index(gaz_dict, index_fingerprint(fingerprints))
+	return gaz_dict
+
+def index_fingerprint(fingerprints):
+	""" Return the fingerprint for a gazetteer index built from gazetteer files with the given fingerprints """
+	return file_fingerprint([], "{}:{}".format(gazetteer_version, json.dumps(fingerprints, sort_keys=True)))
+
+def save_gazetteer_index(gaz_dict, fingerprint):
+	""" Compile the gazetteer index (term -> category bitmask) from a dictionary of gazetteers """
+	categories = {}
+	for gaz_name, bit in gazetteer_categories.items():
+		for term in gaz_dict.get(gaz_name, []):
+			categories[term] = categories.get(term, 0) | bit
+	write_mapped_table(gazetteer_table, [(term, str(bits)) for term, bits in categories.items()], fingerprint)
+
+class GazetteerIndex(MappedTable):
+	""" The compiled gazetteer index """
+
+	def categories(self, term):
+		""" Return the bitmask of the gazetteers a term appears in (0 if it isn't in any) """
+		found = self.values(term)
+		return int(found[0]) if len(found) > 0 else 0
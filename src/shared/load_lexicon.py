@@ -7,6 +7,17 @@ A script for loading a CorCenCC-formatted Welsh lexicon.
 
 Returns:
 	--- A dictionary containing information from the CorCenCC lexicon.
+	--- (via 'load_lexicon') A compiled, memory-mapped copy of the lexicon, which is what CyTag reads at run time.
+
+Alongside its lexicon fields, each compiled entry stores what the tagger would otherwise work out again for every token:
+	--- 'morphology': the morphological elements of its rich POS tag, separated by spaces.
+	--- 'reading_head' and 'reading_tail': its VISL CG-3 reading line, split either side of the {sentence,token} position.
+
+A second compiled table (the mutation index) maps each mutated form that 'lookup_mutation' can trace back to a lexicon entry onto those entries and their mutation types, so that finding the mutations of a token in the lexicon is a single lookup.
+
+A third (the form index) lists every lowercase form that can have readings at all (lexicon entries and their mutations), so that the spelling variants tried for unknown words can be ruled out with a single lookup each.
+
+The compiled copy records a fingerprint of the files it was built from, and 'refresh_lexicon' rebuilds it whenever one of them has changed.
 
 Developed at Cardiff University as part of the CorCenCC project (www.corcencc.org).
 
@@ -21,10 +32,26 @@ import sys
 import os
 import json
 
+from shared.mapped_table import MappedTable, write_mapped_table, file_fingerprint, table_fingerprint, compiled_tables
+from shared.morphology import tag_morphology, lookup_mutation, mutated_forms
+
+lexicon_fields = ["lemma", "lemma_en", "pos_basic", "pos_enriched"]
+compiled_fields = lexicon_fields + ["morphology", "reading_head", "reading_tail"]
+
+lexicon_source = "{}/../../lexicon/corcencc_lexicon_2020".format(os.path.dirname(os.path.abspath(__file__)))
+lexicon_table = "{}/lexicon_table".format(compiled_tables)
+mutation_table = "{}/mutation_table".format(compiled_tables)
+form_table = "{}/form_table".format(compiled_tables)
+""" The morphological table and mutation rules are compiled into the lexicon too, so a change to them also means a rebuild """
+morphology_source = "{}/morphology.py".format(os.path.dirname(os.path.abspath(__file__)))
+
+""" Bump this whenever a change to this file alters what goes into the compiled lexicon, so that existing copies are rebuilt """
+lexicon_version = "3"
+
 def load_cy():
 	""" Load Welsh lexical information into a dictionary, and return it """
 	lexicon = {}
-	with open("{}/../../lexicon/{}".format(os.path.dirname(os.path.abspath(__file__)), "corcencc_lexicon_2020"), encoding="utf-8") as loaded_lexicon:
+	with open(lexicon_source, encoding="utf-8") as loaded_lexicon:
 		entries = loaded_lexicon.read().splitlines()
 		for entry in entries:
 			if entry[:1] != "#":
@@ -35,9 +62,70 @@ def load_cy():
 					lexicon[entry_parts[0]].append({"lemma": entry_parts[1], "lemma_en": entry_parts[2], "pos_basic": entry_parts[3], "pos_enriched": entry_parts[4]})
 	return lexicon
 
+def lexicon_fingerprint():
+	""" Return the fingerprint of the files that the compiled lexicon (and its indexes) are built from """
+	return file_fingerprint([lexicon_source, morphology_source], lexicon_version)
+
 def load_lexicon():
+	""" Compile the Welsh lexicon (and its mutation and form indexes) into the memory-mapped tables read by CyTag """
+	fingerprint = lexicon_fingerprint()
 	cy_lexicon = load_cy()
-	with open("{}/../../lexicon/lexicon_dict.json".format(os.path.dirname(os.path.abspath(__file__))), "w") as loaded:
-		json.dump(cy_lexicon, loaded)
+	records = [(token, "\t".join(compile_entry(entry))) for token, entries in cy_lexicon.items() for entry in entries]
+	write_mapped_table(lexicon_table, records, fingerprint)
+	mutations = mutation_records(cy_lexicon)
+	write_mapped_table(mutation_table, mutations, fingerprint)
+	forms = sorted({token.lower() for token in cy_lexicon} | {mutated for mutated, radical in mutations})
+	write_mapped_table(form_table, [(form, "") for form in forms], fingerprint)
+
+def mutation_records(lexicon):
+	""" Return the mutation index records: mutated form (lowercase) -> "radical<TAB>mutation type<TAB>case", for each radical 'lookup_mutation' finds in the lexicon (case is "upper" for the capitalised radicals it only tries when the token is capitalised) """
+	records = []
+	for mutated in sorted({form for token in lexicon for form in mutated_forms(token)}):
+		radicals = lookup_mutation(mutated)
+		for radical, mutation in radicals:
+			if radical in lexicon:
+				records.append((mutated, "{}\t{}\t".format(radical, mutation)))
+		for radical, mutation in radicals:
+			capital = "{}{}".format(radical[:1].upper(), radical[1:])
+			if capital in lexicon:
+				records.append((mutated, "{}\t{}\tupper".format(capital, mutation)))
+	return records
+
+def compile_entry(entry):
+	""" Return the compiled fields for a lexicon entry: its lexicon fields, its morphology, and the parts of its CG reading line """
+	morphology = " ".join(tag_morphology(entry["pos_enriched"]))
+	reading_head = "\"{}\" {{".format(entry["lemma"])
+	reading_tail = "}} [cy] {} :{}:".format(morphology, entry["lemma_en"].replace(" ", "_"))
+	return [entry[field] for field in lexicon_fields] + [morphology, reading_head, reading_tail]
+
+def refresh_lexicon():
+	""" Rebuild the compiled lexicon (and its indexes) if the lexicon file has changed since they were compiled (returning True if they were rebuilt) """
+	if os.path.exists(lexicon_source):
+		fingerprint = lexicon_fingerprint()
+		if any(table_fingerprint(table) != fingerprint for table in [lexicon_table, mutation_table, form_table]):
+			load_lexicon()
+			return True
+	return False
+
+class LexiconTable(MappedTable):
+	""" The compiled Welsh lexicon, looked up in the same way as the dictionary returned by 'load_cy' (token -> list of entries) """
+
+	def __getitem__(self, token):
+		return [dict(zip(compiled_fields, value.split("\t"))) for value in super().__getitem__(token)]
+
+	def get(self, token, default=None):
+		entries = self.values(token)
+		return [dict(zip(compiled_fields, value.split("\t"))) for value in entries] if len(entries) > 0 else default
 
+class MutationTable(MappedTable):
+	""" The compiled mutation index: for a token, the radicals in the lexicon that it could be a mutation of """
 
+	def radicals(self, token):
+		""" Return the (radical, mutation type) pairs that 'lookup_mutation' would give for a token, limited to those in the lexicon (in the same order) """
+		capitalised = token[:1].isupper()
+		radicals = []
+		for value in self.values(token.lower()):
+			radical, mutation, case = value.split("\t")
+			if case == "" or capitalised:
+				radicals.append((radical, mutation))
+		return radicals
@@ -0,0 +1,189 @@
+#!usr/bin/env python3
+#-*- coding: utf-8 -*-
+"""
+'mapped_table.py'
+
+A compiled, hash-indexed table format for CyTag's reference data, read through 'mmap' so that lookups only touch the pages they need and the OS page cache is shared between processes.
+
+File layout:
+	--- A header (magic string, number of hash buckets, number of keys, and a fingerprint of the source files the table was compiled from).
+	--- A bucket array of unsigned 32-bit offsets (0 marks an empty bucket), addressed by the CRC-32 of the key (with linear probing).
+	--- The records, as UTF-8 "key<TAB>value" lines, with all of the lines for a key stored together.
+
+Compiled tables are local build artefacts (like .pyc files) and are written in the native byte order of the machine that builds them.
+They are kept in the folder given by 'compiled_tables' (see 'table_folder'), and a table that can't be written there is built in memory for the current run instead.
+
+Developed at Cardiff University as part of the CorCenCC project (www.corcencc.org).
+
+This program is free software: you can redistribute it and/or modify it under the terms of the GNU General Public License as published by the Free Software Foundation, either version 3 of the License or (at your option) any later version.
+This program is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for more details.
+You should have received a copy of the GNU General Public License along with this program. If not, see <http://www.gnu.org/licenses>.
+"""
+
+import os
+import mmap
+import struct
+import zlib
+import hashlib
+from array import array
+
+table_magic = b"CYTAG-T2"
+table_header = struct.Struct("=8sII40s")
+
+def table_folder():
+	""" Return the folder that compiled tables are kept in: the folder named by the CYTAG_TABLE_DIR environment variable if it is set, or else CyTag's 'lexicon' folder if it can be written to, or else a 'cytag' folder in the user's cache directory """
+	if os.environ.get("CYTAG_TABLE_DIR"):
+		return os.environ["CYTAG_TABLE_DIR"]
+	lexicon_folder = os.path.normpath("{}/../../lexicon".format(os.path.dirname(os.path.abspath(__file__))))
+	if os.access(lexicon_folder, os.W_OK):
+		return lexicon_folder
+	return os.path.join(os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache"), "cytag")
+
+compiled_tables = table_folder()
+
+""" The compiled tables that couldn't be written to disk (path -> contents of the table), which are read from memory instead """
+memory_tables = {}
+
+def file_fingerprint(paths, version=""):
+	""" Return a fingerprint (SHA-1 hex digest) of the contents of the given source files, and of a version string for the code that compiles them """
+	fingerprint = hashlib.sha1(version.encode("utf-8"))
+	for path in paths:
+		fingerprint.update(os.path.basename(path).encode("utf-8") + b"\0")
+		with open(path, "rb") as source_file:
+			fingerprint.update(source_file.read())
+	return fingerprint.hexdigest()
+
+def table_fingerprint(path):
+	""" Return the source fingerprint stored in a compiled table, or None if the table does not exist or cannot be read """
+	try:
+		if path in memory_tables:
+			magic, bucket_count, key_count, fingerprint = table_header.unpack_from(memory_tables[path], 0)
+		else:
+			with open(path, "rb") as table_file:
+				magic, bucket_count, key_count, fingerprint = table_header.unpack(table_file.read(table_header.size))
+	except (OSError, struct.error):
+		return None
+	return fingerprint.decode("ascii") if magic == table_magic else None
+
+def write_mapped_table(path, records, fingerprint=""):
+	""" Write an iterable of (key, value) string pairs to a compiled table at the given path (atomically, via a temporary file).
+		If the table can't be written (e.g. CyTag is installed read-only and no writable folder was given), it is kept in memory for the rest of the run instead
+	"""
+	grouped = {}
+	for key, value in records:
+		grouped.setdefault(key, []).append(value)
+	bucket_count = max(8, len(grouped) * 2)
+	buckets = array("I", bytes(4 * bucket_count))
+	data = bytearray()
+	data_start = table_header.size + 4 * bucket_count
+	for key, values in grouped.items():
+		encoded_key = key.encode("utf-8")
+		bucket = zlib.crc32(encoded_key) % bucket_count
+		while buckets[bucket] != 0:
+			bucket = (bucket + 1) % bucket_count
+		buckets[bucket] = data_start + len(data)
+		for value in values:
+			data += encoded_key + b"\t" + value.encode("utf-8") + b"\n"
+	table = table_header.pack(table_magic, bucket_count, len(grouped), fingerprint.encode("ascii")) + buckets.tobytes() + bytes(data)
+	temporary_path = "{}.{}.tmp".format(path, os.getpid())
+	try:
+		os.makedirs(os.path.dirname(path), exist_ok=True)
+		with open(temporary_path, "wb") as table_file:
+			table_file.write(table)
+		os.replace(temporary_path, path)
+	except OSError:
+		if os.path.exists(temporary_path):
+			os.remove(temporary_path)
+		memory_tables[path] = table
+	else:
+		memory_tables.pop(path, None)
+
+class MappedTable:
+	""" A read-only view of a compiled table, which is opened (and memory-mapped) the first time it is used """
+
+	def __init__(self, path):
+		self.path = path
+		self._map = None
+
+	def _open(self):
+		""" Memory-map the table file and its bucket array (or read them from memory, if the table was built in memory) """
+		if self.path in memory_tables:
+			table_map = memory_tables[self.path]
+		else:
+			with open(self.path, "rb") as table_file:
+				table_map = mmap.mmap(table_file.fileno(), 0, access=mmap.ACCESS_READ)
+		magic, bucket_count, key_count, fingerprint = table_header.unpack_from(table_map, 0)
+		if magic != table_magic:
+			raise ValueError("'{}' is not a compiled CyTag table".format(self.path))
+		self._buckets = memoryview(table_map)[table_header.size:table_header.size + 4 * bucket_count].cast("I")
+		self._bucket_count = bucket_count
+		self._key_count = key_count
+		self._data_start = table_header.size + 4 * bucket_count
+		self._map = table_map
+		return table_map
+
+	def reload(self):
+		""" Drop the current mapping, so that the table file is opened again (e.g. after it has been rebuilt) the next time it is used """
+		self._map = None
+
+	def _find(self, prefix):
+		""" Return the offset of the first record starting with a given encoded "key<TAB>" prefix, or 0 if there is none """
+		table_map = self._map if self._map is not None else self._open()
+		bucket = zlib.crc32(prefix[:-1]) % self._bucket_count
+		offset = self._buckets[bucket]
+		while offset != 0:
+			if table_map[offset:offset+len(prefix)] == prefix:
+				return offset
+			bucket = (bucket + 1) % self._bucket_count
+			offset = self._buckets[bucket]
+		return 0
+
+	def values(self, key):
+		""" Return a list of the values stored for a given key (empty if the key is not in the table) """
+		prefix = key.encode("utf-8") + b"\t"
+		offset = self._find(prefix)
+		found = []
+		while offset != 0 and self._map[offset:offset+len(prefix)] == prefix:
+			line_end = self._map.find(b"\n", offset)
+			found.append(self._map[offset+len(prefix):line_end].decode("utf-8"))
+			offset = line_end + 1
+		return found
+
+	def __contains__(self, key):
+		return self._find(key.encode("utf-8") + b"\t") != 0
+
+	def __getitem__(self, key):
+		found = self.values(key)
+		if len(found) == 0:
+			raise KeyError(key)
+		return found
+
+	def get(self, key, default=None):
+		found = self.values(key)
+		return found if len(found) > 0 else default
+
+	def __len__(self):
+		if self._map is None:
+			self._open()
+		return self._key_count
+
+	def items(self):
+		""" Iterate over every (key, value) record in the table, in the order they were written """
+		table_map = self._map if self._map is not None else self._open()
+		offset = self._data_start
+		while offset < len(table_map):
+			line_end = table_map.find(b"\n", offset)
+			key, _, value = table_map[offset:line_end].decode("utf-8").partition("\t")
+			yield key, value
+			offset = line_end + 1
+
+	def keys(self):
+		""" Iterate over the (distinct) keys in the table """
+		previous = None
+		for key, value in self.items():
+			if key != previous:
+				yield key
+				previous = key
+
+	def __iter__(self):
+		return self.keys()
@@ -0,0 +1,74 @@
+#!usr/bin/env python3
+#-*- coding: utf-8 -*-
+"""
+'reading_cache.py'
+
+A bounded, least-recently-used cache of the pre-CG readings produced for each word type, which can be saved to (and loaded from) a file so that it carries over between runs.
+
+A saved cache records the key it was built under (see 'reading_cache_key' in 'cy_postagger.py'), and is only loaded back under the same key, so entries never outlive the lexicon, gazetteers or code that produced them.
+
+Developed at Cardiff University as part of the CorCenCC project (www.corcencc.org).
+
+This program is free software: you can redistribute it and/or modify it under the terms of the GNU General Public License as published by the Free Software Foundation, either version 3 of the License or (at your option) any later version.
+This program is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for more details.
+You should have received a copy of the GNU General Public License along with this program. If not, see <http://www.gnu.org/licenses>.
+"""
+
+import os
+import json
+import threading
+from collections import OrderedDict
+
+class ReadingCache:
+	""" A least-recently-used mapping of word -> cached entry, holding at most 'size' entries (safe to share between threads) """
+
+	def __init__(self, size):
+		self.size = size
+		self.entries = OrderedDict()
+		self.lock = threading.RLock()
+
+	def get(self, word):
+		""" Return the cached entry for a word (marking it as recently used), or None """
+		with self.lock:
+			entry = self.entries.get(word)
+			if entry is not None:
+				self.entries.move_to_end(word)
+			return entry
+
+	def put(self, word, entry):
+		""" Cache an entry for a word, dropping the least recently used entry if the cache is full """
+		with self.lock:
+			self.entries[word] = entry
+			self.entries.move_to_end(word)
+			if len(self.entries) > self.size:
+				self.entries.popitem(last=False)
+
+	def clear(self):
+		with self.lock:
+			self.entries.clear()
+
+	def __len__(self):
+		return len(self.entries)
+
+	def load(self, path, key):
+		""" Load the entries saved at the given path, if they were saved under the same key (returning the number of entries loaded) """
+		try:
+			with open(path, encoding="utf-8") as cache_file:
+				saved = json.load(cache_file)
+		except (OSError, ValueError):
+			return 0
+		if not isinstance(saved, dict) or saved.get("key") != key:
+			return 0
+		with self.lock:
+			for word, entry in saved["entries"][-self.size:]:
+				self.put(word, entry)
+			return len(self)
+
+	def save(self, path, key):
+		""" Save the cached entries (least recently used first) to the given path, atomically """
+		temporary_path = "{}.{}.{}.tmp".format(path, os.getpid(), threading.get_ident())
+		with self.lock:
+			entries = list(self.entries.items())
+		with open(temporary_path, "w", encoding="utf-8") as cache_file:
+			json.dump({"key": key, "entries": entries}, cache_file, ensure_ascii=False)
+		os.replace(temporary_path, path)
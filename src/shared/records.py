@@ -0,0 +1,76 @@
+#!usr/bin/env python3
+#-*- coding: utf-8 -*-
+"""
+'records.py'
+
+The records passed between the stages of the CyTag pipeline, so that each stage works with the fields it needs rather than formatting them as tab-separated text for the next stage to split up again:
+	--- 'Token': a token from the tokeniser.
+	--- 'Reading': one of the readings VISL CG-3 left for a token.
+	--- 'TaggedToken': a token with the POS tag (and lemma, mutation) it was given, ready to be written out.
+
+Text is only produced from the records when they are written out (e.g. 'Token.tsv', 'TaggedToken.tsv').
+
+Developed at Cardiff University as part of the CorCenCC project (www.corcencc.org).
+
+This program is free software: you can redistribute it and/or modify it under the terms of the GNU General Public License as published by the Free Software Foundation, either version 3 of the License or (at your option) any later version.
+This program is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for more details.
+You should have received a copy of the GNU General Public License along with this program. If not, see <http://www.gnu.org/licenses>.
+"""
+
+class Token:
+	""" A token, with its id (counted across the whole input), the number of the sentence it is in, and its position in that sentence (both counted from 1) """
+	__slots__ = ("id", "text", "sentence", "position")
+
+	def __init__(self, id, text, sentence, position):
+		self.id = id
+		self.text = text
+		self.sentence = sentence
+		self.position = position
+
+	def position_tag(self):
+		""" Return the token's position as it appears in CG-formatted readings (e.g. 3,12) """
+		return "{},{}".format(self.sentence, self.position)
+
+	def tsv(self):
+		""" Return the token as a line of tab-separated values (id, token, position), as output by the tokeniser """
+		return "{}\t{}\t{},{}".format(self.id, self.text, self.sentence, self.position)
+
+	def __repr__(self):
+		return "Token({!r}, {!r}, {!r}, {!r})".format(self.id, self.text, self.sentence, self.position)
+
+class Reading:
+	""" A CG reading of a token: its position tag (e.g. 3,12), lemma, POS tag (its morphological tags, separated by spaces) and mutation (None if there isn't one) """
+	__slots__ = ("position", "lemma", "tags", "mutation")
+
+	def __init__(self, position, lemma, tags, mutation=None):
+		self.position = position
+		self.lemma = lemma
+		self.tags = tags
+		self.mutation = mutation
+
+	def __repr__(self):
+		return "Reading({!r}, {!r}, {!r}, {!r})".format(self.position, self.lemma, self.tags, self.mutation)
+
+class TaggedToken:
+	""" A token tagged by CyTag, with the fields of a line of CyTag-formatted output (see 'tsv') """
+	__slots__ = ("id", "token", "position", "lemma", "basic_pos", "rich_pos", "mutation")
+
+	def __init__(self, id, token, position, lemma, basic_pos, rich_pos, mutation=""):
+		self.id = id
+		self.token = token
+		self.position = position
+		self.lemma = lemma
+		self.basic_pos = basic_pos
+		self.rich_pos = rich_pos
+		self.mutation = mutation
+
+	def sentence(self):
+		""" Return the number of the sentence the token is in """
+		return int(self.position.partition(",")[0])
+
+	def tsv(self):
+		""" Return the token as a line of CyTag-formatted tab-separated values (id, token, position, lemma, basic POS, rich POS, mutation) """
+		return "{}\t{}\t{}\t{}\t{}\t{}\t{}".format(self.id, self.token, self.position, self.lemma, self.basic_pos, self.rich_pos, self.mutation)
+
+	def __repr__(self):
+		return "TaggedToken({})".format(", ".join(repr(getattr(self, field)) for field in self.__slots__))
@@ -0,0 +1,237 @@
+#!usr/bin/env python3
+#-*- coding: utf-8 -*-
+"""
+'text_writers.py'
+
+Writers for CyTag's line-based output formats, which are written a token at a time as the output of VISL CG-3 is mapped (rather than once the whole input has been tagged, or converted from the TSV output afterwards):
+	--- 'TSVWriter': CyTag-formatted tab-separated values.
+	--- 'VRTWriter': vertical text (as read by the IMS Open Corpus Workbench and similar corpus tools), with '<text>' and '<s>' structure and one token per line.
+	--- 'CoNLLUWriter': CoNLL-U (as read by Universal Dependencies parsers), with one token per line and a blank line after each sentence.
+
+All of them write through a 'BufferedOutput', which collects lines and writes them to the output file (or standard output, see 'open_output') in large blocks. Command-line tools that write to standard output call 'exit_on_closed_output' if it is closed before they have finished.
+
+Developed at Cardiff University as part of the CorCenCC project (www.corcencc.org).
+
+This program is free software: you can redistribute it and/or modify it under the terms of the GNU General Public License as published by the Free Software Foundation, either version 3 of the License or (at your option) any later version.
+This program is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for more details.
+You should have received a copy of the GNU General Public License along with this program. If not, see <http://www.gnu.org/licenses>.
+"""
+
+import os
+import sys
+from collections import deque
+from xml.sax.saxutils import escape, quoteattr
+
+from shared.compression import open_text_output
+
+def open_output(path):
+	""" Open a file to write text output to (compressed, if its name ends with .gz, .bz2 or .xz), or standard output if the path is '-' """
+	if path == "-":
+		return sys.stdout
+	return open_text_output(path, "w", encoding="utf-8")
+
+def close_output(output_file):
+	""" Close a file opened with 'open_output' (leaving standard output open) """
+	if output_file is not sys.stdout:
+		output_file.close()
+
+def exit_on_closed_output():
+	""" Exit quietly once whatever was reading standard output has closed it (e.g. 'head' at the end of a pipeline), pointing standard output at os.devnull first so that flushing it on the way out doesn't fail again """
+	devnull = os.open(os.devnull, os.O_WRONLY)
+	os.dup2(devnull, sys.stdout.fileno())
+	sys.exit(1)
+
+class BufferedOutput:
+	""" Collects text to be written to an output file, writing it in blocks of (at least) 'buffer_size' characters """
+
+	def __init__(self, output_file, buffer_size=1048576):
+		self.output_file = output_file
+		self.buffer_size = buffer_size
+		self.buffer = []
+		self.buffered = 0
+
+	def write(self, text):
+		self.buffer.append(text)
+		self.buffered += len(text)
+		if self.buffered >= self.buffer_size:
+			self.flush()
+
+	def flush(self):
+		if len(self.buffer) > 0:
+			self.output_file.write("".join(self.buffer))
+			self.buffer = []
+			self.buffered = 0
+		self.output_file.flush()
+
+	def close(self):
+		self.flush()
+
+class StrippedOutput(BufferedOutput):
+	""" A BufferedOutput for text that is written out as it would be printed once stripped of whitespace at either end (as the text returned by 'pos_tagger' and 'tokeniser' is printed).
+		Whitespace at the start is dropped, whitespace is held back until some more text follows it, and the output ends with a single line break
+	"""
+
+	def __init__(self, output_file, buffer_size=1048576):
+		super().__init__(output_file, buffer_size)
+		self.started = False
+		self.held = ""
+
+	def write(self, text):
+		if not self.started:
+			text = text.lstrip()
+			if text == "":
+				return
+			self.started = True
+		body = text.rstrip()
+		if body == "":
+			self.held += text
+			return
+		super().write(self.held + body)
+		self.held = text[len(body):]
+
+	def close(self):
+		super().write("\n")
+		self.flush()
+
+class TSVWriter:
+	""" Writes CyTag-formatted tab-separated values for each token.
+		If a dictionary of file names is given (sentence number -> name of the file that starts with it), each line is prefixed with the name of the file the token came from (as in the 'tsv' output format).
+		Otherwise, the lines are written as 'pos_tagger' returns them (if 'strip' is set, stripped and followed by a line break, as they would be printed)
+	"""
+
+	def __init__(self, output_file, filename_dict=None, strip=False):
+		self.output = StrippedOutput(output_file) if strip else BufferedOutput(output_file)
+		self.filename_dict = filename_dict
+		self.filename = ""
+
+	def add_file(self, file_id, name):
+		pass
+
+	def add_sentence(self, sentence_id):
+		pass
+
+	def add_token(self, tagged_token, readings):
+		if self.filename_dict == None:
+			self.output.write(tagged_token.tsv() + "\n")
+		else:
+			sentence = tagged_token.sentence()
+			if sentence in self.filename_dict:
+				self.filename = self.filename_dict[sentence]
+			self.output.write(self.filename + "\t" + tagged_token.tsv() + "\n")
+
+	def flush(self):
+		""" Write out the lines buffered so far """
+		self.output.flush()
+
+	def close(self):
+		""" Flush the output (without closing the output file) """
+		self.output.close()
+
+class SentenceWriter:
+	""" The base of the line-based writers. Files and sentences are added as they are read, and tokens as they are tagged (in order), and the writer moves through the files and sentences as the tokens reach them.
+		Subclasses write the output for each file, sentence and token (sentences are started when their first token is written, so sentences without tokens are left out)
+	"""
+
+	def __init__(self, output_file, corpus_name):
+		self.output = BufferedOutput(output_file)
+		self.corpus_name = corpus_name
+		""" The files and sentences that have been added, but not yet reached (as ('file', (id, name)) or ('sentence', id)) """
+		self.pending = deque()
+		self.in_file = False
+		self.sentence = None
+		self.sentence_started = False
+
+	def add_file(self, file_id, name):
+		self.pending.append(("file", (file_id, name)))
+
+	def add_sentence(self, sentence_id):
+		self.pending.append(("sentence", sentence_id))
+
+	def add_token(self, tagged_token, readings):
+		""" Write a TaggedToken (with the number of readings it had before CG) to its sentence, moving on through the files and sentences before it """
+		sentence_id = tagged_token.sentence()
+		while self.sentence != sentence_id:
+			if len(self.pending) == 0:
+				raise ValueError("A token was given for sentence {}, which hasn't been added to the {} output".format(sentence_id, self.format_name))
+			self._next()
+		if not self.sentence_started:
+			self.start_sentence(sentence_id)
+			self.sentence_started = True
+		self.write_token(tagged_token, readings)
+
+	def _next(self):
+		""" Move on to the next file or sentence that has been added """
+		kind, value = self.pending.popleft()
+		self._finish_sentence()
+		if kind == "file":
+			if self.in_file:
+				self.end_file()
+			self.start_file(*value)
+			self.in_file = True
+		else:
+			self.sentence = value
+
+	def _finish_sentence(self):
+		if self.sentence_started:
+			self.end_sentence()
+		self.sentence, self.sentence_started = None, False
+
+	def close(self):
+		""" Write out everything that is left, and flush the output (without closing the output file) """
+		while len(self.pending) > 0:
+			self._next()
+		self._finish_sentence()
+		if self.in_file:
+			self.end_file()
+			self.in_file = False
+		self.output.close()
+
+class VRTWriter(SentenceWriter):
+	""" Writes vertical text: a '<text>' element for each file, an '<s>' element for each sentence, and a line for each token with the columns: token, lemma, basic POS, rich POS, mutation ('_' if there isn't one).
+		Text is escaped as XML, as expected by 'cwb-encode -x'
+	"""
+	format_name = "VRT"
+
+	def start_file(self, file_id, name):
+		self.output.write("<text id=\"{}\" name={}>\n".format(file_id, quoteattr(name)))
+
+	def end_file(self):
+		self.output.write("</text>\n")
+
+	def start_sentence(self, sentence_id):
+		self.output.write("<s id=\"{}\">\n".format(sentence_id))
+
+	def end_sentence(self):
+		self.output.write("</s>\n")
+
+	def write_token(self, tagged_token, readings):
+		self.output.write("{}\t{}\t{}\t{}\t{}\n".format(escape(tagged_token.token), escape(tagged_token.lemma), tagged_token.basic_pos, tagged_token.rich_pos, tagged_token.mutation if tagged_token.mutation != "" else "_"))
+
+class CoNLLUWriter(SentenceWriter):
+	""" Writes CoNLL-U: a '# newdoc' comment at the start of each file, a '# sent_id' comment at the start of each sentence, and a line for each token with the ten CoNLL-U columns.
+		CyTag's rich POS tag is given as the XPOS (without spaces, for tokens left with more than one tag), and any mutation in MISC; the UPOS, features and dependency columns are left empty ('_') for a parser to fill in
+	"""
+	format_name = "CoNLL-U"
+
+	def __init__(self, output_file, corpus_name):
+		super().__init__(output_file, corpus_name)
+		""" The '# newdoc' comment for the current file, until its first sentence is written """
+		self.newdoc = None
+
+	def start_file(self, file_id, name):
+		self.newdoc = "# newdoc id = {}\n".format(name)
+
+	def end_file(self):
+		self.newdoc = None
+
+	def start_sentence(self, sentence_id):
+		if self.newdoc != None:
+			self.output.write(self.newdoc)
+			self.newdoc = None
+		self.output.write("# sent_id = {}\n".format(sentence_id))
+
+	def end_sentence(self):
+		self.output.write("\n")
+
+	def write_token(self, tagged_token, readings):
+		self.output.write("{}\t{}\t{}\t_\t{}\t_\t_\t_\t_\t{}\n".format(tagged_token.position.partition(",")[2], tagged_token.token, tagged_token.lemma, tagged_token.rich_pos.replace(" ", ""), "Mutation={}".format(tagged_token.mutation) if tagged_token.mutation != "" else "_"))
@@ -0,0 +1,123 @@
+#!usr/bin/env python3
+#-*- coding: utf-8 -*-
+"""
+'xml_writer.py'
+
+Writes CyTag's XML output incrementally (with 'lxml.etree.xmlfile'), a sentence at a time, rather than building a tree of the whole corpus and writing it at the end:
+
+	<corpus name="...">
+	  <file id="1" name="...">
+	    <sentence id="1">
+	      <token id="1" readings="..." lemma="..." basic_pos="..." rich_pos="..." position="1,1">...</token>
+	    </sentence>
+	  </file>
+	</corpus>
+
+Files and sentences are added as they are read, and tokens as they are tagged (in order). Only the sentence that tokens are being added to is held in memory, and the output is the same as writing the whole tree with 'pretty_print=True, xml_declaration=True, encoding="UTF-8"'.
+
+Developed at Cardiff University as part of the CorCenCC project (www.corcencc.org).
+
+This program is free software: you can redistribute it and/or modify it under the terms of the GNU General Public License as published by the Free Software Foundation, either version 3 of the License or (at your option) any later version.
+This program is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for more details.
+You should have received a copy of the GNU General Public License along with this program. If not, see <http://www.gnu.org/licenses>.
+"""
+
+from collections import deque
+
+from lxml import etree
+
+class XMLWriter:
+	""" An incremental writer for a CyTag XML corpus, writing to a (binary) output file """
+
+	def __init__(self, output_file, corpus_name):
+		""" The XML declaration (and the line break after the corpus element) are written to the output file directly, as 'xmlfile' only accepts elements (not text) outside of the root element """
+		self.output_file = output_file
+		self.output_file.write(b"<?xml version='1.0' encoding='UTF-8'?>\n")
+		self.xml_file = etree.xmlfile(output_file, encoding="UTF-8")
+		self.writer = self.xml_file.__enter__()
+		self.corpus_name = corpus_name
+		""" The files and sentences that have been added, but not yet written (as ('file', attributes) or ('sentence', id)) """
+		self.pending = deque()
+		self.corpus = None
+		self.file_attributes = None
+		self.file = None
+		self.sentence = None
+
+	def add_file(self, file_id, name):
+		self.pending.append(("file", {"id": str(file_id), "name": name}))
+
+	def add_sentence(self, sentence_id):
+		self.pending.append(("sentence", str(sentence_id)))
+
+	def add_token(self, tagged_token, readings):
+		""" Add a TaggedToken (with the number of readings it had before CG) to its sentence, writing out the files and sentences before it """
+		token = etree.Element("token")
+		token.attrib["id"] = str(tagged_token.id)
+		token.attrib["readings"] = str(readings)
+		token.attrib["lemma"] = tagged_token.lemma
+		token.attrib["basic_pos"] = tagged_token.basic_pos
+		token.attrib["rich_pos"] = tagged_token.rich_pos
+		if tagged_token.mutation != "":
+			token.attrib["mutation"] = tagged_token.mutation
+		token.attrib["position"] = tagged_token.position
+		token.text = tagged_token.token
+		sentence_id = str(tagged_token.sentence())
+		while self.sentence is None or self.sentence.get("id") != sentence_id:
+			if len(self.pending) == 0:
+				raise ValueError("A token was given for sentence {}, which hasn't been added to the XML output".format(sentence_id))
+			self._write_next()
+		if len(self.sentence) > 0:
+			self.sentence[-1].tail = "\n      "
+		else:
+			self.sentence.text = "\n      "
+		token.tail = "\n    "
+		self.sentence.append(token)
+
+	def _write_next(self):
+		""" Move on to the next file or sentence that has been added """
+		kind, value = self.pending.popleft()
+		self._finish_sentence()
+		if kind == "file":
+			self._finish_file()
+			if self.corpus is None:
+				self.corpus = self.writer.element("corpus", name=self.corpus_name)
+				self.corpus.__enter__()
+			self.writer.write("\n  ")
+			self.file_attributes = value
+		else:
+			if self.file is None:
+				self.file = self.writer.element("file", self.file_attributes)
+				self.file.__enter__()
+			self.writer.write("\n    ")
+			self.sentence = etree.Element("sentence")
+			self.sentence.attrib["id"] = value
+
+	def _finish_sentence(self):
+		if self.sentence is not None:
+			self.writer.write(self.sentence)
+			self.sentence = None
+
+	def _finish_file(self):
+		if self.file is not None:
+			self.writer.write("\n  ")
+			self.file.__exit__(None, None, None)
+			self.file = None
+		elif self.file_attributes is not None:
+			self.writer.write(etree.Element("file", self.file_attributes))
+		self.file_attributes = None
+
+	def close(self):
+		""" Write out everything that is left, and finish the XML output (without closing the output file) """
+		while len(self.pending) > 0:
+			self._write_next()
+		self._finish_sentence()
+		self._finish_file()
+		if self.corpus is not None:
+			self.writer.write("\n")
+			self.corpus.__exit__(None, None, None)
+		else:
+			corpus = etree.Element("corpus")
+			corpus.attrib["name"] = self.corpus_name
+			self.writer.write(corpus)
+		self.xml_file.__exit__(None, None, None)
+		self.output_file.write(b"\n")
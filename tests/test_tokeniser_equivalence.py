@@ -0,0 +1,294 @@
+#!usr/bin/env python3
+#-*- coding: utf-8 -*-
+"""
+'test_tokeniser_equivalence.py'
+
+Checks that the tokeniser's work-stack 'check_token' (built on 'split_token') splits tokens exactly as the recursive 'check_token' it replaced did.
+'baseline_check_token' below is a frozen copy of that recursive version (as it was before the work stack was introduced), run against the same lexicon, English word list and contractions as the current one, over a large sample of generated tokens.
+
+Run with 'python -m pytest tests' from the CyTag folder. The tests need the Welsh lexicon ('lexicon/corcencc_lexicon_2020'), and are skipped without it.
+
+This program is free software: you can redistribute it and/or modify it under the terms of the GNU General Public License as published by the Free Software Foundation, either version 3 of the License or (at your option) any later version.
+This program is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for more details.
+You should have received a copy of the GNU General Public License along with this program. If not, see <http://www.gnu.org/licenses>.
+"""
+
+import os
+import re
+import sys
+import random
+
+import pytest
+
+sys.path.insert(0, "{}/../src".format(os.path.dirname(os.path.abspath(__file__))))
+
+from shared.load_lexicon import lexicon_source
+
+if not os.path.exists(lexicon_source):
+	pytest.skip("the Welsh lexicon ('lexicon/corcencc_lexicon_2020') is needed to load the tokeniser", allow_module_level=True)
+
+from cy_tokeniser import check_token, cy_lexicon, en_dict, contractions_and_prefixes
+
+""" Frozen copy of the recursive 'check_token' """
+
+def baseline_check_token(token):
+	### Words tagged in CorCenCC raw data as English (<en>point</en>) should be
+	### returned with their tagging so that the postagger
+	### can tag them correctly.
+	if len(token) == 1:
+		return [token]
+	match_english = re.match(r"^(\[\*en( gair=\"[a-zA-Z]+\")?>([\w'\-]+)</en\*\])(.*)$", token)
+	if match_english is not None:
+		no_gair = (re.sub(r"\[\*en gair=\"[a-zA-Z]+\" ?>", "[*en>", match_english.group(1)))
+		if match_english.group(4) != "":
+			return [no_gair] + baseline_check_token(match_english.group(4))
+		else:
+			return [no_gair]
+	match_anon = re.match(r"^(\[\*anon>[\w'\-\d+]+</anon\*\])(.*)$", token)
+	if match_anon is not None:
+		if match_anon.group(2) != "":
+			return [match_anon.group(1)] + baseline_check_token(match_anon.group(2))
+		else:
+			return [match_anon.group(1)]
+	match_speaker_tag = re.search(r"\[\*[sS](\d*\??)\*\]$", token)
+	if match_speaker_tag is not None:
+		return [token]
+	if token[0:2] == "[~" or token[-2:] == "~]":
+		return [token]
+	if token in ["<=>", "</=>", "<saib>", "<aneglur>", "<aneglur?>", "</>"]:
+		return [token]
+	if len(re.findall(r"[\\/]", token)) > 0:
+		if len(set(token)) == 1:
+			if token == "/":
+				return [token]
+			else:
+				return ["\\\\"]
+		result = []
+		split = list(filter(None, re.split(r"([\\/]+)", token)))
+		for s in split:
+			check_s = s.replace("\\", "")
+			check_s = check_s.replace("/", "")
+			if check_s == "":
+				result.append(s)
+			else:
+				result += baseline_check_token(s)
+		return result
+	### !!!!?:!! => ! !!!?:!!
+	if token[0] in ["\\", ",", ".", ",", ":", ";", '"', "!", "?", "<", ">", "{", "}", "[", "]", "(", ")", "*", "…", "¶", "+"]:
+		return [token[0]] + baseline_check_token(token[1:])
+	if token[-1] in ["\\", ",", ".", ",", ":", ";", '"', "!", "?", "<", ">", "{", "}", "[", "]", "(", ")", "*", "…", "¶", "+"]:
+		return baseline_check_token(token[0:-1]) + [token[-1]]
+	### !!!! aaaaa Ffffff
+	if len(set(token.lower())) == 1:
+		return [token]
+	### gair 100
+	if token.isalpha() or token.isnumeric():
+		return [token]
+	### B.B.C.
+	match_initialism = re.match(r"^([a-zA-Z]\.)+$", token)
+	if match_initialism is not None:
+		return [token]
+	if token.lower() == "s4c":
+		return[token]
+	### word09:!!!!!!() => word09  :!!!!!!()
+	match_end = re.match(r"^([\w']+)([^\w'\-¢%]+)$", token)
+	if match_end is not None:
+		return baseline_check_token(match_end.group(1)) + baseline_check_token(match_end.group(2))
+	### !!!!!!()word_90 => !!!!!!() word_90
+	match_start = re.match(r"^([^\w\-'#@¥£€$]+)([\w']+)$", token)
+	if match_start is not None:
+		return baseline_check_token(match_start.group(1)) + baseline_check_token(match_start.group(2))
+	### hashtags
+	if len(re.findall(r"#", token)) > 0:
+		if re.match(r"#\w+$", token):
+			return [token]
+		hashtag_front = re.match(r"^(#\w+)(\W.*)$", token)
+		if hashtag_front is not None:
+			return [hashtag_front.group(1)] + baseline_check_token(hashtag_front.group(2))
+		hashtag_end = re.match(r"^(.*)(#\w+)$", token)
+		if hashtag_end is not None:
+			return baseline_check_token(hashtag_end.group(1)) + [hashtag_end.group(2)]
+		hashtag_mid = re.match(r"^(.+)(#\w+)(\W.*)$", token)
+		if hashtag_mid is not None:
+			return baseline_check_token(hashtag_mid.group(1)) + [hashtag_mid.group(2)] + baseline_check_token(hashtag_mid.group(3))
+	### hyphens
+	if len(re.findall("-", token)) != 0:
+		if token.lower() in cy_lexicon:
+			return [token]
+		elif token[0] == "-":
+			return ["-"] + baseline_check_token(token[1:])
+		elif token[-1] == "-":
+			return ["-"] + baseline_check_token(token[:-1])
+		elif token.count("-") == 1:
+			hyph_index = token.index("-")
+			if token[:hyph_index+1] in cy_lexicon:
+				return [token[:hyph_index+1]] + baseline_check_token(token[hyph_index+1:])
+			else:
+				return baseline_check_token(token[:hyph_index]) + ["-"] + baseline_check_token(token[hyph_index+1:])
+		else:
+			return [token]
+	### word;word => word ; word
+	match_semic = re.match(r"^([\w]+);([\w]+)$", token)
+	if match_semic is not None:
+		apos_replace1 = (match_semic.group(1))
+		apos_replace2 = "'" + (match_semic.group(2))
+		if apos_replace2.lower() in cy_lexicon:
+			split2 = ";" + apos_replace2[1:]
+			return [(match_semic.group(1)), split2]
+		else:
+			return [(match_semic.group(1)), ";", (match_semic.group(2))]
+	### word!word => word ! word
+	match_mid = re.match(r"^([A-Za-zÂÊÎÔÛŴŶÄÏÖËÁÉÍÓÚẂÝÀÈÌÒÙẀỲâêîôûŵŷäïöëáéíóúẃýàèìòùẁỳ']+)([^A-Za-zÂÊÎÔÛŴŶÄÏÖËÁÉÍÓÚẂÝÀÈÌÒÙẀỲâêîôûŵŷäïöëáéíóúẃýàèìòùẁỳ']+)([A-Za-zÂÊÎÔÛŴŶÄÏÖËÁÉÍÓÚẂÝÀÈÌÒÙẀỲâêîôûŵŷäïöëáéíóúẃýàèìòùẁỳ]+)$", token)
+	if match_mid is not None:
+		return baseline_check_token(match_mid.group(1)) + baseline_check_token(match_mid.group(2)) + baseline_check_token(match_mid.group(3))
+	### apostrophes
+	if len(re.findall("'", token)) != 0:
+		if token.lower() in cy_lexicon:
+			return [token]
+		if token[0] == "'" and token[-1] == "'" and len(token) > 2:
+			return ["'"] + baseline_check_token(token[1:-1]) + ["'"]
+		elif token[0] == "'":
+			### 'em-all => 'em - all
+			if not token[1:].isalpha():
+				result = []
+				split = baseline_check_token(token[1:])
+				if len(split) > 1:
+					split[0] = "'" + split[0]
+					for sp in split:
+						result = result + baseline_check_token(sp)
+					return result
+			return ["'"] + baseline_check_token(token[1:])
+		elif token[-1] == "'":
+			###os-f' => os - f'
+			if not token[:-1].isalpha():
+				result = []
+				split = baseline_check_token(token[:-1])
+				if len(split) > 1:
+					split[-1] = split[-1] + "'"
+					for sp in split:
+						result = result + baseline_check_token(sp)
+					return result
+			return baseline_check_token(token[:-1]) + ["'"
+			]
+		else:
+			apos = "'"
+			split = list(filter(None, re.split(r"(')", token)))
+			result = []
+			if len(split) == 3 and split[0].isalpha() and split[2].isalpha:
+				if split[1] + split[2] in cy_lexicon:
+					return [split[0], (split[1] + split[2])]
+				elif split[1] + split[2] in en_dict:
+					return [split[0], (split[1] + split[2])]
+				else:
+					return [token]
+			else:
+				for i, s in enumerate(split):
+					before = apos + s
+					after = s + apos
+					if s not in ["'", ""]:
+						if i == 1 and len(split) == 3 and split[i-1] == "'" and split[i+1] == "'":
+								result = result + [apos] + baseline_check_token(s) + [apos]
+						if i == 0:
+							if split[i+1] == "'":
+								if after in contractions_and_prefixes:
+									result.append(after)
+									split[i+1] = ""
+								else:
+									result = result + baseline_check_token(s)
+							else:
+								result = result + baseline_check_token(s)
+						if i != 0 and i != len(split)-1:
+							if split[i-1] == "'" and (before in contractions_and_prefixes):
+								result.append(before)
+							elif split[i-1] == "'":
+								if split[i+1] == "'" and (after in contractions_and_prefixes):
+									result.append(after)
+									split[i+1] == ""
+								else:
+									result = result + [apos] + baseline_check_token(s)
+							else:
+								result = result + baseline_check_token(s)
+						elif i == len(split)-1:
+							if split[i-1] == "'" and (before in contractions_and_prefixes):
+								result.append(before)
+							elif split[i-1] == "'":
+								result = result + ["'"] + baseline_check_token(s)
+							else:
+								result = result + baseline_check_token(s)
+			return result
+	### numerical strings
+	if token[0].isnumeric():
+		### 1990au 1990s 90s 90's 90au
+		if re.match(r"^['’]?([12]?\d)?[0-9][0-9][']?(au|s)?$", token):
+			return [token]
+		### 90c 75p 99K
+		if re.match(r"^[\$€£¥][0-9]+([,\.]?[0-9]+)?[p¢ckKmM]?$", token):
+			return [token]
+		### 6pm 7yh 9a.m.
+		if re.match(r"^((?:[012]?[0-9][:\.]?)?[012345][0-9])(yh|am|yb|pm|y\.h\.|a\.m\.|y\.b\.|p\.m\.|ybore|yrhwyr|yp)$", token):
+			time = re.match(r"^((?:[012]?[0-9][:\.]?)?[012345][0-9])(yh|am|yb|pm|y\.h\.|a\.m\.|y\.b\.|p\.m\.|ybore|yrhwyr|yp)?$", token)
+			return [time.group(1)] + baseline_check_token(time.group(2))
+		### 654BC
+		if re.match(r"^[123]?\d(\d\d)?(oc|cc|bc|bce|ce|ad|a\.\d\.|b\.c\.|b\.c\.e\.|o\.c\.|c\.c\.|c\.e\.)", token.lower()):
+			return [token]
+		### 09\07\2007
+		if re.match(r"^[0123]?\d[\\\-\.\/–][0123]?\d[\\\-\.\/–][12]\d\d\d", token) or re.match(r"^[12]\d\d\d[\\\-\.\/–][0123]?\d[\\\-\.\/–][0123]?\d", token):
+			return [token]
+		if re.match(r"^-?[0-9]+[,\.]\d+%?$", token) or re.match(r"^-?\d+\:?[0-9]+[,\.]\d+%?$", token):
+			return [token]
+	### 100people => 100 people
+	match_num1 = re.match(r"^([0-9\.,]+)([^0-9\.,]+)$", token)
+	if match_num1 is not None:
+		return baseline_check_token(match_num1.group(1)) + baseline_check_token(match_num1.group(2))
+	match_num2 = re.match(r"^([^0-9\.,]+)([0-9\.,]+)$", token)
+	if match_num2 is not None:
+		return baseline_check_token(match_num2.group(1)) + baseline_check_token(match_num2.group(2))
+	match_num3 = re.match(r"^([0-9\.,]+)(.+)$", token)
+	if match_num3 is not None:
+		return baseline_check_token(match_num3.group(1)) + baseline_check_token(match_num3.group(2))
+	### 90c 75p 99K
+	if token[0] in ["$", "€", "£", "¥"] and re.match(r"[0-9\.,]+[¢cpMmkK]?$", token[1:]):
+		return [token]
+	return [token]
+
+
+""" Token sample """
+
+""" Pieces that the generated tokens are built from, covering each branch of 'check_token' """
+words = ["gair", "Caerdydd", "ysgol", "bore", "da", "mae", "hi", "fe", "yn", "ti", "chi", "nhw", "point", "email", "S4C", "s4c", "Cymru", "ŵyr", "tŷ", "ddŵr", "Llŷn", "aaaa", "B.B.C.", "e.e.", "i", "a", "y", "o"]
+apostrophe_pieces = ["'", "''", "'r", "'n", "'i", "'m", "'w", "'ch", "'u", "'e", "'em", "f'", "o'", "ges'", "dy'", "na'", "mynd'", "’"]
+hyphen_pieces = ["-", "--", "di-", "gwrth-", "ail-", "cyd-", "ad-", "-ish", "hanner-"]
+punctuation_pieces = [".", ",", "!", "?", ":", ";", "\"", "(", ")", "[", "]", "{", "}", "*", "…", "¶", "+", "<", ">", "!!!", "?!", "...", ":)", "(!)", "\\", "/", "//", "\\/", "%", "¢", "&", "@", "#"]
+number_pieces = ["1", "90", "1990", "1990au", "90s", "90's", "'90au", "£5", "$3.50", "€10K", "75p", "6pm", "7yh", "10:30yb", "9a.m.", "654BC", "1066oc", "09/07/2007", "2007-07-09", "3.14", "-2,5%", "12:30.5", "100", "2,000"]
+markup_pieces = ["[*en>point</en*]", "[*en gair=\"point\">point</en*]", "[*en gair=\"x\" >email</en*]", "[*anon>enw_person</anon*]", "[*anon>enw_gwefan</anon*]", "[~saib~]", "[~chwerthin~]", "[~sŵn car~]", "[~/~]", "[~", "~]", "[*S1*]", "[*s2?*]", "<=>", "</=>", "<saib>", "<aneglur>", "<aneglur?>", "</>", "#Cymru", "#tag_1"]
+piece_groups = [words, apostrophe_pieces, hyphen_pieces, punctuation_pieces, number_pieces, markup_pieces]
+
+def sample_tokens(count=40000, seed=5):
+	""" Return a reproducible sample of tokens: the pieces themselves, lexicon entries and contractions (as they are and with punctuation around them), and random combinations of up to five pieces """
+	generator = random.Random(seed)
+	pieces = [piece for group in piece_groups for piece in group]
+	lexicon_words = sorted(cy_lexicon.keys())
+	tokens = set(pieces) | set(contractions_and_prefixes)
+	for word in generator.sample(lexicon_words, min(len(lexicon_words), 3000)):
+		tokens.add(word)
+		tokens.add("{}{}".format(word, generator.choice(punctuation_pieces + apostrophe_pieces)))
+		tokens.add("{}{}".format(generator.choice(punctuation_pieces + apostrophe_pieces + hyphen_pieces), word))
+	while len(tokens) < count:
+		token = "".join(generator.choice(generator.choice(piece_groups)) for piece in range(generator.randint(2, 5)))
+		if len(token) <= 40:
+			tokens.add(token)
+	return sorted(tokens)
+
+""" Tests """
+
+def test_sample_covers_each_kind_of_token():
+	tokens = sample_tokens()
+	assert len(tokens) >= 40000
+	assert any("'" in token and token.strip("'") != "" for token in tokens)
+	assert any("-" in token[1:-1] for token in tokens)
+	assert any(re.match(r"^[^\w\s]{2,}$", token) for token in tokens)
+	assert any(token.startswith(("[*en", "[*anon", "[~", "[*S", "<")) for token in tokens)
+
+def test_check_token_matches_recursive_version():
+	for token in sample_tokens():
+		assert check_token(token) == baseline_check_token(token), token